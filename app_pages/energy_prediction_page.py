@@ -6,14 +6,16 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-try:
-    from statsmodels.tsa.statespace.sarimax import SARIMAX
-    ARIMA_AVAILABLE = True
-except ImportError:
-    ARIMA_AVAILABLE = False
-
 from app_services.database import execute_query
-from page_modules.database_queries import get_energy_prediction_data
+from app_services.frame_schema import store_session_frame
+from app_services.rerun_profiler import profiled
+from app_services.data_version import get_raw_data_start
+from app_services.device_registry import get_devices, get_device, get_device_for_table
+from app_services.measurement_access import (
+    CONTROLLER_COLUMNS, CONTROLLER_REQUIRED, fetch_controller_frames, fetch_controller_frames_for_months, stream_measurements
+)
+from page_modules.database_queries import get_history_date_bounds
+from page_modules.chart_traces import create_scatter_trace
 
 FORECAST_YEAR = 2026
 TIME_INTERVAL_HOURS = 0.25
@@ -29,14 +31,25 @@ def _load_css():
         pass
 
 
-"E.ON árak státusz megjelenítése."
+"E.ON árak státusz megjelenítése. Az árak lekérése a háttérben fut, ezért az elavultságot jelezzük blokkolás helyett."
 def _display_eon_status():
-    if 'loss_prices' in st.session_state and st.session_state.loss_prices is not None:
-        st.success("✅ Elérhető árak naprakészek")
-    elif 'eon_error' in st.session_state and st.session_state.eon_error:
+    fetched_at = st.session_state.get('eon_prices_fetched_at')
+    fetched_at_text = fetched_at.strftime('%Y-%m-%d %H:%M') if fetched_at else "ismeretlen"
+    
+    if st.session_state.get('eon_prices_available'):
+        if st.session_state.get('eon_prices_stale'):
+            st.warning(f"⚠️ Az árak elavultak lehetnek (utolsó frissítés: {fetched_at_text})")
+        else:
+            st.success(f"✅ Elérhető árak naprakészek (utolsó frissítés: {fetched_at_text})")
+    elif st.session_state.get('eon_prices_refreshing'):
+        st.info("🔄 E.ON árak lekérése folyamatban a háttérben...")
+    elif st.session_state.get('eon_error'):
         st.error(f"❌ E.ON árak lekérése sikertelen: {st.session_state.eon_error}")
     else:
         st.warning("⚠️ E.ON árak nem érhetők el")
+    
+    if st.session_state.get('eon_prices_available') and st.session_state.get('eon_prices_refreshing'):
+        st.caption("🔄 Árak frissítése folyamatban a háttérben...")
 
 
 "Session state inicializálása."
@@ -115,175 +128,112 @@ def _select_forecast_period(forecast_type):
         return datetime(FORECAST_YEAR, 1, 1), datetime(FORECAST_YEAR, 12, 31), "2026"
 
 
+"Az előzmény adatok első és utolsó éve (a hónap alapú lekérdezések évenkénti dátumtartományaihoz). A raw_from a cache kulcs része: adatmegőrzés után a korábbi évek már csak az órás aggregátumokban vannak meg."
+@st.cache_data(ttl=3600, show_spinner=False)
+def _get_history_years(selected_table, raw_from=None):
+    first_date, last_date = execute_query(get_history_date_bounds(selected_table, raw_from))[0]
+    if first_date is None:
+        return FORECAST_YEAR - 1, FORECAST_YEAR - 1
+    return first_date.year, last_date.year
+
+
+"A vezérlő idősor egy dátumtartományra, a hosszú formátumú mérés lekérdezésből."
+def _query_date_range(selected_table, start_date, end_date):
+    device = get_device_for_table(selected_table)
+    return fetch_controller_frames(start_date, end_date, [device])[device.device_id]
+
+
+"A vezérlő idősor a megadott hónapokra az összes előzmény évből."
+def _query_months(selected_table, months):
+    device = get_device_for_table(selected_table)
+    first_year, last_year = _get_history_years(selected_table, get_raw_data_start(selected_table))
+    return fetch_controller_frames_for_months(months, first_year, last_year, [device])[device.device_id]
+
+
 "Havi adatok lekérdezése."
-def _query_monthly_data(selected_table, selected_month_value, power_column, current_column, 
-                       temp_column, humidity_column):
+def _query_monthly_data(selected_table, selected_month_value):
     if selected_month_value == 5:
-        query = f"""
-        SELECT date, time, 
-               {power_column} as value,
-               {current_column} as current,
-               {temp_column} as internal_temp,
-               trend_kulso_homerseklet_pillanatnyi as external_temp,
-               {humidity_column} as internal_humidity,
-               trend_kulso_paratartalom as external_humidity
-        FROM {selected_table}
-        WHERE DATE(date) BETWEEN '2025-05-01' AND '2025-05-31'
-        AND {power_column} IS NOT NULL 
-        AND {current_column} IS NOT NULL
-        AND {temp_column} IS NOT NULL
-        AND trend_kulso_homerseklet_pillanatnyi IS NOT NULL
-        ORDER BY date, time
-        """
-    else:
-        query = f"""
-        SELECT date, time, 
-               {power_column} as value,
-               {current_column} as current,
-               {temp_column} as internal_temp,
-               trend_kulso_homerseklet_pillanatnyi as external_temp,
-               {humidity_column} as internal_humidity,
-               trend_kulso_paratartalom as external_humidity
-        FROM {selected_table}
-        WHERE EXTRACT(MONTH FROM date) = {selected_month_value}
-        AND {power_column} IS NOT NULL 
-        AND {current_column} IS NOT NULL
-        AND {temp_column} IS NOT NULL
-        AND trend_kulso_homerseklet_pillanatnyi IS NOT NULL
-        ORDER BY date, time
-        """
-    return execute_query(query)
+        return _query_date_range(selected_table, "2025-05-01", "2025-05-31")
+    return _query_months(selected_table, [selected_month_value])
 
 
 "Negyedéves adatok lekérdezése."
-def _query_quarterly_data(selected_table, selected_quarter, power_column, current_column,
-                          temp_column, humidity_column):
+def _query_quarterly_data(selected_table, selected_quarter):
     quarter_months = {
         1: [1, 2, 3],
         2: [4, 5, 6],
         3: [7, 8, 9],
         4: [10, 11, 12]
     }
-    month_list = ','.join(map(str, quarter_months[selected_quarter]))
-    query = f"""
-    SELECT date, time, 
-           {power_column} as value,
-           {current_column} as current,
-           {temp_column} as internal_temp,
-           trend_kulso_homerseklet_pillanatnyi as external_temp,
-           {humidity_column} as internal_humidity,
-           trend_kulso_paratartalom as external_humidity
-    FROM {selected_table}
-    WHERE EXTRACT(MONTH FROM date) IN ({month_list})
-    AND {power_column} IS NOT NULL 
-    AND {current_column} IS NOT NULL
-    AND {temp_column} IS NOT NULL
-    AND trend_kulso_homerseklet_pillanatnyi IS NOT NULL
-    ORDER BY date, time
-    """
-    return execute_query(query)
+    return _query_months(selected_table, quarter_months[selected_quarter])
 
 
 "Féléves adatok lekérdezése."
-def _query_semester_data(selected_table, selected_semester, power_column, current_column,
-                        temp_column, humidity_column):
+def _query_semester_data(selected_table, selected_semester):
     semester_months = {
         1: [1, 2, 3, 4, 5, 6],
         2: [7, 8, 9, 10, 11, 12]
     }
-    month_list = ','.join(map(str, semester_months[selected_semester]))
-    query = f"""
-    SELECT date, time, 
-           {power_column} as value,
-           {current_column} as current,
-           {temp_column} as internal_temp,
-           trend_kulso_homerseklet_pillanatnyi as external_temp,
-           {humidity_column} as internal_humidity,
-           trend_kulso_paratartalom as external_humidity
-    FROM {selected_table}
-    WHERE EXTRACT(MONTH FROM date) IN ({month_list})
-    AND {power_column} IS NOT NULL 
-    AND {current_column} IS NOT NULL
-    AND {temp_column} IS NOT NULL
-    AND trend_kulso_homerseklet_pillanatnyi IS NOT NULL
-    ORDER BY date, time
-    """
-    return execute_query(query)
+    return _query_months(selected_table, semester_months[selected_semester])
 
 
 "Történeti adatok lekérdezése."
+@profiled
 def _fetch_historical_data(forecast_type, selected_table):
-    power_column = "trend_smart_p" if selected_table == "dfv_smart_db" else "trend_termosztat_p"
-    current_column = "trend_smart_i1" if selected_table == "dfv_smart_db" else "trend_termosztat_i1"
-    temp_column = "trend_smart_t" if selected_table == "dfv_smart_db" else "trend_termosztat_t"
-    humidity_column = "trend_smart_rh" if selected_table == "dfv_smart_db" else "trend_termosztat_rh"
-    
     if forecast_type == "havi":
         if 'selected_month' not in st.session_state:
             st.error("Hiba: Kérjük, válasszon hónapot az előrejelzéshez!")
             st.stop()
-        return _query_monthly_data(selected_table, st.session_state.selected_month,
-                                  power_column, current_column, temp_column, humidity_column)
+        return _query_monthly_data(selected_table, st.session_state.selected_month)
     
     elif forecast_type == "negyedéves":
         if 'selected_quarter' not in st.session_state:
             st.error("Hiba: Kérjük, válasszon negyedévet az előrejelzéshez!")
             st.stop()
-        return _query_quarterly_data(selected_table, st.session_state.selected_quarter,
-                                    power_column, current_column, temp_column, humidity_column)
+        return _query_quarterly_data(selected_table, st.session_state.selected_quarter)
     
     elif forecast_type == "féléves":
         if 'selected_semester' not in st.session_state:
             st.error("Hiba: Kérjük, válasszon félévet az előrejelzéshez!")
             st.stop()
-        return _query_semester_data(selected_table, st.session_state.selected_semester,
-                                   power_column, current_column, temp_column, humidity_column)
+        return _query_semester_data(selected_table, st.session_state.selected_semester)
     
     else:
-        query = get_energy_prediction_data(selected_table, "2024-01-01", "2025-12-31")
-        return execute_query(query)
+        return _query_date_range(selected_table, "2024-01-01", "2025-12-31")
 
 
 "DataFrame előkészítése."
 def _prepare_dataframe(data):
-    df = pd.DataFrame(data, columns=['date', 'time', 'value', 'current', 
-                                     'internal_temp', 'external_temp', 'internal_humidity', 'external_humidity'])
-    df['datetime'] = pd.to_datetime(df['date'].astype(str) + ' ' + df['time'].astype(str))
-    
-    for col in ['value', 'internal_temp', 'external_temp', 'internal_humidity', 'external_humidity']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df = data.copy()
+    df['datetime'] = df['ts']
     
     df = df.dropna(subset=['value'])
     df = df.sort_values('datetime').reset_index(drop=True)
     return df
 
 
-"Éves átlagok számítása."
+"Éves átlagok számítása darabonkénti napi részösszegekből, így a két év nyers adata egyszerre sosem kerül memóriába. A hosszú formátumú darabok szerepkörönként (metric) összegződnek."
+@profiled
 def _calculate_yearly_averages(selected_table):
-    query = get_energy_prediction_data(selected_table, "2024-01-01", "2025-12-31")
-    yearly_data = execute_query(query)
+    device = get_device_for_table(selected_table)
+    roles = list(CONTROLLER_COLUMNS)
     
-    if not yearly_data or len(yearly_data) == 0:
-        return None, None, None, None, None
+    daily_partials = []
+    for chunk in stream_measurements(device, "2024-01-01", "2025-12-31", roles, CONTROLLER_REQUIRED):
+        chunk['date'] = chunk['ts'].dt.normalize()
+        daily_partials.append(chunk.groupby(['date', 'metric'])['value'].agg(['sum', 'count']))
     
-    yearly_df = pd.DataFrame(yearly_data, columns=['date', 'time', 'value', 'current', 
-                                                    'internal_temp', 'external_temp', 'internal_humidity', 'external_humidity'])
-    for col in ['value', 'internal_temp', 'external_temp', 'internal_humidity', 'external_humidity']:
-        yearly_df[col] = pd.to_numeric(yearly_df[col], errors='coerce')
-    yearly_df = yearly_df.dropna(subset=['value'])
-    
-    yearly_df['datetime'] = pd.to_datetime(yearly_df['date'].astype(str) + ' ' + yearly_df['time'].astype(str))
-    yearly_df['date'] = yearly_df['datetime'].dt.date
+    if not daily_partials:
+        return None, None, None, None, None
     
-    yearly_daily_consumption = yearly_df.groupby('date')['value'].sum() * TIME_INTERVAL_HOURS
-    yearly_avg_value = yearly_daily_consumption.mean()
-    yearly_avg_internal_temp = yearly_df.groupby('date')['internal_temp'].mean().mean()
-    yearly_avg_external_temp = yearly_df.groupby('date')['external_temp'].mean().mean()
-    yearly_avg_internal_humidity = yearly_df.groupby('date')['internal_humidity'].mean().mean()
-    yearly_avg_external_humidity = yearly_df.groupby('date')['external_humidity'].mean().mean()
+    daily_totals = pd.concat(daily_partials).groupby(level=[0, 1]).sum().unstack('metric')
+    daily_sums = daily_totals['sum'].reindex(columns=roles)
+    daily_counts = daily_totals['count'].reindex(columns=roles)
+    yearly_avg_value = (daily_sums['power'] * TIME_INTERVAL_HOURS).mean()
+    daily_means = daily_sums / daily_counts.replace(0, np.nan)
     
-    return yearly_avg_value, yearly_avg_internal_temp, yearly_avg_external_temp, \
-           yearly_avg_internal_humidity, yearly_avg_external_humidity
+    return yearly_avg_value, daily_means['temp'].mean(), daily_means['external_temp'].mean(), \
+           daily_means['humidity'].mean(), daily_means['external_humidity'].mean()
 
 
 "Ellenőrzi, hogy van-e májusi adat."
@@ -332,6 +282,7 @@ def _fill_may_data(daily_df, yearly_avg_value, yearly_avg_internal_temp,
 
 
 "Napi DataFrame előkészítése."
+@profiled
 def _prepare_daily_dataframe(df, has_may_data, selected_table):
     df['date'] = df['datetime'].dt.date
     daily_consumption = df.groupby('date')['value'].sum() * TIME_INTERVAL_HOURS
@@ -366,8 +317,22 @@ def _prepare_daily_dataframe(df, has_may_data, selected_table):
     return daily_df
 
 
+"SARIMAX osztály betöltése az első előrejelzéskor. A statsmodels importálása lassú, ezért nem az oldal betöltésekor történik."
+def _load_sarimax():
+    try:
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+        return SARIMAX
+    except ImportError:
+        return None
+
+
 "ARIMA modell betanítása és előrejelzés."
+@profiled
 def _train_arima_model(daily_df, forecast_days, forecast_start_date, forecast_end_date):
+    SARIMAX = _load_sarimax()
+    if SARIMAX is None:
+        raise ImportError("A statsmodels csomag nem érhető el, az előrejelzés nem generálható.")
+    
     ts = daily_df.set_index('datetime')['value']
     exog = daily_df.set_index('datetime')[['internal_temp', 'external_temp', 'internal_humidity', 'external_humidity']]
     
@@ -421,26 +386,30 @@ def _create_forecast_chart(forecast_df, forecast_type):
         "éves": "éves előrejelzés"
     }
     
+    point_count = len(forecast_df)
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=forecast_df['datetime'],
-        y=forecast_df['forecast'],
+    fig.add_trace(create_scatter_trace(
+        forecast_df['datetime'],
+        forecast_df['forecast'],
+        point_count=point_count,
         mode='lines+markers',
         name='Előrejelzett fogyasztás',
         line=dict(color='red', width=2),
         marker=dict(size=4, symbol='circle')
     ))
-    fig.add_trace(go.Scatter(
-        x=forecast_df['datetime'],
-        y=forecast_df['upper_bound'],
+    fig.add_trace(create_scatter_trace(
+        forecast_df['datetime'],
+        forecast_df['upper_bound'],
+        point_count=point_count,
         mode='lines',
         line=dict(width=0),
         showlegend=False,
         hoverinfo='skip'
     ))
-    fig.add_trace(go.Scatter(
-        x=forecast_df['datetime'],
-        y=forecast_df['lower_bound'],
+    fig.add_trace(create_scatter_trace(
+        forecast_df['datetime'],
+        forecast_df['lower_bound'],
+        point_count=point_count,
         mode='lines',
         line=dict(width=0),
         fill='tonexty',
@@ -461,23 +430,15 @@ def _create_forecast_chart(forecast_df, forecast_type):
     return fig
 
 
-"2025-ös veszteségi ár feldolgozása."
-def _parse_loss_price_2025():
-    loss_prices = st.session_state.get('loss_prices', None)
-    if not loss_prices:
-        return None
-    
-    try:
-        price_2025_str = loss_prices.get('2025', '')
-        return float(price_2025_str.replace(',', '.').replace(' Ft/kWh', '')) if price_2025_str else None
-    except:
-        return None
+"Az előrejelzett napokon hatályos veszteségi árak lekérése az ár tárolóból."
+def _get_forecast_loss_prices(forecast_df):
+    from app_services.price_store import get_price_store
+    return get_price_store().prices_for_dates(forecast_df['datetime'])
 
 
 "Költség metrikák megjelenítése."
-def _display_cost_metrics(forecast_df, forecast_type, loss_price_2025):
-    forecast_values_kwh = forecast_df['forecast'].copy()
-    daily_loss_costs = [consumption_kwh * loss_price_2025 for consumption_kwh in forecast_values_kwh]
+def _display_cost_metrics(forecast_df, forecast_type, loss_prices):
+    daily_loss_costs = (forecast_df['forecast'].to_numpy() * loss_prices).tolist()
     total_cost = sum(daily_loss_costs)
     
     col1, col2, col3 = st.columns(3)
@@ -499,10 +460,12 @@ def _display_cost_metrics(forecast_df, forecast_type, loss_price_2025):
 
 "Költség diagram létrehozása."
 def _create_cost_chart(forecast_df, daily_loss_costs):
+    point_count = len(forecast_df)
     fig_savings = go.Figure()
-    fig_savings.add_trace(go.Scatter(
-        x=forecast_df['datetime'],
-        y=daily_loss_costs,
+    fig_savings.add_trace(create_scatter_trace(
+        forecast_df['datetime'],
+        daily_loss_costs,
+        point_count=point_count,
         mode='lines+markers',
         name='Veszteségi ár költség',
         line=dict(color='red', width=2),
@@ -520,10 +483,11 @@ def _create_cost_chart(forecast_df, daily_loss_costs):
 
 
 "Előrejelzés generálása."
+@profiled
 def _generate_forecast(selected_table, forecast_type, forecast_start_date, forecast_end_date, selected_period):
     data = _fetch_historical_data(forecast_type, selected_table)
     
-    if not data or len(data) == 0:
+    if data is None or data.empty:
         st.warning("Nincs adat a kiválasztott időszakhoz az adatbázisban!")
         return
     
@@ -541,7 +505,7 @@ def _generate_forecast(selected_table, forecast_type, forecast_start_date, forec
     forecast_days = (forecast_end_date - forecast_start_date).days + 1
     forecast_df = _train_arima_model(daily_df, forecast_days, forecast_start_date, forecast_end_date)
     
-    st.session_state.forecast_df = forecast_df.copy()
+    store_session_frame('forecast_df', forecast_df)
     st.session_state.forecast_type = forecast_type
     st.session_state.forecast_period = selected_period
     
@@ -561,12 +525,12 @@ def _display_forecast_results():
     fig = _create_forecast_chart(forecast_df, forecast_type)
     st.plotly_chart(fig, use_container_width=True)
     
-    loss_price_2025 = _parse_loss_price_2025()
+    loss_prices = _get_forecast_loss_prices(forecast_df)
     
-    if loss_price_2025 is not None:
+    if loss_prices is not None:
         st.write("---")
         st.write("## Ár előrejelzés és költség számítás")
-        daily_loss_costs = _display_cost_metrics(forecast_df, forecast_type, loss_price_2025)
+        daily_loss_costs = _display_cost_metrics(forecast_df, forecast_type, loss_prices)
         st.write("### Költség vizualizáció")
         fig_savings = _create_cost_chart(forecast_df, daily_loss_costs)
         st.plotly_chart(fig_savings, use_container_width=True)
@@ -582,7 +546,20 @@ def show_energy_prediction_page():
     _display_eon_status()
     _initialize_session_state()
     
-    selected_table = "dfv_smart_db"
+    smart_devices = get_devices('smart')
+    if not smart_devices:
+        st.warning("Nincs dinamikus fűtésvezérlő az eszköz nyilvántartásban!")
+        return
+    if len(smart_devices) > 1:
+        device_id = st.selectbox(
+            "Válassz vezérlőt:",
+            options=[device.device_id for device in smart_devices],
+            format_func=lambda device_id: get_device(device_id).display_name,
+            key="forecast_device_selector"
+        )
+        selected_table = get_device(device_id).table
+    else:
+        selected_table = smart_devices[0].table
     
     st.write("---")
     st.write("## Előrejelzés típusa")
@@ -1,17 +1,35 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime, timedelta, time
-from app_services.database import execute_query
+from app_services.database import execute_query, fetch_frame
 import os
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app_services.co2_calculation import fetch_co2_emission_data
+from app_services.frame_schema import store_session_frame
+from app_services.rerun_profiler import profiled
+from app_services.chart_data_service import select_resolution_level, fetch_rollup_series
+from app_services.chart_cache import get_chart_cache, frame_to_columns
+from app_services.data_version import get_data_version, get_raw_data_start
+from app_services.live_tail import LiveChartWindow, LIVE_MODE_ENABLED
+from app_services.device_registry import get_devices, get_device_for_table
+from page_modules.chart_traces import create_scatter_trace
 
 LAST_DATA_TIME = datetime(2025, 8, 21, 23, 45, 0)
 FIRST_DATA_TIME = datetime(2024, 8, 19, 8, 0, 0)
 DAYS_TO_SHOW = 10
+TABLE_BUTTONS_PER_ROW = 4
+TIME_INTERVALS = {
+    "1 óra": timedelta(hours=1),
+    "3 óra": timedelta(hours=3),
+    "12 óra": timedelta(hours=12),
+    "1 nap": timedelta(days=1),
+    "3 nap": timedelta(days=3),
+    "7 nap": timedelta(days=7)
+}
 
 
 "CSS fájl betöltése."
@@ -27,26 +45,19 @@ def _load_css():
 "Táblázat session state inicializálása."
 def _initialize_table_session_state():
     if "selected_table" not in st.session_state:
-        st.session_state.selected_table = "dfv_smart_db"
-        st.session_state.table_display_name = "Dinamikus fűtésvezérlő"
+        default_device = get_devices()[0]
+        st.session_state.selected_table = default_device.table
+        st.session_state.table_display_name = default_device.display_name
         st.session_state.prev_selected_table = None
     if "global_page_size" not in st.session_state:
         st.session_state.global_page_size = 5
     if "chart_generated" not in st.session_state:
         st.session_state.chart_generated = False
-    if "chart_data_cache" not in st.session_state:
-        st.session_state.chart_data_cache = {}
 
 
 "Cache törlése tábla váltáskor."
 def _clear_cache_on_table_change(selected_table):
     if "prev_selected_table" in st.session_state and st.session_state.prev_selected_table != selected_table:
-        if "chart_data_cache" in st.session_state:
-            keys_to_delete = [key for key in st.session_state.chart_data_cache.keys() 
-                             if key.startswith(f"{st.session_state.prev_selected_table}_")]
-            for key in keys_to_delete:
-                del st.session_state.chart_data_cache[key]
-        
         for key in ['co2_hourly_dataframe', 'co2_hourly_with_power', 'co2_daily_dataframe', 'co2_cached_days']:
             if key in st.session_state:
                 del st.session_state[key]
@@ -69,11 +80,12 @@ def _select_table_button(table_name, display_name, is_selected):
 
 "Táblák kiválasztásának megjelenítése."
 def _display_table_selection(selected_table):
-    col1, col2 = st.columns(2)
-    with col1:
-        _select_table_button("dfv_smart_db", "Dinamikus fűtésvezérlő", selected_table == "dfv_smart_db")
-    with col2:
-        _select_table_button("dfv_termosztat_db", "Termosztátos vezérlő", selected_table == "dfv_termosztat_db")
+    devices = get_devices()
+    for row_start in range(0, len(devices), TABLE_BUTTONS_PER_ROW):
+        row_devices = devices[row_start:row_start + TABLE_BUTTONS_PER_ROW]
+        for column, device in zip(st.columns(min(len(devices), TABLE_BUTTONS_PER_ROW)), row_devices):
+            with column:
+                _select_table_button(device.table, device.display_name, selected_table == device.table)
 
 
 "Oldal méret beállítása."
@@ -93,22 +105,14 @@ def _setup_page_size():
         st.write("")
 
 
-"Táblázat oszlopok lekérdezése."
+"Táblázat oszlopok lekérdezése az eszköz nyilvántartás alapján."
 def _get_table_columns(selected_table):
-    if selected_table == "dfv_smart_db":
-        return "id, date, time, trend_smart_dp, trend_smart_t, trend_smart_i1, trend_smart_p, trend_smart_rh, trend_kulso_paratartalom, trend_kulso_homerseklet_pillanatnyi"
-    elif selected_table == "dfv_termosztat_db":
-        return "id, date, time, trend_termosztat_t, trend_termosztat_i1, trend_termosztat_p, trend_termosztat_rh, trend_kulso_paratartalom, trend_kulso_homerseklet_pillanatnyi"
-    return "*"
+    return ", ".join(["id", "date", "time"] + get_device_for_table(selected_table).measurement_columns)
 
 
-"Oszlopnevek meghatározása tábla típus alapján."
+"Oszlopnevek meghatározása az eszköz nyilvántartás alapján."
 def _get_column_names(selected_table):
-    if selected_table == "dfv_termosztat_db":
-        return ["Dátum", "Idő", "Belső hőmérséklet (°C)", "Áramerősség (A)", "Teljesítmény (W)", 
-                "Relatív páratartalom (%)", "Külső páratartalom (g/m³)", "Külső hőmérséklet (°C)"]
-    return ["Dátum", "Idő", "Harmatpont (°C)", "Belső hőmérséklet (°C)", "Áramerősség (A)", "Teljesítmény (W)", 
-            "Relatív páratartalom (%)", "Külső páratartalom (g/m³)", "Külső hőmérséklet (°C)"]
+    return ["Dátum", "Idő"] + list(get_device_for_table(selected_table).column_labels())
 
 
 "DataFrame előkészítése megjelenítéshez."
@@ -219,108 +223,169 @@ def _get_time_range(time_interval, custom_start_date=None, custom_end_date=None)
             return start_time, end_time
         return FIRST_DATA_TIME, LAST_DATA_TIME
     
-    intervals = {
-        "1 óra": timedelta(hours=1),
-        "3 óra": timedelta(hours=3),
-        "12 óra": timedelta(hours=12),
-        "1 nap": timedelta(days=1),
-        "3 nap": timedelta(days=3),
-        "7 nap": timedelta(days=7)
-    }
+    if time_interval == "Teljes időszak":
+        return FIRST_DATA_TIME, LAST_DATA_TIME
     
-    delta = intervals.get(time_interval, timedelta(hours=1))
+    delta = TIME_INTERVALS.get(time_interval, timedelta(hours=1))
     start_time = LAST_DATA_TIME - delta
     if start_time < FIRST_DATA_TIME:
         start_time = FIRST_DATA_TIME
     return start_time, LAST_DATA_TIME
 
 
-"Diagram oszlopok lekérdezése."
-def _get_chart_columns(selected_table):
-    if selected_table == "dfv_smart_db":
-        return "id, date, time, trend_smart_dp, trend_smart_t, trend_smart_i1, trend_smart_p, trend_smart_rh, trend_kulso_paratartalom, trend_kulso_homerseklet_pillanatnyi"
-    elif selected_table == "dfv_termosztat_db":
-        return "id, date, time, trend_termosztat_t, trend_termosztat_i1, trend_termosztat_p, trend_termosztat_rh, trend_kulso_paratartalom, trend_kulso_homerseklet_pillanatnyi"
-    return "*"
+"Diagram oszlopok lekérdezése: csak az időbélyeg és a kiválasztott mérési oszlop(ok)."
+def _get_chart_columns(db_columns):
+    from page_modules.database_queries import get_timestamp_column
+    return ", ".join([get_timestamp_column()] + list(db_columns))
 
 
-"Diagram adatok lekérdezése cache-ből vagy adatbázisból."
-def _fetch_chart_data(selected_table, time_interval, custom_start_date=None, custom_end_date=None):
-    cache_key = f"{selected_table}_{time_interval}"
-    if time_interval == "Egyéni intervallum" and custom_start_date and custom_end_date:
-        cache_key = f"{selected_table}_{time_interval}_{custom_start_date}_{custom_end_date}"
+"Megjelenített oszlopnév és adatbázis oszlop összerendelése."
+def _get_chart_column_mapping(selected_table):
+    return get_device_for_table(selected_table).column_labels()
+
+
+"Aggregált diagram adatok lekérdezése a felbontási piramisból."
+def _fetch_pyramid_chart_data(selected_table, selected_column, level, start_time, end_time):
+    db_column = _get_chart_column_mapping(selected_table).get(selected_column)
+    if db_column is None:
+        return None
     
-    if cache_key in st.session_state.chart_data_cache:
-        cached_data = st.session_state.chart_data_cache[cache_key]
-        if cached_data and len(cached_data) > 0:
-            return cached_data
+    series_df = fetch_rollup_series(selected_table, db_column, level['name'], start_time, end_time,
+                                    get_data_version(selected_table))
+    if series_df is None or series_df.empty:
+        return None
     
+    chart_df = series_df.rename(columns={'Átlag': selected_column})
+    if selected_column == "Teljesítmény (W)":
+        for col in ['Minimum', selected_column, 'Maximum']:
+            chart_df[col] = chart_df[col] * 1000
+    return chart_df
+
+
+"Diagram adatok lekérdezése cache-ből vagy adatbázisból."
+@profiled
+def _fetch_chart_data(selected_table, db_columns, time_interval, custom_start_date=None, custom_end_date=None):
     start_time, end_time = _get_time_range(time_interval, custom_start_date, custom_end_date)
     if start_time is None or end_time is None:
-        return []
+        return None
+    
+    chart_cache = get_chart_cache()
+    chart_columns_data = {}
+    missing_columns = []
+    for db_column in db_columns:
+        cached_column = chart_cache.get(selected_table, db_column, start_time, end_time)
+        if cached_column is None:
+            missing_columns.append(db_column)
+        else:
+            chart_columns_data.update(cached_column)
+    
+    if not missing_columns:
+        return chart_columns_data
     
     try:
         from page_modules.database_queries import get_chart_data_by_time_range
-        chart_columns = _get_chart_columns(selected_table)
+        chart_columns = _get_chart_columns(missing_columns)
         query = get_chart_data_by_time_range(
             selected_table, chart_columns,
             start_time.strftime('%Y-%m-%d %H:%M:%S'),
             end_time.strftime('%Y-%m-%d %H:%M:%S')
         )
-        chart_data = execute_query(query)
+        chart_frame = fetch_frame(query)
+        
+        if chart_frame.empty:
+            return None
+        
+        fetched_data = frame_to_columns(chart_frame)
+        for db_column in missing_columns:
+            chart_cache.put(selected_table, db_column, start_time, end_time,
+                            {'timestamp': fetched_data['timestamp'], db_column: fetched_data[db_column]})
         
-        if chart_data and len(chart_data) > 0:
-            st.session_state.chart_data_cache[cache_key] = chart_data
+        if chart_columns_data and not np.array_equal(chart_columns_data['timestamp'], fetched_data['timestamp']):
+            aligned_df = pd.DataFrame(chart_columns_data).set_index('timestamp').reindex(fetched_data['timestamp'])
+            for db_column in aligned_df.columns:
+                fetched_data[db_column] = aligned_df[db_column].to_numpy()
+            return fetched_data
         
-        return chart_data or []
+        chart_columns_data.update(fetched_data)
+        return chart_columns_data
     except Exception as e:
         st.error(f"Hiba a diagram generálásakor: {e}")
         import traceback
         st.error(f"Részletek: {traceback.format_exc()}")
-        return []
+        return None
 
 
-"Diagram DataFrame előkészítése."
-def _prepare_chart_dataframe(chart_data, selected_table):
-    chart_df = pd.DataFrame(chart_data)
+"Élő követés: csak az utoljára látott mérésnél újabb sorok lekérése és hozzáfűzése."
+@profiled
+def _fetch_live_chart_data(selected_table, db_columns, time_interval):
+    window = TIME_INTERVALS.get(time_interval, timedelta(hours=1))
+    state_key = f"live_chart_window_{selected_table}_{'_'.join(db_columns)}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = LiveChartWindow(selected_table, _get_chart_columns(db_columns), window)
     
-    if selected_table == "dfv_termosztat_db":
-        column_names = ["ID", "Dátum", "Idő", "Belső hőmérséklet (°C)", "Áramerősség (A)", "Teljesítmény (W)", 
-                       "Relatív páratartalom (%)", "Külső páratartalom (g/m³)", "Külső hőmérséklet (°C)"]
-    else:
-        column_names = ["ID", "Dátum", "Idő", "Harmatpont (°C)", "Belső hőmérséklet (°C)", "Áramerősség (A)", 
-                       "Teljesítmény (W)", "Relatív páratartalom (%)", "Külső páratartalom (g/m³)", "Külső hőmérséklet (°C)"]
+    live_window = st.session_state[state_key]
+    try:
+        chart_columns_data = live_window.refresh(window)
+    except Exception as e:
+        st.error(f"Hiba az élő adatok frissítésekor: {e}")
+        return None
     
-    available_columns = min(len(column_names), len(chart_df.columns))
-    chart_df.columns = column_names[:available_columns]
+    if live_window.latest_time is not None:
+        st.caption(f"Élő követés – utolsó mérés: {live_window.latest_time:%Y-%m-%d %H:%M}, "
+                   f"új sorok a legutóbbi frissítés óta: {live_window.last_row_count}")
+    return chart_columns_data
+
+
+"Diagram DataFrame előkészítése."
+def _prepare_chart_dataframe(chart_columns_data, selected_table):
+    if 'timestamp' not in chart_columns_data:
+        return None
     
-    if "Teljesítmény (W)" in chart_df.columns:
-        chart_df["Teljesítmény (W)"] = pd.to_numeric(chart_df["Teljesítmény (W)"], errors='coerce') * 1000
+    chart_df = pd.DataFrame({'Dátum_Idő': chart_columns_data['timestamp']})
+    for display_name, db_column in _get_chart_column_mapping(selected_table).items():
+        if db_column in chart_columns_data:
+            chart_df[display_name] = chart_columns_data[db_column]
     
-    if len(chart_df.columns) >= 3:
-        if 'Dátum' in chart_df.columns and 'Idő' in chart_df.columns:
-            chart_df['Dátum_Idő'] = pd.to_datetime(chart_df['Dátum'].astype(str) + ' ' + chart_df['Idő'].astype(str))
-        else:
-            chart_df['Dátum_Idő'] = pd.to_datetime(chart_df.iloc[:, 1].astype(str) + ' ' + chart_df.iloc[:, 2].astype(str))
-    elif len(chart_df.columns) >= 2:
-        chart_df['Dátum_Idő'] = pd.to_datetime(chart_df.iloc[:, 0].astype(str))
-    else:
-        return None
+    if "Teljesítmény (W)" in chart_df.columns:
+        chart_df["Teljesítmény (W)"] = chart_df["Teljesítmény (W)"] * 1000
     
     return chart_df
 
 
 "Diagram létrehozása Plotly-val."
 def _create_chart(chart_df, selected_column):
+    point_count = len(chart_df)
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=chart_df['Dátum_Idő'],
-        y=chart_df[selected_column],
+    fig.add_trace(create_scatter_trace(
+        chart_df['Dátum_Idő'],
+        chart_df[selected_column],
+        point_count=point_count,
         mode='lines+markers',
         name=selected_column,
         line=dict(width=2),
         marker=dict(size=4)
     ))
+    if 'Minimum' in chart_df.columns and 'Maximum' in chart_df.columns:
+        fig.add_trace(create_scatter_trace(
+            chart_df['Dátum_Idő'],
+            chart_df['Maximum'],
+            point_count=point_count,
+            mode='lines',
+            line=dict(width=0),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+        fig.add_trace(create_scatter_trace(
+            chart_df['Dátum_Idő'],
+            chart_df['Minimum'],
+            point_count=point_count,
+            mode='lines',
+            line=dict(width=0),
+            fill='tonexty',
+            fillcolor='rgba(31,119,180,0.15)',
+            name='Minimum-maximum tartomány',
+            hoverinfo='skip'
+        ))
     fig.update_layout(
         title=f"{selected_column} változása az időben",
         xaxis_title="Dátum és idő",
@@ -334,18 +399,29 @@ def _create_chart(chart_df, selected_column):
 
 "Diagram statisztikák megjelenítése."
 def _display_chart_statistics(chart_df, selected_column):
+    is_aggregated = 'Mérések_száma' in chart_df.columns
+    min_value = chart_df['Minimum'].min() if is_aggregated else chart_df[selected_column].min()
+    max_value = chart_df['Maximum'].max() if is_aggregated else chart_df[selected_column].max()
+    if is_aggregated:
+        mean_value = (chart_df[selected_column] * chart_df['Mérések_száma']).sum() / chart_df['Mérések_száma'].sum()
+        sample_count = int(chart_df['Mérések_száma'].sum())
+    else:
+        mean_value = chart_df[selected_column].mean()
+        sample_count = len(chart_df)
+    
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Minimális érték", f"{chart_df[selected_column].min():.2f}")
+        st.metric("Minimális érték", f"{min_value:.2f}")
     with col2:
-        st.metric("Maximális érték", f"{chart_df[selected_column].max():.2f}")
+        st.metric("Maximális érték", f"{max_value:.2f}")
     with col3:
-        st.metric("Átlag", f"{chart_df[selected_column].mean():.2f}")
+        st.metric("Átlag", f"{mean_value:.2f}")
     with col4:
-        st.metric("Mérések száma", len(chart_df))
+        st.metric("Mérések száma", sample_count)
 
 
 "Diagram szekció megjelenítése."
+@profiled
 def _display_chart_section(df_display, selected_table):
     numeric_columns = []
     for i, col in enumerate(df_display.columns):
@@ -365,7 +441,7 @@ def _display_chart_section(df_display, selected_table):
         selected_column = st.selectbox("Válassz oszlopot a diagramhoz:", numeric_columns, key="chart_column_selector")
     with col2:
         time_interval = st.selectbox("Időintervallum:", 
-                                    ["1 óra", "3 óra", "12 óra", "1 nap", "3 nap", "7 nap", "Egyéni intervallum"],
+                                    ["1 óra", "3 óra", "12 óra", "1 nap", "3 nap", "7 nap", "Teljes időszak", "Egyéni intervallum"],
                                     key="time_interval_selector")
     
     custom_start_date = None
@@ -381,22 +457,46 @@ def _display_chart_section(df_display, selected_table):
             custom_end_date = st.date_input("Végdátum:", value=datetime(2025, 8, 21).date(),
                                            min_value=datetime(2024, 8, 19).date(),
                                            max_value=datetime(2025, 8, 21).date(), key="custom_end_date")
-        
-        if custom_start_date and custom_end_date:
-            cache_key = f"{selected_table}_{time_interval}_{custom_start_date}_{custom_end_date}"
-            if cache_key in st.session_state.chart_data_cache:
-                del st.session_state.chart_data_cache[cache_key]
     
-    chart_data = _fetch_chart_data(selected_table, time_interval, custom_start_date, custom_end_date)
+    live_mode = False
+    if LIVE_MODE_ENABLED and time_interval in TIME_INTERVALS:
+        col5, col6 = st.columns([3, 1])
+        with col5:
+            live_mode = st.toggle("Élő követés", value=True, key="live_mode_toggle")
+        with col6:
+            if live_mode:
+                st.button("🔄 Frissítés", key="live_refresh_button")
+    
+    start_time, end_time = _get_time_range(time_interval, custom_start_date, custom_end_date)
+    if not live_mode and start_time is not None and end_time is not None:
+        level = select_resolution_level(start_time, end_time, raw_from=get_raw_data_start(selected_table))
+        if not level['raw']:
+            chart_df = _fetch_pyramid_chart_data(selected_table, selected_column, level, start_time, end_time)
+            if chart_df is not None:
+                st.caption(f"Felbontás: {level['label']} (min/átlag/max)")
+                fig = _create_chart(chart_df, selected_column)
+                st.plotly_chart(fig, use_container_width=True)
+                st.session_state.chart_generated = True
+                _display_chart_statistics(chart_df, selected_column)
+                return
+    
+    db_column = _get_chart_column_mapping(selected_table).get(selected_column)
+    if db_column is None:
+        st.error(f"A kiválasztott oszlop ({selected_column}) nem létezik az adatokban!")
+        return
+    
+    if live_mode:
+        chart_data = _fetch_live_chart_data(selected_table, [db_column], time_interval)
+    else:
+        chart_data = _fetch_chart_data(selected_table, [db_column], time_interval, custom_start_date, custom_end_date)
     
-    if chart_data and len(chart_data) > 0:
+    if chart_data is not None and len(chart_data.get('timestamp', [])) > 0:
         chart_df = _prepare_chart_dataframe(chart_data, selected_table)
         if chart_df is None:
             st.error("Nincs elegendő oszlop a dátum-idő kombinálásához!")
             return
         
         if selected_column in chart_df.columns:
-            chart_df[selected_column] = pd.to_numeric(chart_df[selected_column], errors='coerce')
             fig = _create_chart(chart_df, selected_column)
             st.plotly_chart(fig, use_container_width=True)
             st.session_state.chart_generated = True
@@ -428,6 +528,7 @@ def _clear_co2_cache_on_change(selected_table):
 
 
 "CO2 adatok betöltése."
+@profiled
 def _load_co2_data(selected_table):
     auto_refresh = ('co2_hourly_dataframe' not in st.session_state) or (st.session_state.co2_cached_table != selected_table)
     
@@ -443,15 +544,15 @@ def _load_co2_data(selected_table):
                 power_co2_pairs = result[3] if len(result) > 3 else None
                 
                 if co2_hourly_df is not None:
-                    st.session_state['co2_hourly_dataframe'] = co2_hourly_df
+                    store_session_frame('co2_hourly_dataframe', co2_hourly_df)
                     st.session_state['co2_cached_days'] = DAYS_TO_SHOW
                     st.session_state['co2_cached_table'] = selected_table
                     
                     if co2_hourly_with_power is not None and daily_co2_df is not None:
-                        st.session_state['co2_hourly_with_power'] = co2_hourly_with_power
-                        st.session_state['co2_daily_dataframe'] = daily_co2_df
+                        store_session_frame('co2_hourly_with_power', co2_hourly_with_power)
+                        store_session_frame('co2_daily_dataframe', daily_co2_df)
                         if power_co2_pairs is not None:
-                            st.session_state['power_co2_pairs'] = power_co2_pairs
+                            store_session_frame('power_co2_pairs', power_co2_pairs)
                     else:
                         st.warning("Nincs energiafogyasztási adat az adatbázisban az időszakra.")
 
@@ -550,6 +651,7 @@ def _display_co2_pagination_controls(total_rows):
 
 
 "CO2 táblázat megjelenítése."
+@profiled
 def _display_co2_table():
     if 'co2_hourly_dataframe' not in st.session_state or st.session_state['co2_hourly_dataframe'] is None:
         return
@@ -583,6 +685,7 @@ def _display_co2_table():
 
 
 "Táblázat adatok lekérdezése adatbázisból."
+@profiled
 def _fetch_table_data(selected_table):
     try:
         current_page_size = st.session_state.global_page_size
@@ -20,15 +20,26 @@ def _load_css():
         pass
     
     
-"E.ON árak státusz megjelenítése."
+"E.ON árak státusz megjelenítése. Az árak lekérése a háttérben fut, ezért az elavultságot jelezzük blokkolás helyett."
 def _display_eon_status():
-    if 'loss_prices' in st.session_state and st.session_state.loss_prices is not None:
-        st.success("✅ Elérhető árak naprakészek")
-    elif 'eon_error' in st.session_state and st.session_state.eon_error:
+    fetched_at = st.session_state.get('eon_prices_fetched_at')
+    fetched_at_text = fetched_at.strftime('%Y-%m-%d %H:%M') if fetched_at else "ismeretlen"
+    
+    if st.session_state.get('eon_prices_available'):
+        if st.session_state.get('eon_prices_stale'):
+            st.warning(f"⚠️ Az árak elavultak lehetnek (utolsó frissítés: {fetched_at_text})")
+        else:
+            st.success(f"✅ Elérhető árak naprakészek (utolsó frissítés: {fetched_at_text})")
+    elif st.session_state.get('eon_prices_refreshing'):
+        st.info("🔄 E.ON árak lekérése folyamatban a háttérben...")
+    elif st.session_state.get('eon_error'):
         st.error(f"❌ E.ON árak lekérése sikertelen: {st.session_state.eon_error}")
     else:
         st.warning("⚠️ E.ON árak nem érhetők el")
     
+    if st.session_state.get('eon_prices_available') and st.session_state.get('eon_prices_refreshing'):
+        st.caption("🔄 Árak frissítése folyamatban a háttérben...")
+    
     
 "Megtakarítás típus session state inicializálása."
 def _initialize_savings_type():
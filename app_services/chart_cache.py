@@ -0,0 +1,127 @@
+import os
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from collections import OrderedDict
+from datetime import datetime
+from app_services.data_version import get_data_version
+
+
+logger = logging.getLogger(__name__)
+
+CHART_CACHE_MAX_BYTES = int(float(os.getenv('DFV_CHART_CACHE_MAX_MB', '256')) * 1024 * 1024)
+CHART_CACHE_TTL_SECONDS = int(os.getenv('DFV_CHART_CACHE_TTL', '900'))
+
+
+def frame_to_columns(frame) -> dict:
+    """Típusos lekérdezési DataFrame átalakítása tömör oszlopos NumPy tömbökké.
+    A szerver oldalon összeállított 'ts' oszlop (vagy a date és time oszlopok) adja a datetime64
+    'timestamp' oszlopot, az id int64, a mérési oszlopok float64 típusúak (NULL helyett NaN)."""
+    columns = {}
+    if 'ts' in frame.columns:
+        columns['timestamp'] = pd.to_datetime(frame['ts']).to_numpy(dtype='datetime64[ns]')
+    elif 'date' in frame.columns and 'time' in frame.columns:
+        columns['timestamp'] = (pd.to_datetime(frame['date']) + pd.to_timedelta(frame['time'].astype(str))) \
+            .to_numpy(dtype='datetime64[ns]')
+    for name in frame.columns:
+        if name in ('ts', 'date', 'time'):
+            continue
+        if name == 'id':
+            columns[name] = frame[name].to_numpy(dtype=np.int64)
+        else:
+            columns[name] = frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+    return columns
+
+
+class ChartDataCache:
+    """Munkamenetek között megosztott, memóriakorlátos LRU cache a diagram adatokhoz.
+    A bejegyzések mérési oszloponként, oszlopos tömbökként tárolódnak (időbélyeg + érték), így
+    oszlopváltáskor csak az új oszlopot kell lekérni. Egy szélesebb cache-elt időtartomány
+    szeleteléssel szolgálja ki a szűkebb kéréseket. A bejegyzések a tábla adatverziójához kötöttek:
+    egy betöltés után (új verzió) a tábla régi bejegyzései nem szolgálnak ki több kérést."""
+
+    def __init__(self, max_bytes: int = CHART_CACHE_MAX_BYTES, ttl_seconds: int = CHART_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_expired(self, entry) -> bool:
+        return time.monotonic() - entry['created_at'] > self.ttl_seconds
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry['size']
+
+    def _slice(self, columns, start_time, end_time) -> dict:
+        timestamps = columns['timestamp']
+        lower = np.searchsorted(timestamps, np.datetime64(start_time, 'ns'), side='left')
+        upper = np.searchsorted(timestamps, np.datetime64(end_time, 'ns'), side='right')
+        return {name: values[lower:upper] for name, values in columns.items()}
+
+    def get(self, table_name: str, column_name: str, start_time: datetime, end_time: datetime):
+        """Visszaadja egy mérési oszlop kért időtartományát egy azt lefedő bejegyzésből, vagy None-t."""
+        data_version = get_data_version(table_name)
+        with self._lock:
+            for key in list(self._entries.keys()):
+                entry = self._entries[key]
+                if self._is_expired(entry) or (key[0] == table_name and entry['data_version'] != data_version):
+                    self._remove(key)
+                    continue
+                cached_table, cached_column, cached_start, cached_end = key
+                if cached_table == table_name and cached_column == column_name and \
+                   cached_start <= start_time and end_time <= cached_end:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._slice(entry['columns'], start_time, end_time)
+            self.misses += 1
+            return None
+
+    def put(self, table_name: str, column_name: str, start_time: datetime, end_time: datetime, columns: dict):
+        """Eltárol egy bejegyzést, majd a legrégebben használtakat kiüríti a memóriakorlát eléréséig."""
+        size = sum(values.nbytes for values in columns.values())
+        if size > self.max_bytes:
+            logger.info(f"A diagram adat ({size} bájt) nagyobb a cache korlátnál, nem kerül tárolásra")
+            return
+
+        key = (table_name, column_name, start_time, end_time)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {'columns': columns, 'size': size, 'created_at': time.monotonic(),
+                                  'data_version': get_data_version(table_name)}
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, table_name: str = None):
+        """Törli a tábla (vagy az összes tábla) bejegyzéseit."""
+        with self._lock:
+            for key in [key for key in self._entries if table_name is None or key[0] == table_name]:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+@st.cache_resource
+def get_chart_cache() -> ChartDataCache:
+    """Visszaadja a folyamat szintű, munkamenetek között megosztott diagram cache példányt."""
+    return ChartDataCache()
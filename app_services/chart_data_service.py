@@ -0,0 +1,114 @@
+import os
+import argparse
+import logging
+import pandas as pd
+import streamlit as st
+from datetime import date, datetime, timedelta
+from app_services.database import execute_query, execute_update
+from app_services.data_version import get_raw_data_start
+from app_services.device_registry import get_devices, get_device_for_table, get_device_tables
+from app_services.measurement_access import map_devices
+from page_modules.database_queries import (
+    get_measurement_columns, create_rollup_table, add_rollup_sum_column, delete_rollup_level,
+    build_rollup_level, get_rollup_series
+)
+
+
+logger = logging.getLogger(__name__)
+
+CHART_PIXEL_WIDTH = int(os.getenv('DFV_CHART_PIXEL_WIDTH', '1200'))
+
+RESOLUTION_LEVELS = [
+    {'name': '15min', 'label': '15 perc', 'seconds': 900, 'raw': True},
+    {'name': '1h', 'label': '1 óra', 'seconds': 3600, 'raw': False},
+    {'name': '6h', 'label': '6 óra', 'seconds': 21600, 'raw': False},
+    {'name': '1d', 'label': '1 nap', 'seconds': 86400, 'raw': False},
+]
+
+
+def _floor_to_bucket(timestamp: datetime, bucket_seconds: int) -> datetime:
+    epoch = datetime(1970, 1, 1)
+    seconds = int((timestamp - epoch).total_seconds())
+    return epoch + timedelta(seconds=seconds - seconds % bucket_seconds)
+
+
+def select_resolution_level(start_time: datetime, end_time: datetime, pixel_width: int = CHART_PIXEL_WIDTH,
+                            raw_from: date = None) -> dict:
+    """Kiválasztja a legdurvább felbontási szintet, amely még legalább egy pontot ad pixelenként
+    a látható időtartományban. Így bármely nagyításnál korlátos számú pont kerül lekérésre.
+    Ha a tartomány a nyers adatok megőrzési határa (raw_from) előtt kezdődik, legalább az órás szint kerül kiválasztásra."""
+    seconds_per_pixel = (end_time - start_time).total_seconds() / max(pixel_width, 1)
+    selected_level = RESOLUTION_LEVELS[0]
+    for level in RESOLUTION_LEVELS:
+        if level['seconds'] <= seconds_per_pixel:
+            selected_level = level
+    if selected_level['raw'] and raw_from is not None and start_time.date() < raw_from:
+        selected_level = next(level for level in RESOLUTION_LEVELS if not level['raw'])
+    return selected_level
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_rollup_series(table_name: str, column_name: str, level_name: str,
+                        start_time: datetime, end_time: datetime, data_version: int = None):
+    """Lekéri egy oszlop aggregált (min/átlag/max) idősorát a megadott szinten.
+    Ha a piramis még nincs felépítve vagy a lekérdezés sikertelen, None értéket ad vissza.
+    A data_version csak a cache kulcs része: új betöltés után a régi eredmény nem kerül kiszolgálásra."""
+    level = next(level for level in RESOLUTION_LEVELS if level['name'] == level_name)
+    bucket_start = _floor_to_bucket(start_time, level['seconds'])
+    try:
+        rows = execute_query(get_rollup_series(
+            table_name, level_name, column_name,
+            bucket_start.strftime('%Y-%m-%d %H:%M:%S'),
+            end_time.strftime('%Y-%m-%d %H:%M:%S')
+        ))
+    except Exception as e:
+        logger.warning(f"A felbontási piramis nem érhető el ({table_name}, {level_name}): {e}")
+        return None
+
+    if not rows:
+        return None
+
+    series_df = pd.DataFrame(rows, columns=['Dátum_Idő', 'Minimum', 'Átlag', 'Maximum', 'Mérések_száma'])
+    series_df['Dátum_Idő'] = pd.to_datetime(series_df['Dátum_Idő'])
+    for col in ['Minimum', 'Átlag', 'Maximum']:
+        series_df[col] = pd.to_numeric(series_df[col], errors='coerce').astype(float)
+    return series_df
+
+
+def build_chart_pyramid(table_name: str, since: datetime = None) -> int:
+    """Felépíti (vagy a megadott időponttól újraépíti) a tábla összes aggregált felbontási szintjét.
+    Az adatmegőrzés által már törölt nyers tartomány aggregátumai nem épülnek újra (a since a vízjelre emelkedik).
+    Visszaadja a beszúrt vödrök számát."""
+    since = since or datetime(1970, 1, 1)
+    raw_from = get_raw_data_start(table_name)
+    if raw_from is not None:
+        since = max(since, datetime.combine(raw_from, datetime.min.time()))
+    columns = get_measurement_columns(table_name)
+    execute_update(create_rollup_table(table_name))
+    execute_update(add_rollup_sum_column(table_name))
+
+    inserted = 0
+    for level in RESOLUTION_LEVELS:
+        if level['raw']:
+            continue
+        level_since = _floor_to_bucket(since, level['seconds']).strftime('%Y-%m-%d %H:%M:%S')
+        execute_update(delete_rollup_level(table_name, level['name'], level_since))
+        inserted += execute_update(build_rollup_level(
+            table_name, level['name'], level['seconds'], columns, level_since
+        ))
+        logger.info(f"{table_name} {level['name']} szint felépítve {level_since} óta")
+    return inserted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diagram felbontási piramis felépítése.")
+    parser.add_argument("--table", action="append", choices=get_device_tables(),
+                        help="Feldolgozandó tábla (alapértelmezés: az összes nyilvántartott, eszközönként párhuzamosan).")
+    parser.add_argument("--since", type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                        help="Újraépítés kezdő dátuma (ÉÉÉÉ-HH-NN). Alapértelmezés: teljes előzmény.")
+    args = parser.parse_args()
+
+    devices = [get_device_for_table(table) for table in args.table] if args.table else get_devices()
+    counts = map_devices(lambda device: build_chart_pyramid(device.table, args.since), devices)
+    for device in devices:
+        print(f"{device.table}: {counts[device.device_id]} aggregált vödör")
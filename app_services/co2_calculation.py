@@ -1,6 +1,7 @@
 import pandas as pd
 from datetime import datetime, timedelta
 from app_services.database import execute_query
+from app_services.rerun_profiler import profiled
 import streamlit as st
 
 "Lekérdezzük az adatbázisban megtalálható első és utolsó dátumot."
@@ -44,10 +45,8 @@ def _create_co2_hourly_df(start_date, end_date, co2_intensity):
 
     "Teljesítmény adatok előkészítése."
 def _prepare_power_df(power_data, heater_power):
-    power_df = pd.DataFrame(power_data, columns=['Dátum', 'Idő', 'Teljesítmény (kW)'])
-    power_df['Dátum'] = pd.to_datetime(power_df['Dátum']).dt.date
-    power_df['Dátum_Idő'] = pd.to_datetime(power_df['Dátum'].astype(str) + ' ' + power_df['Idő'].astype(str))
-    power_df['Teljesítmény (kW)'] = pd.to_numeric(power_df['Teljesítmény (kW)'], errors='coerce').astype(float)
+    power_df = power_data.set_axis(['Dátum_Idő', 'Teljesítmény (kW)'], axis=1)
+    power_df['Dátum'] = power_df['Dátum_Idő'].dt.date
     
     if heater_power is not None and heater_power > 0:
         heater_power_kw = heater_power / 1000.0
@@ -112,7 +111,9 @@ def _calculate_co2_emissions(power_with_co2):
     power_with_co2['Energia (kWh)'] = power_with_co2['Számítási_teljesítmény'] * power_with_co2['Időköz_óra']
     power_with_co2['CO2 (g)'] = power_with_co2['Energia (kWh)'] * power_with_co2['CO2 Kibocsátás (g CO2/kWh)']
     
-    return power_with_co2
+    return power_with_co2.drop(columns=[
+        'Arány', 'Arányosított_teljesítmény', 'Következő_Dátum_Idő', 'Számítási_teljesítmény'
+    ], errors='ignore')
 
 
 "Órás összesített adatok létrehozása."
@@ -165,6 +166,7 @@ def _create_daily_stats(power_with_co2, co2_intensity):
     return daily_co2_df
 
 "Lekéri a CO2 kibocsátási adatokat a CO2 intenzitás alapján, majd összeköti az adatokkal az adatbázisból."
+@profiled
 def fetch_co2_emission_data(days_to_show=10, api_key=None, table_name="dfv_smart_db", heater_power=None):
     co2_intensity = 190.0
     
@@ -172,15 +174,17 @@ def fetch_co2_emission_data(days_to_show=10, api_key=None, table_name="dfv_smart
     co2_hourly_df = _create_co2_hourly_df(start_date, end_date, co2_intensity)
     
     try:
-        from page_modules.database_queries import get_power_data_for_co2
-        power_query = get_power_data_for_co2(
-            table_name, 
-            str(start_date.date()), 
-            str(end_date.date())
-        )
-        power_data = execute_query(power_query)
+        from app_services.device_registry import get_device_for_table
+        from app_services.measurement_access import fetch_measurements, to_wide
+        power_data = to_wide(fetch_measurements(
+            str(start_date.date()),
+            str(end_date.date()),
+            ['power'],
+            [get_device_for_table(table_name)],
+            required=['power']
+        ), {'power': 'power_W'})
         
-        if not power_data:
+        if power_data.empty:
             return co2_hourly_df, None, None, None
         
         power_df = _prepare_power_df(power_data, heater_power)
@@ -0,0 +1,120 @@
+import os
+import time
+import argparse
+import logging
+from datetime import date, timedelta
+from app_services.database import get_db_connection
+from app_services.data_version import forget_data_version
+from app_services.device_registry import get_devices, get_device_for_table, get_device_tables
+from app_services.measurement_access import map_devices
+from app_services.chart_data_service import RESOLUTION_LEVELS
+from app_services.snapshot_export import month_starts, fetch_month_frame, prepare_frame, write_partition, get_partition_dir
+from app_services.table_partitioning import is_partitioned
+from page_modules.database_queries import (
+    get_measurement_columns, get_date_bounds, get_partition_name, create_rollup_table, add_rollup_sum_column,
+    delete_rollup_level, build_rollup_level, create_retention_table, set_raw_data_start, count_rows_before,
+    delete_rows_before, create_data_version_table, advance_data_version
+)
+
+
+logger = logging.getLogger(__name__)
+
+RAW_RETENTION_DAYS = int(os.getenv('DFV_RAW_RETENTION_DAYS', '365'))
+ARCHIVE_DIR = os.getenv('DFV_ARCHIVE_DIR', os.path.join('data', 'archive'))
+
+
+def get_retention_cutoff(retention_days: int = RAW_RETENTION_DAYS, today: date = None) -> date:
+    """A nyers sorok megőrzési határa: a retention_days nappal korábbi nap hónapjának első napja. A hónaphatár
+    miatt havi partícionált táblánál teljes partíciók dobhatók el, és minden aggregált vödör határra esik."""
+    day = (today or date.today()) - timedelta(days=retention_days)
+    return day.replace(day=1)
+
+
+def archive_raw_months(table_name: str, first_day: date, cutoff: date, archive_dir: str = ARCHIVE_DIR,
+                       cursor=None) -> int:
+    """A cutoff előtti hónapok nyers sorainak mentése havi Parquet fájlokba (a pillanatkép export
+    elrendezésével, így az archívum DuckDB-vel ugyanúgy olvasható). A cursor a törlő tranzakcióé, így az
+    archívum pontosan a törölt sorokat tartalmazza. Visszaadja az archivált sorok számát."""
+    archived_rows = 0
+    for month in month_starts(first_day, cutoff - timedelta(days=1)):
+        frame = fetch_month_frame(table_name, month, cursor)
+        if frame.empty:
+            continue
+        write_partition(prepare_frame(frame), get_partition_dir(table_name, month, archive_dir))
+        archived_rows += len(frame)
+        logger.info(f"{table_name} {month:%Y-%m}: {len(frame)} sor archiválva")
+    return archived_rows
+
+
+def apply_retention(table_name: str, retention_days: int = RAW_RETENTION_DAYS, archive: bool = False,
+                    archive_dir: str = ARCHIVE_DIR) -> dict:
+    """A megőrzési határnál régebbi nyers sorok kiváltása aggregátumokkal, egyetlen tranzakcióban: a határ
+    előtti tartomány aggregált szintjei (órás, 6 órás, napi; min/átlag/max/összeg) a nyers sorokból újraépülnek,
+    majd a nyers sorok törlődnek (havi partícionált táblánál a teljes havi partíciók), és a vízjel a határra
+    lép. A lekérdezés builderek a vízjel előtti tartományt ezután az órás aggregátumokból szolgálják ki.
+    archive esetén a törlendő hónapok a zárolás után, ugyanabban a tranzakcióban Parquet fájlba kerülnek, így
+    az archiválás és a törlés között beérkező késő sorok sem vesznek el."""
+    cutoff = get_retention_cutoff(retention_days)
+    result = {"table": table_name, "cutoff": cutoff, "archived": 0, "purged": 0}
+    db = get_db_connection()
+    first_day, _ = db.execute_query(get_date_bounds(table_name))[0]
+    if first_day is None or first_day >= cutoff:
+        return result
+
+    until = cutoff.isoformat()
+    columns = get_measurement_columns(table_name)
+    partitioned = is_partitioned(table_name)
+    with db.get_connection() as conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {table_name} IN SHARE ROW EXCLUSIVE MODE")
+                cursor.execute(get_date_bounds(table_name))
+                first_day = min(first_day, cursor.fetchone()[0] or first_day)
+                since = first_day.isoformat()
+                if archive:
+                    result["archived"] = archive_raw_months(table_name, first_day, cutoff, archive_dir, cursor)
+                cursor.execute(create_rollup_table(table_name))
+                cursor.execute(add_rollup_sum_column(table_name))
+                for level in RESOLUTION_LEVELS:
+                    if level['raw']:
+                        continue
+                    cursor.execute(delete_rollup_level(table_name, level['name'], since, until))
+                    cursor.execute(build_rollup_level(table_name, level['name'], level['seconds'], columns, since, until))
+
+                cursor.execute(count_rows_before(table_name, until))
+                result["purged"] = cursor.fetchone()[0]
+                if partitioned:
+                    for month in month_starts(first_day, cutoff - timedelta(days=1)):
+                        cursor.execute(f"DROP TABLE IF EXISTS {get_partition_name(table_name, month)}")
+                cursor.execute(delete_rows_before(table_name, until))
+
+                cursor.execute(create_retention_table())
+                cursor.execute(set_raw_data_start(table_name, until))
+                cursor.execute(create_data_version_table())
+                cursor.execute(advance_data_version(table_name, since, until))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    forget_data_version(table_name)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Régi nyers mérések kiváltása órás/napi aggregátumokkal (adatmegőrzés).")
+    parser.add_argument("--table", choices=get_device_tables(),
+                        help="Csak ezt a táblát kezeli (alapértelmezés: az összes nyilvántartottat, eszközönként párhuzamosan).")
+    parser.add_argument("--retention-days", type=int, default=RAW_RETENTION_DAYS,
+                        help="A nyers sorok megőrzési ideje napokban (a határ hónap elejére kerekedik).")
+    parser.add_argument("--archive", action="store_true", help="A törlendő hónapok mentése Parquet fájlokba.")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Az archívum könyvtára.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    devices = [get_device_for_table(args.table)] if args.table else get_devices()
+    results = map_devices(lambda device: apply_retention(device.table, args.retention_days, args.archive, args.archive_dir), devices)
+    for result in results.values():
+        print(f"{result['table']}: határ {result['cutoff']}, {result['purged']} nyers sor kiváltva, "
+              f"{result['archived']} archiválva")
+    print(f"Összesen {time.perf_counter() - started:.1f} s")
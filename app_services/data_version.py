@@ -0,0 +1,95 @@
+import os
+import time
+import logging
+import threading
+from typing import Optional
+from datetime import date
+from app_services.database import execute_query
+from app_services.duckdb_backend import QUERY_BACKEND
+from page_modules.database_queries import get_table_exists
+from page_modules.database_queries import get_data_version as get_data_version_query
+from page_modules.database_queries import get_raw_data_start as get_raw_data_start_query
+
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_TTL_SECONDS = int(os.getenv('DFV_DATA_VERSION_TTL', '30'))
+
+VERSION_TABLE = 'dfv_data_versions'
+RETENTION_TABLE = 'dfv_retention_watermarks'
+
+_versions = {}
+_versions_lock = threading.Lock()
+_existing_tables = set()
+
+
+def _table_exists(table_name: str) -> bool:
+    """A vízjel tábla létezésének ellenőrzése to_regclass-szal (a hiányzó tábla nem hiba: a verzió tábla az első
+    betöltéskor, a megőrzési tábla az első adatmegőrzéskor jön létre). A pozitív választ a folyamat megjegyzi."""
+    if table_name in _existing_tables:
+        return True
+    rows = execute_query(get_table_exists(table_name))
+    if rows and rows[0][0]:
+        _existing_tables.add(table_name)
+        return True
+    return False
+
+
+def _lookup(table_name: str, query: str, parse):
+    if not _table_exists(table_name):
+        return parse([])
+    return parse(execute_query(query))
+
+
+def _cached_lookup(key: tuple, watermark_table: str, query: str, parse):
+    now = time.monotonic()
+    with _versions_lock:
+        cached = _versions.get(key)
+        if cached is not None and now - cached[1] < DATA_VERSION_TTL_SECONDS:
+            return cached[0]
+
+    if QUERY_BACKEND == 'duckdb':
+        # A pillanatkép nem tartalmazza a vízjel táblákat; a PostgreSQL ilyenkor nem feltétlenül érhető el.
+        value = None
+    else:
+        try:
+            value = _lookup(watermark_table, query, parse)
+        except Exception as e:
+            logger.debug(f"A vízjel nem kérdezhető le ({key[1]}): {e}")
+            value = None
+
+    with _versions_lock:
+        _versions[key] = (value, now)
+    return value
+
+
+def get_data_version(table_name: str) -> Optional[int]:
+    """A tábla betöltésenként léptetett adatverziója (watermark). Az értéket DATA_VERSION_TTL_SECONDS
+    másodpercig a folyamatban tárolja, hogy a cache ellenőrzés ne jelentsen lekérdezést minden újrafuttatásnál.
+    Ha még nem volt betöltés, 0; ha az adatbázis nem érhető el vagy a DuckDB pillanatkép szolgálja ki az
+    olvasásokat, None-t ad (ilyenkor a cache-ek csak a TTL-jükre hagyatkoznak)."""
+    return _cached_lookup(('version', table_name), VERSION_TABLE, get_data_version_query(table_name),
+                          lambda rows: int(rows[0][0]) if rows else 0)
+
+
+def get_raw_data_start(table_name: str) -> Optional[date]:
+    """Az első nap, amelytől a tábla nyers sorai megvannak (adatmegőrzési vízjel), ugyanazzal a tárolási idővel.
+    None, ha a táblára még nem futott adatmegőrzés (minden nyers sor megvan)."""
+    return _cached_lookup(('raw_from', table_name), RETENTION_TABLE, get_raw_data_start_query(table_name),
+                          lambda rows: rows[0][0] if rows else None)
+
+
+def read_raw_data_start(table_name: str) -> Optional[date]:
+    """Az adatmegőrzési vízjel tárolás nélkül, a lekérdezési háttértől függetlenül a PostgreSQL-ből (a betöltéshez,
+    amelynek a pontos határ kell)."""
+    return _lookup(RETENTION_TABLE, get_raw_data_start_query(table_name), lambda rows: rows[0][0] if rows else None)
+
+
+def forget_data_version(table_name: str = None):
+    """A tárolt verzió és vízjel eldobása (pl. egy ugyanebben a folyamatban végzett betöltés után)."""
+    with _versions_lock:
+        if table_name is None:
+            _versions.clear()
+        else:
+            _versions.pop(('version', table_name), None)
+            _versions.pop(('raw_from', table_name), None)
@@ -1,14 +1,29 @@
+import io
 import os
+import time
+import uuid
 import psycopg2
+import pandas as pd
 import streamlit as st
 from contextlib import contextmanager
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 import logging
+from app_services.query_metrics import record_query
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+FLOAT_TYPE_OIDS = {700, 701, 1700}
+INTEGER_TYPE_OIDS = {20, 21, 23}
+DATE_TYPE_OIDS = {1082, 1114, 1184}
+STREAM_ITERSIZE = int(os.getenv('DFV_DB_STREAM_ITERSIZE', '20000'))
+
+
+def _text_size(rows) -> int:
+    """A sorok szöveges (PostgreSQL szöveges protokoll szerinti) mérete, az átvitt bájtok becsléséhez."""
+    return sum(len(str(value)) for row in rows for value in row if value is not None)
+
 
 class DatabaseConnection:
     
@@ -75,24 +90,104 @@ class DatabaseConnection:
             logger.error(f"A csatlakozási teszt sikertelen: {e}")
             return False
     
+    def _explain(self, bound_query: str) -> list:
+        """EXPLAIN (ANALYZE, BUFFERS) terv sorai egy lassú lekérdezéshez, külön kapcsolaton."""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {bound_query}")
+                return [row[0] for row in cursor.fetchall()]
+    
+    def _record(self, cursor, kind: str, query: str, params, seconds: float, rows: int, transferred_bytes: int):
+        bound_query = cursor.mogrify(query, params).decode() if params else query
+        record_query(query, bound_query, kind, seconds, rows, transferred_bytes, self._explain)
+    
     def execute_query(self, query: str, params: Optional[tuple] = None) -> Any:
-        """SELECT lekérdezés végrehajtása. Végrehajtja a megadott SQL lekérdezést paraméterekkel, majd visszaadja az összes eredményt."""
+        """SELECT lekérdezés végrehajtása. Végrehajtja a megadott SQL lekérdezést paraméterekkel, majd visszaadja az összes eredményt.
+        Az időtartamot, a sorok számát és az átvitt adatmennyiséget a lekérdezés metrikák rögzítik."""
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
+                    started = time.perf_counter()
                     cursor.execute(query, params)
-                    return cursor.fetchall()
+                    rows = cursor.fetchall()
+                    self._record(cursor, 'select', query, params, time.perf_counter() - started, len(rows), _text_size(rows))
+                    return rows
+        except Exception as e:
+            logger.error(f"Lekérdezési hiba: {e}")
+            raise
+    
+    def fetch_frame(self, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
+        """SELECT lekérdezés eredménye típusos, oszlopos DataFrame-ként. A sorok Python tuple-ök helyett
+        COPY ... TO STDOUT CSV folyamként érkeznek és a pandas C feldolgozója olvassa be őket: a numerikus
+        oszlopok float64, az egész oszlopok Int64, a dátum és időbélyeg oszlopok datetime64 típusúak,
+        az idő oszlopok "ÓÓ:PP:MM" szövegként maradnak."""
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    started = time.perf_counter()
+                    bound_query = cursor.mogrify(query, params).decode() if params else query
+                    bound_query = bound_query.strip().rstrip(';')
+                    cursor.execute(f"SELECT * FROM ({bound_query}) AS result_frame LIMIT 0")
+                    column_types = {column.name: column.type_code for column in cursor.description}
+                    
+                    buffer = io.StringIO()
+                    cursor.copy_expert(f"COPY ({bound_query}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+                    payload_size = buffer.tell()
+                    buffer.seek(0)
+                    row_count = max(0, cursor.rowcount)
+                    self._record(cursor, 'copy', query, params, time.perf_counter() - started, row_count, payload_size)
         except Exception as e:
             logger.error(f"Lekérdezési hiba: {e}")
             raise
+        
+        dtypes = {}
+        for name, type_code in column_types.items():
+            if type_code in FLOAT_TYPE_OIDS:
+                dtypes[name] = 'float64'
+            elif type_code in INTEGER_TYPE_OIDS:
+                dtypes[name] = 'Int64'
+            elif type_code not in DATE_TYPE_OIDS:
+                dtypes[name] = 'object'
+        date_columns = [name for name, type_code in column_types.items() if type_code in DATE_TYPE_OIDS]
+        return pd.read_csv(buffer, dtype=dtypes, parse_dates=date_columns, keep_default_na=False, na_values=[''])
+    
+    def stream_frames(self, query: str, params: Optional[tuple] = None,
+                      itersize: int = STREAM_ITERSIZE) -> Iterator[pd.DataFrame]:
+        """SELECT lekérdezés eredménye itersize soros, típusos DataFrame darabokban. Szerver oldali (nevesített)
+        kurzort használ, így a kliens egyszerre csak egy darabot tart memóriában, az időtartománytól függetlenül."""
+        with self.get_connection() as conn:
+            with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = itersize
+                started = time.perf_counter()
+                fetch_seconds, row_count, transferred_bytes = 0.0, 0, 0
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(itersize)
+                    fetch_seconds += time.perf_counter() - started
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    transferred_bytes += _text_size(rows)
+                    column_types = {column.name: column.type_code for column in cursor.description}
+                    frame = pd.DataFrame(rows, columns=list(column_types))
+                    for name, type_code in column_types.items():
+                        if type_code in FLOAT_TYPE_OIDS:
+                            frame[name] = pd.to_numeric(frame[name], errors='coerce').astype('float64')
+                        elif type_code in DATE_TYPE_OIDS:
+                            frame[name] = pd.to_datetime(frame[name])
+                    yield frame
+                    started = time.perf_counter()
+                self._record(cursor, 'stream', query, params, fetch_seconds, row_count, transferred_bytes)
     
     def execute_insert(self, query: str, params: Optional[tuple] = None) -> int:
         """INSERT lekérdezés végrehajtása. Beszúr egy vagy több rekordot az adatbázisba a megadott SQL lekérdezéssel és paraméterekkel."""
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
+                    started = time.perf_counter()
                     cursor.execute(query, params)
                     conn.commit()
+                    self._record(cursor, 'insert', query, params, time.perf_counter() - started, cursor.rowcount, 0)
                     return cursor.rowcount
         except Exception as e:
             logger.error(f"Hiba: {e}")
@@ -103,8 +198,10 @@ class DatabaseConnection:
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
+                    started = time.perf_counter()
                     cursor.execute(query, params)
                     conn.commit()
+                    self._record(cursor, 'update', query, params, time.perf_counter() - started, cursor.rowcount, 0)
                     return cursor.rowcount
         except Exception as e:
             logger.error(f"Hiba: {e}")
@@ -125,8 +222,42 @@ def test_db_connection():
 
 
 def execute_query(query: str, params: Optional[tuple] = None):
-    """SELECT lekérdezés végrehajtása."""
-    return db.execute_query(query, params)
+    """SELECT lekérdezés végrehajtása. DFV_QUERY_BACKEND=duckdb esetén a pillanatképben elérhető
+    táblákra vonatkozó lekérdezések a helyi DuckDB motoron futnak, a többi a PostgreSQL-en."""
+    from app_services.duckdb_backend import get_duckdb_backend
+    from app_services.rerun_profiler import track_query
+    duckdb_backend = get_duckdb_backend()
+    with track_query('execute_query', query) as result_rows:
+        if duckdb_backend is not None and duckdb_backend.can_serve(query):
+            result = duckdb_backend.execute_query(query, params)
+        else:
+            result = db.execute_query(query, params)
+        result_rows.append(len(result))
+    return result
+
+
+def fetch_frame(query: str, params: Optional[tuple] = None) -> pd.DataFrame:
+    """SELECT lekérdezés végrehajtása típusos DataFrame eredménnyel, az execute_query-vel azonos útválasztással."""
+    from app_services.duckdb_backend import get_duckdb_backend
+    from app_services.rerun_profiler import track_query
+    duckdb_backend = get_duckdb_backend()
+    with track_query('fetch_frame', query) as result_rows:
+        if duckdb_backend is not None and duckdb_backend.can_serve(query):
+            frame = duckdb_backend.fetch_frame(query, params)
+        else:
+            frame = db.fetch_frame(query, params)
+        result_rows.append(len(frame))
+    return frame
+
+
+def stream_frames(query: str, params: Optional[tuple] = None, itersize: int = STREAM_ITERSIZE) -> Iterator[pd.DataFrame]:
+    """SELECT lekérdezés eredménye típusos DataFrame darabokban, az execute_query-vel azonos útválasztással."""
+    from app_services.duckdb_backend import get_duckdb_backend
+    from app_services.rerun_profiler import track_stream
+    duckdb_backend = get_duckdb_backend()
+    if duckdb_backend is not None and duckdb_backend.can_serve(query):
+        return track_stream(query, duckdb_backend.stream_frames(query, params, itersize))
+    return track_stream(query, db.stream_frames(query, params, itersize))
 
 
 def execute_insert(query: str, params: Optional[tuple] = None):
@@ -0,0 +1,145 @@
+import os
+import json
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+DEVICE_REGISTRY_FILE = os.getenv('DFV_DEVICE_REGISTRY', os.path.join('data', 'devices.json'))
+
+DEVICE_KINDS = {
+    'smart': "Dinamikus fűtésvezérlő",
+    'thermostat': "Termosztátos vezérlő",
+}
+
+COLUMN_LABELS = {
+    'dew_point': "Harmatpont (°C)",
+    'temp': "Belső hőmérséklet (°C)",
+    'current': "Áramerősség (A)",
+    'power': "Teljesítmény (W)",
+    'humidity': "Relatív páratartalom (%)",
+    'external_humidity': "Külső páratartalom (g/m³)",
+    'external_temp': "Külső hőmérséklet (°C)",
+}
+
+REQUIRED_ROLES = ('power', 'current', 'temp', 'humidity', 'external_temp', 'external_humidity')
+
+DEFAULT_DEVICES = [
+    {
+        'device_id': 'smart',
+        'kind': 'smart',
+        'table': 'dfv_smart_db',
+        'display_name': "Dinamikus fűtésvezérlő",
+        'columns': {
+            'dew_point': 'trend_smart_dp',
+            'temp': 'trend_smart_t',
+            'current': 'trend_smart_i1',
+            'power': 'trend_smart_p',
+            'humidity': 'trend_smart_rh',
+            'external_humidity': 'trend_kulso_paratartalom',
+            'external_temp': 'trend_kulso_homerseklet_pillanatnyi',
+        },
+    },
+    {
+        'device_id': 'thermostat',
+        'kind': 'thermostat',
+        'table': 'dfv_termosztat_db',
+        'display_name': "Termosztátos vezérlő",
+        'columns': {
+            'temp': 'trend_termosztat_t',
+            'current': 'trend_termosztat_i1',
+            'power': 'trend_termosztat_p',
+            'humidity': 'trend_termosztat_rh',
+            'external_humidity': 'trend_kulso_paratartalom',
+            'external_temp': 'trend_kulso_homerseklet_pillanatnyi',
+        },
+    },
+]
+
+
+class Device:
+    """Egy vezérlő a nyilvántartásban: azonosító, típus (smart / thermostat), mérési tábla, és a szerepkörök
+    (power, current, temp, ...) oszlopnevei. A columns sorrendje egyben a mérési oszlopok sorrendje."""
+
+    def __init__(self, device_id: str, kind: str, table: str, columns: dict, display_name: str = None):
+        if kind not in DEVICE_KINDS:
+            raise ValueError(f"Ismeretlen eszköz típus ({device_id}): {kind}")
+        missing_roles = [role for role in REQUIRED_ROLES if role not in columns]
+        if missing_roles:
+            raise ValueError(f"Hiányzó oszlop szerepkörök ({device_id}): {', '.join(missing_roles)}")
+        self.device_id = device_id
+        self.kind = kind
+        self.table = table
+        self.columns = dict(columns)
+        self.display_name = display_name or f"{DEVICE_KINDS[kind]} ({device_id})"
+
+    def column(self, role: str) -> str:
+        return self.columns[role]
+
+    @property
+    def measurement_columns(self) -> list:
+        return list(self.columns.values())
+
+    def column_labels(self) -> dict:
+        """Megjelenített oszlopnév -> adatbázis oszlop, a mérési oszlopok sorrendjében."""
+        return {COLUMN_LABELS.get(role, role): column for role, column in self.columns.items()}
+
+    def __repr__(self):
+        return f"Device({self.device_id!r}, {self.kind!r}, {self.table!r})"
+
+
+_devices = None
+_devices_lock = threading.Lock()
+
+
+def load_devices(path: str = DEVICE_REGISTRY_FILE) -> list:
+    """Az eszköz nyilvántartás betöltése egy JSON fájlból (eszköz objektumok listája a DEFAULT_DEVICES
+    szerkezetével). Ha a fájl nem létezik, a két eredeti vezérlő az alapértelmezés."""
+    if not os.path.exists(path):
+        entries = DEFAULT_DEVICES
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    devices = [Device(entry['device_id'], entry['kind'], entry['table'], entry['columns'], entry.get('display_name'))
+               for entry in entries]
+    device_ids = [device.device_id for device in devices]
+    if len(set(device_ids)) != len(device_ids):
+        raise ValueError("Az eszköz azonosítóknak egyedinek kell lenniük")
+    return devices
+
+
+def get_devices(kind: str = None) -> list:
+    """A nyilvántartott eszközök (a folyamatban egyszer betöltve), opcionálisan típus szerint szűrve."""
+    global _devices
+    with _devices_lock:
+        if _devices is None:
+            _devices = load_devices()
+            logger.info(f"Eszköz nyilvántartás: {', '.join(device.device_id for device in _devices)}")
+        devices = _devices
+    return [device for device in devices if kind is None or device.kind == kind]
+
+
+def get_device(device_id: str) -> Device:
+    for device in get_devices():
+        if device.device_id == device_id:
+            return device
+    raise KeyError(f"Ismeretlen eszköz: {device_id}")
+
+
+def get_device_for_table(table_name: str) -> Device:
+    """Az eszköz, amelynek mérési táblája table_name. A származtatott táblanevek (pl. benchmark másolatok)
+    a leghosszabb egyező előtag szerint oldódnak fel."""
+    devices = get_devices()
+    for device in devices:
+        if device.table == table_name:
+            return device
+    prefixed = [device for device in devices if table_name.startswith(device.table)]
+    if not prefixed:
+        raise KeyError(f"A táblához nincs nyilvántartott eszköz: {table_name}")
+    return max(prefixed, key=lambda device: len(device.table))
+
+
+def get_device_tables() -> list:
+    """Az összes nyilvántartott mérési tábla (a parancssori eszközök táblaválasztójához)."""
+    return list(dict.fromkeys(device.table for device in get_devices()))
@@ -0,0 +1,149 @@
+import os
+import re
+import glob
+import logging
+import threading
+import time
+from datetime import time as dt_time
+from typing import Optional, Any
+from app_services.query_metrics import record_query
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+QUERY_BACKEND = os.getenv('DFV_QUERY_BACKEND', 'postgres').lower()
+SNAPSHOT_DIR = os.getenv('DFV_SNAPSHOT_DIR', os.path.join('data', 'snapshots'))
+
+TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)', re.IGNORECASE)
+DATE_FUNCTION = re.compile(r'\bDATE\(\s*([A-Za-z_][A-Za-z0-9_.]*)\s*\)', re.IGNORECASE)
+
+
+def translate_query(query: str) -> str:
+    """A PostgreSQL lekérdezések DuckDB-ben eltérő elemeinek átírása: DATE(x) -> CAST(x AS DATE),
+    a psycopg2 %s paraméterjelölők pedig ?-re cserélődnek."""
+    query = DATE_FUNCTION.sub(r'CAST(\1 AS DATE)', query)
+    return query.replace('%s', '?')
+
+
+class DuckDBBackend:
+    """A havi Parquet pillanatképeken futó, helyi (beágyazott) DuckDB lekérdezési motor. Minden exportált
+    táblához egy azonos nevű nézetet hoz létre, így a meglévő lekérdezések változtatás nélkül futnak."""
+
+    def __init__(self, snapshot_dir: str = SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        self._connection = duckdb.connect(database=':memory:')
+        self._lock = threading.Lock()
+        self.tables = set()
+        self._register_views()
+
+    def _register_views(self):
+        for table_dir in sorted(glob.glob(os.path.join(self.snapshot_dir, '*'))):
+            table_name = os.path.basename(table_dir)
+            pattern = os.path.join(table_dir, 'month=*', '*.parquet')
+            if not glob.glob(pattern):
+                continue
+            self._connection.execute(
+                f"CREATE OR REPLACE VIEW {table_name} AS "
+                f"SELECT * EXCLUDE (month) FROM read_parquet('{pattern}', hive_partitioning = true)"
+            )
+            self.tables.add(table_name)
+        logger.info(f"DuckDB pillanatkép táblák: {', '.join(sorted(self.tables)) or 'nincs'}")
+
+    def can_serve(self, query: str) -> bool:
+        """Igaz, ha a lekérdezés minden hivatkozott táblája elérhető a pillanatképben."""
+        referenced_tables = set(TABLE_REFERENCE.findall(query))
+        return bool(referenced_tables) and referenced_tables <= self.tables
+
+    def _explain(self, query: str) -> list:
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            rows = cursor.execute(f"EXPLAIN ANALYZE {translate_query(query)}").fetchall()
+        finally:
+            cursor.close()
+        return [line for row in rows for line in str(row[-1]).splitlines()]
+
+    def _record(self, kind: str, query: str, seconds: float, rows: int):
+        record_query(query, query, kind, seconds, rows, None, self._explain, backend='duckdb')
+
+    def execute_query(self, query: str, params: Optional[tuple] = None) -> Any:
+        """SELECT lekérdezés végrehajtása a pillanatképen. Szálanként külön kurzort használ. A lekérdezés a
+        metrikákban 'duckdb' háttérrel rögzül."""
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            started = time.perf_counter()
+            rows = cursor.execute(translate_query(query), params).fetchall()
+            self._record('select', query, time.perf_counter() - started, len(rows))
+            return rows
+        finally:
+            cursor.close()
+
+    def fetch_frame(self, query: str, params: Optional[tuple] = None):
+        """SELECT lekérdezés eredménye DataFrame-ként, a PostgreSQL fetch_frame-mel azonos típusokkal
+        (az idő oszlopok "ÓÓ:PP:MM" szövegként)."""
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            started = time.perf_counter()
+            frame = cursor.execute(translate_query(query), params).df()
+            self._record('fetch_frame', query, time.perf_counter() - started, len(frame))
+        finally:
+            cursor.close()
+        for name in frame.columns[frame.dtypes == object]:
+            first_value = frame[name].dropna().head(1)
+            if len(first_value) and isinstance(first_value.iloc[0], dt_time):
+                frame[name] = frame[name].astype(str)
+        return frame
+
+    def stream_frames(self, query: str, params: Optional[tuple] = None, itersize: int = 20000):
+        """SELECT lekérdezés eredménye DataFrame darabokban. A DuckDB 2048 soros vektorokban adja vissza
+        az eredményt, ezért egy darab itersize-hoz legközelebbi vektorszámot tartalmaz."""
+        with self._lock:
+            cursor = self._connection.cursor()
+        seconds, rows = 0.0, 0
+        try:
+            started = time.perf_counter()
+            result = cursor.execute(translate_query(query), params)
+            seconds += time.perf_counter() - started
+            vectors_per_chunk = max(1, itersize // 2048)
+            while True:
+                started = time.perf_counter()
+                frame = result.fetch_df_chunk(vectors_per_chunk)
+                seconds += time.perf_counter() - started
+                if frame.empty:
+                    break
+                rows += len(frame)
+                yield frame
+        finally:
+            cursor.close()
+            self._record('stream_frames', query, seconds, rows)
+
+    def refresh(self):
+        """Újraolvassa a pillanatkép könyvtárat (pl. egy új export után)."""
+        with self._lock:
+            self.tables = set()
+            self._register_views()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_duckdb_backend() -> Optional[DuckDBBackend]:
+    """Visszaadja a DuckDB motort, ha a DFV_QUERY_BACKEND=duckdb és a duckdb telepítve van, egyébként None-t."""
+    global _backend
+    if QUERY_BACKEND != 'duckdb':
+        return None
+    with _backend_lock:
+        if _backend is None:
+            if duckdb is None:
+                logger.warning("DFV_QUERY_BACKEND=duckdb, de a duckdb csomag nincs telepítve; PostgreSQL használata")
+                return None
+            _backend = DuckDBBackend()
+        return _backend
@@ -1,87 +1,288 @@
-import streamlit as st
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import os
+import re
+import sys
 import time
+import atexit
+import logging
+import argparse
+import threading
 
-"""Chrome driver beállítása."""
+
+logger = logging.getLogger(__name__)
+
+EON_PRICES_URL = "https://www.eon.hu/hu/lakossagi/aram/arak.html"
+EON_SCRAPER_BACKEND = os.getenv('DFV_EON_SCRAPER_BACKEND', 'auto')
+EON_HTTP_TIMEOUT = float(os.getenv('DFV_EON_HTTP_TIMEOUT', '15'))
+EON_PRICE_YEARS = ('2024', '2025')
+EON_LOSS_PRICE_LABEL = 'veszteség'
+EON_PRICE_COLUMN_INDEX = 2
+
+PRICE_PATTERN = re.compile(r'\d+(?:[.\s]\d{3})*,\d+\s*Ft/kWh')
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept-Language': 'hu-HU,hu;q=0.9'
+}
+
+EON_LOSS_PRICE_XPATHS = {
+    '2024': "/html/body/eon-ui-page-wrapper/main/div/eon-ui-section/eon-ui-grid-control/eon-ui-grid-control-column/eon-ui-grid-control/eon-ui-grid-control-column[1]/div[4]/table/tbody/tr[18]/td[3]",
+    '2025': "/html/body/eon-ui-page-wrapper/main/div/eon-ui-section/eon-ui-grid-control/eon-ui-grid-control-column/eon-ui-grid-control/eon-ui-grid-control-column[1]/div[4]/table/tbody/tr[19]/td[3]"
+}
+SELENIUM_BROWSER_LIFETIME = float(os.getenv('DFV_SELENIUM_BROWSER_LIFETIME', '900'))
+SELENIUM_IDLE_TIMEOUT = float(os.getenv('DFV_SELENIUM_IDLE_TIMEOUT', '120'))
+SELENIUM_WAIT_TIMEOUT = float(os.getenv('DFV_SELENIUM_WAIT_TIMEOUT', '15'))
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+"""A chromedriver elérési útja. A ChromeDriverManager().install() hálózati ellenőrzést végez, ezért csak egyszer fut
+folyamatonként; a DFV_CHROMEDRIVER_PATH változóval előre telepített driver is megadható."""
+def _get_driver_path():
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = os.getenv('DFV_CHROMEDRIVER_PATH')
+            if not _driver_path:
+                from webdriver_manager.chrome import ChromeDriverManager
+                _driver_path = ChromeDriverManager().install()
+        return _driver_path
+
+"""Chrome driver beállítása. A selenium csak itt töltődik be, hogy a modul importálása olcsó maradjon."""
 def _setup_chrome_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     chrome_options = Options()
     chrome_options.add_argument('--headless')
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
-    service = Service(ChromeDriverManager().install())
+    service = Service(_get_driver_path())
     return webdriver.Chrome(service=service, options=chrome_options)
 
-"""Ár lekérése az adott XPath alapján."""
-def _scrape_price(driver, xpath):
-    try:
-        element = driver.find_element(By.XPATH, xpath)
-        return element.text
-    except Exception as e:
-        st.error(f"Hiba az ár lekérésekor ({xpath}): {e}")
-        return None
-
-"""Várakozás az oldal betöltésére."""
-def _wait_for_page_load(driver):
-    WebDriverWait(driver, 15).until(
-        EC.presence_of_element_located((By.TAG_NAME, "body"))
-    )
-    time.sleep(3)
-
-
-@st.cache_data(ttl=2600000)
-def scrape_eon_prices():
-    """Lekéri az E.ON veszteségi árait 2024-re és 2025-re."""
-    xpath_2024 = "/html/body/eon-ui-page-wrapper/main/div/eon-ui-section/eon-ui-grid-control/eon-ui-grid-control-column/eon-ui-grid-control/eon-ui-grid-control-column[1]/div[4]/table/tbody/tr[18]/td[3]"
-    xpath_2025 = "/html/body/eon-ui-page-wrapper/main/div/eon-ui-section/eon-ui-grid-control/eon-ui-grid-control-column/eon-ui-grid-control/eon-ui-grid-control-column[1]/div[4]/table/tbody/tr[19]/td[3]"
-    
-    driver = None
+
+class SeleniumScraperWorker:
+    """Egyetlen, újrahasznosított headless böngésző a Selenium alapú lekérésekhez. A böngésző legfeljebb
+    SELENIUM_BROWSER_LIFETIME másodpercig él, SELENIUM_IDLE_TIMEOUT másodperc tétlenség után bezáródik.
+    Fix várakozás helyett a keresett elemek megjelenésére vár, és egy munkamenetben több oldalt és
+    cellát is kiolvas."""
+
+    def __init__(self, lifetime_seconds: float = SELENIUM_BROWSER_LIFETIME,
+                 idle_seconds: float = SELENIUM_IDLE_TIMEOUT, wait_seconds: float = SELENIUM_WAIT_TIMEOUT):
+        self.lifetime_seconds = lifetime_seconds
+        self.idle_seconds = idle_seconds
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._driver = None
+        self._started_at = None
+        self._idle_timer = None
+
+    def _quit_driver(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                logger.warning(f"Hiba a böngésző bezárásakor: {e}")
+        self._driver = None
+        self._started_at = None
+
+    def _ensure_driver(self):
+        if self._driver is not None and time.monotonic() - self._started_at > self.lifetime_seconds:
+            logger.info("A böngésző élettartama lejárt, újraindítás")
+            self._quit_driver()
+        if self._driver is None:
+            self._driver = _setup_chrome_driver()
+            self._started_at = time.monotonic()
+        return self._driver
+
+    def _schedule_idle_close(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = threading.Timer(self.idle_seconds, self.close)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _wait_for_text(self, driver, xpath):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        return WebDriverWait(driver, self.wait_seconds).until(
+            lambda current: (current.find_element(By.XPATH, xpath).text or None)
+        )
+
+    def read_cells(self, pages: dict) -> dict:
+        """Kiolvassa a megadott cellákat. A pages szerkezete {url: {kulcs: xpath}}, az eredmény {kulcs: szöveg};
+        a meg nem jelenő cellák kimaradnak. Hiba esetén a böngésző újraindul a következő híváskor."""
+        results = {}
+        with self._lock:
+            try:
+                driver = self._ensure_driver()
+                for url, xpaths in pages.items():
+                    driver.get(url)
+                    for key, xpath in xpaths.items():
+                        try:
+                            results[key] = self._wait_for_text(driver, xpath)
+                        except Exception as e:
+                            logger.error(f"Hiba az ár lekérésekor ({xpath}): {e}")
+            except Exception:
+                self._quit_driver()
+                raise
+            finally:
+                self._schedule_idle_close()
+        return results
+
+    def page_sources(self, urls, wait_xpath: str = "//table//td") -> dict:
+        """Letölti az oldalak renderelt HTML-jét egy munkamenetben, a wait_xpath elem megjelenése után."""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        sources = {}
+        with self._lock:
+            try:
+                driver = self._ensure_driver()
+                for url in urls:
+                    driver.get(url)
+                    WebDriverWait(driver, self.wait_seconds).until(
+                        EC.presence_of_element_located((By.XPATH, wait_xpath))
+                    )
+                    sources[url] = driver.page_source
+            except Exception:
+                self._quit_driver()
+                raise
+            finally:
+                self._schedule_idle_close()
+        return sources
+
+    def close(self):
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._quit_driver()
+
+
+_selenium_worker = None
+_selenium_worker_lock = threading.Lock()
+
+
+def get_selenium_worker() -> SeleniumScraperWorker:
+    """Visszaadja a folyamat szintű Selenium lekérő példányt."""
+    global _selenium_worker
+    with _selenium_worker_lock:
+        if _selenium_worker is None:
+            _selenium_worker = SeleniumScraperWorker()
+            atexit.register(_selenium_worker.close)
+        return _selenium_worker
+
+"""Az árak lekérése böngészővel (Selenium). Elsőként a régi abszolút XPath cellákat olvassa,
+ha azok nem jelennek meg, a renderelt oldalt a HTML feldolgozóval elemzi."""
+def _scrape_with_selenium():
     try:
-        driver = _setup_chrome_driver()
-        driver.get("https://www.eon.hu/hu/lakossagi/aram/arak.html")
-        _wait_for_page_load(driver)
-        
-        value_2024 = _scrape_price(driver, xpath_2024)
-        value_2025 = _scrape_price(driver, xpath_2025)
-        
-        if value_2024 and value_2025:
-            return {
-                '2024': value_2024,
-                '2025': value_2025
-            }, None
-        else:
-            return None, "Nem sikerült lekérni az árakat"
-            
+        worker = get_selenium_worker()
+        prices = worker.read_cells({EON_PRICES_URL: EON_LOSS_PRICE_XPATHS})
+        if not all(year in prices for year in EON_PRICE_YEARS):
+            page_source = worker.page_sources([EON_PRICES_URL])[EON_PRICES_URL]
+            prices = {**parse_loss_prices(page_source), **prices}
     except Exception as e:
         return None, str(e)
-    finally:
-        if driver:
-            driver.quit()
 
-"""Ár string konvertálása float-ra."""
-def _parse_price(price_str):
-    try:
-        return float(price_str.replace(',', '.').replace(' Ft/kWh', ''))
-    except Exception as e:
-        st.error(f"Hiba az ár feldolgozásakor: {e}")
-        return None
+    if all(prices.get(year) for year in EON_PRICE_YEARS):
+        return {year: prices[year] for year in EON_PRICE_YEARS}, None
+    return None, "Nem sikerült lekérni az árakat"
+
+"""Egy táblázat sorból az ár cella kiválasztása. Elsősorban a régi XPath szerinti oszlopot (td[3]) használja,
+ha abban nincs ár, akkor a sor utolsó Ft/kWh értékét."""
+def _find_price_cell(cell_texts):
+    if len(cell_texts) > EON_PRICE_COLUMN_INDEX and PRICE_PATTERN.search(cell_texts[EON_PRICE_COLUMN_INDEX]):
+        return PRICE_PATTERN.search(cell_texts[EON_PRICE_COLUMN_INDEX]).group(0)
+    prices = [match.group(0) for text in cell_texts for match in [PRICE_PATTERN.search(text)] if match]
+    return prices[-1] if prices else None
+
 
-"""Energia költségek számítása a fogyasztás alapján."""
-def calculate_energy_costs(consumption_data, loss_price):
+def parse_loss_prices(html, years=EON_PRICE_YEARS, label=EON_LOSS_PRICE_LABEL):
+    """Kiolvassa az évenkénti veszteségi árakat az E.ON árak oldal HTML-jéből. Nem abszolút útvonal alapján
+    keres, hanem minden táblázat sort megvizsgál: a sor egyik cellája tartalmazza az évszámot, egy másik pedig
+    egy "xx,xx Ft/kWh" értéket. Ha egy évhez több sor is illeszkedik, a címkét (label) tartalmazó táblázat
+    sora élvez elsőbbséget, egyébként az utolsó illeszkedő sor (a régi XPath is a táblázat végén olvasott)."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    candidates = {year: [] for year in years}
+    for table in soup.find_all('table'):
+        table_has_label = label.lower() in table.get_text(' ', strip=True).lower()
+        for row in table.find_all('tr'):
+            cell_texts = [cell.get_text(' ', strip=True) for cell in row.find_all(['td', 'th'])]
+            price = _find_price_cell(cell_texts)
+            if price is None:
+                continue
+            row_label = ' '.join(text for text in cell_texts if not PRICE_PATTERN.search(text))
+            row_has_label = label.lower() in row_label.lower()
+            for year in years:
+                if re.search(rf'\b{year}\b', row_label):
+                    candidates[year].append((row_has_label or table_has_label, price))
+
+    prices = {}
+    for year, matches in candidates.items():
+        if matches:
+            labelled = [price for has_label, price in matches if has_label]
+            prices[year] = labelled[-1] if labelled else matches[-1][1]
+    return prices
+
+"""Az árak oldal letöltése egyszerű HTTP kéréssel."""
+def _fetch_prices_page():
+    import requests
+    response = requests.get(EON_PRICES_URL, headers=HTTP_HEADERS, timeout=EON_HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response.text
+
+"""Az árak lekérése HTTP kéréssel és HTML feldolgozással, böngésző nélkül."""
+def _scrape_with_http():
     try:
-        loss_price_num = _parse_price(loss_price)
-        if loss_price_num is None:
-            return None, None
-        
-        daily_consumption_kwh = (consumption_data / 1000) * 24
-        daily_loss_cost = daily_consumption_kwh * loss_price_num
-        
-        return daily_loss_cost, loss_price_num
+        prices = parse_loss_prices(_fetch_prices_page())
     except Exception as e:
-        st.error(f"Hiba a költségek számításakor: {e}")
-        return None, None
+        return None, str(e)
+    missing_years = [year for year in EON_PRICE_YEARS if year not in prices]
+    if missing_years:
+        return None, f"Nem található ár a következő évekre: {', '.join(missing_years)}"
+    return prices, None
+
+
+def scrape_eon_prices(backend: str = None):
+    """Lekéri az E.ON veszteségi árait 2024-re és 2025-re. Háttérszálból is hívható, ezért nem használ
+    Streamlit elemeket; a gyorsítótárazást és az ismételt lekérést a price_refresher végzi.
+    A backend a DFV_EON_SCRAPER_BACKEND változóval választható: 'http', 'selenium' vagy 'auto'
+    (HTTP, sikertelenség esetén böngésző)."""
+    backend = (backend or EON_SCRAPER_BACKEND).lower()
+    if backend == 'selenium':
+        return _scrape_with_selenium()
+
+    prices, error = _scrape_with_http()
+    if prices or backend == 'http':
+        return prices, error
+
+    logger.info(f"HTTP árlekérés sikertelen ({error}), próbálkozás böngészővel")
+    return _scrape_with_selenium()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="E.ON veszteségi árak lekérése vagy egy mentett oldal feldolgozása.")
+    parser.add_argument("--html", help="Mentett HTML fájl feldolgozása letöltés nélkül (offline ellenőrzéshez).")
+    parser.add_argument("--backend", choices=["auto", "http", "selenium"], help="Lekérési mód.")
+    args = parser.parse_args()
+
+    if args.html:
+        with open(args.html, 'r', encoding='utf-8') as f:
+            prices, error = parse_loss_prices(f.read()), None
+    else:
+        started = time.perf_counter()
+        prices, error = scrape_eon_prices(args.backend)
+        logger.info(f"Lekérés ideje: {time.perf_counter() - started:.2f} s")
+
+    if error or not prices:
+        print(f"Hiba: {error or 'nem található ár'}", file=sys.stderr)
+        sys.exit(1)
+    for year, price in sorted(prices.items()):
+        print(f"{year}: {price}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,84 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+logger = logging.getLogger(__name__)
+
+MEMORY_REPORT_ENABLED = os.getenv('DFV_MEMORY_REPORT', '0') == '1'
+SENSOR_FLOAT_DTYPE = np.float32
+
+SESSION_FRAME_SCHEMAS = {
+    'co2_hourly_dataframe': {'date_columns': ['Dátum'], 'drop_columns': ['Dátum_Idő_Óra']},
+    'co2_hourly_with_power': {'date_columns': ['Dátum']},
+    'co2_daily_dataframe': {'date_columns': ['Dátum'], 'drop_columns': ['Dátum_datetime', 'Mérések_száma']},
+    'co2_daily_dataframe_smart': {'date_columns': ['Dátum'], 'drop_columns': ['Dátum_datetime', 'Mérések_száma']},
+    'co2_daily_dataframe_thermo': {'date_columns': ['Dátum'], 'drop_columns': ['Dátum_datetime', 'Mérések_száma']},
+    'power_co2_pairs': {},
+    'forecast_df': {},
+}
+
+
+def frame_memory_bytes(frame: pd.DataFrame) -> int:
+    """A DataFrame tényleges memóriaigénye (az object oszlopok Python objektumaival együtt)."""
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def compact_frame(frame: pd.DataFrame, date_columns=(), category_columns=(), drop_columns=()) -> pd.DataFrame:
+    """Tömör séma alkalmazása: a float64 mérési oszlopok float32-re, az object dátum oszlopok
+    datetime64-re, az azonosító oszlopok kategóriára váltanak, a köztes oszlopok törlődnek."""
+    compacted = frame.drop(columns=[column for column in drop_columns if column in frame.columns])
+    for column in compacted.columns:
+        if column in date_columns:
+            compacted[column] = pd.to_datetime(compacted[column])
+        elif column in category_columns:
+            compacted[column] = compacted[column].astype('category')
+        elif compacted[column].dtype == np.float64:
+            compacted[column] = compacted[column].astype(SENSOR_FLOAT_DTYPE)
+    return compacted
+
+
+def store_session_frame(key: str, frame: pd.DataFrame):
+    """DataFrame tárolása a session state-ben a kulcshoz tartozó tömör sémával. A tömörítés előtti
+    és utáni méretet a memória riporthoz feljegyzi."""
+    if frame is None:
+        st.session_state[key] = None
+        return
+    compacted = compact_frame(frame, **SESSION_FRAME_SCHEMAS.get(key, {}))
+    st.session_state.setdefault('frame_memory_stats', {})[key] = (frame_memory_bytes(frame), frame_memory_bytes(compacted))
+    st.session_state[key] = compacted
+
+
+def get_session_memory_report() -> pd.DataFrame:
+    """A session state-ben tárolt DataFrame-ek memóriaigénye tömörítés előtt és után."""
+    stats = st.session_state.get('frame_memory_stats', {})
+    rows = []
+    for key, value in st.session_state.items():
+        if not isinstance(value, pd.DataFrame):
+            continue
+        before, after = stats.get(key, (frame_memory_bytes(value), frame_memory_bytes(value)))
+        rows.append({
+            'Kulcs': key,
+            'Sorok': len(value),
+            'Eredeti (kB)': before / 1024,
+            'Tömör (kB)': after / 1024,
+            'Csökkenés (%)': (1 - after / before) * 100 if before else 0.0
+        })
+    return pd.DataFrame(rows)
+
+
+def display_session_memory_report():
+    """Memória riport megjelenítése az oldalsávban (DFV_MEMORY_REPORT=1 esetén)."""
+    if not MEMORY_REPORT_ENABLED:
+        return
+    report = get_session_memory_report()
+    with st.sidebar.expander("Munkamenet memória"):
+        if report.empty:
+            st.caption("Nincs tárolt DataFrame.")
+            return
+        total_before = report['Eredeti (kB)'].sum()
+        total_after = report['Tömör (kB)'].sum()
+        st.metric("Összesen (kB)", f"{total_after:.1f}", f"{total_after - total_before:.1f}", delta_color="inverse")
+        st.dataframe(report.round(1), hide_index=True, use_container_width=True)
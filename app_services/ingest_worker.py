@@ -0,0 +1,334 @@
+import io
+import os
+import json
+import time
+import glob
+import shutil
+import signal
+import argparse
+import logging
+import threading
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app_services.device_registry import get_device_tables
+from app_services.measurement_ingest import read_measurement_file, prepare_batch, merge_duplicate_timestamps, ingest_batch
+
+
+logger = logging.getLogger(__name__)
+
+INGEST_HOST = os.getenv('DFV_INGEST_HOST', '127.0.0.1')
+INGEST_PORT = int(os.getenv('DFV_INGEST_PORT', '8765'))
+INGEST_SPOOL_DIR = os.getenv('DFV_INGEST_SPOOL_DIR', os.path.join('data', 'ingest_spool'))
+INGEST_BATCH_ROWS = int(os.getenv('DFV_INGEST_BATCH_ROWS', '2000'))
+INGEST_FLUSH_SECONDS = float(os.getenv('DFV_INGEST_FLUSH_SECONDS', '5'))
+INGEST_MAX_BUFFER_ROWS = int(os.getenv('DFV_INGEST_MAX_BUFFER_ROWS', '100000'))
+INGEST_ACK_TIMEOUT = float(os.getenv('DFV_INGEST_ACK_TIMEOUT', '30'))
+RETRY_BACKOFF_SECONDS = (1, 2, 5, 10, 30)
+SPOOL_POLL_SECONDS = 1.0
+SPOOL_EXTENSIONS = ('.csv', '.jsonl', '.ndjson')
+
+
+class BufferFullError(Exception):
+    """A puffer elérte a DFV_INGEST_MAX_BUFFER_ROWS korlátot; a küldőnek később újra kell próbálnia."""
+
+
+class IngestTicket:
+    """Egy beküldött köteg nyugtája: akkor teljesül, amikor a sorait tartalmazó mikro-köteg véglegesítődött."""
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self._done = threading.Event()
+
+    def mark_committed(self):
+        self._done.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def committed(self) -> bool:
+        return self._done.is_set()
+
+
+class MicroBatcher:
+    """Táblánkénti memóriapuffer, amelyet egy háttérszál mikro-kötegekben ír az adatbázisba a tömeges
+    betöltő útvonallal (COPY + upsert), ha a puffer eléri a batch_rows sort vagy a legrégebbi sor
+    flush_seconds másodpercnél régebbi.
+
+    Legalább egyszeri (at-least-once) kézbesítés: egy köteg nyugtája csak a véglegesítés után teljesül,
+    sikertelen írásnál a sorok a pufferben maradnak és visszalépő várakozással újra íródnak. Az upsert
+    (date, time) szerint idempotens, így egy ismételt beküldés nem okoz duplikátumot. A puffer méret
+    korlátja a visszanyomás (backpressure): telített pufferre a submit BufferFullError-t dob."""
+
+    def __init__(self, batch_rows: int = INGEST_BATCH_ROWS, flush_seconds: float = INGEST_FLUSH_SECONDS,
+                 max_buffer_rows: int = INGEST_MAX_BUFFER_ROWS, rebuild_rollups: bool = False):
+        self.batch_rows = batch_rows
+        self.rebuild_rollups = rebuild_rollups
+        self.flush_seconds = flush_seconds
+        self.max_buffer_rows = max_buffer_rows
+        self._pending = {table: [] for table in get_device_tables()}
+        self._oldest = {}
+        self._buffered_rows = 0
+        self._retry_attempts = {}
+        self._retry_at = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self.stats = {'accepted_rows': 0, 'committed_rows': 0, 'batches': 0, 'failures': 0, 'rejected': 0}
+        self._thread = threading.Thread(target=self._run, name="ingest-flusher", daemon=True)
+        self._thread.start()
+
+    @property
+    def buffered_rows(self) -> int:
+        with self._condition:
+            return self._buffered_rows
+
+    def submit(self, table_name: str, frame: pd.DataFrame) -> IngestTicket:
+        """Egy nyers köteg átvétele. Az érvénytelen köteg ValueError-t dob, a telített puffer BufferFullError-t."""
+        if table_name not in self._pending:
+            raise ValueError(f"Ismeretlen tábla: {table_name}")
+        batch = prepare_batch(frame, table_name)
+        ticket = IngestTicket(len(batch))
+        with self._condition:
+            if self._stopping:
+                raise BufferFullError("A betöltő leáll")
+            if self._buffered_rows + len(batch) > self.max_buffer_rows and self._buffered_rows > 0:
+                self.stats['rejected'] += 1
+                raise BufferFullError(f"A puffer megtelt ({self._buffered_rows} sor)")
+            if batch.empty:
+                ticket.mark_committed()
+                return ticket
+            self._pending[table_name].append((batch, ticket))
+            self._oldest.setdefault(table_name, time.monotonic())
+            self._buffered_rows += len(batch)
+            self.stats['accepted_rows'] += len(batch)
+            if sum(len(item[0]) for item in self._pending[table_name]) >= self.batch_rows:
+                self._condition.notify()
+        return ticket
+
+    def _due_tables(self, now: float) -> list:
+        due = []
+        for table_name, items in self._pending.items():
+            if not items or now < self._retry_at.get(table_name, 0):
+                continue
+            rows = sum(len(batch) for batch, _ in items)
+            if self._stopping or rows >= self.batch_rows or now - self._oldest[table_name] >= self.flush_seconds:
+                due.append(table_name)
+        return due
+
+    def _run(self):
+        while True:
+            with self._condition:
+                due = self._due_tables(time.monotonic())
+                while not due:
+                    if self._stopping and self._buffered_rows == 0:
+                        return
+                    self._condition.wait(timeout=min(self.flush_seconds, SPOOL_POLL_SECONDS))
+                    due = self._due_tables(time.monotonic())
+                taken = {table_name: self._pending[table_name] for table_name in due}
+                for table_name in due:
+                    self._pending[table_name] = []
+                    self._oldest.pop(table_name, None)
+
+            for table_name, items in taken.items():
+                self._flush(table_name, items)
+
+    def _flush(self, table_name: str, items: list):
+        batch = merge_duplicate_timestamps(pd.concat([batch for batch, _ in items], ignore_index=True))
+        rows = sum(len(item[0]) for item in items)
+        try:
+            result = ingest_batch(batch, table_name)
+        except Exception as e:
+            attempt = self._retry_attempts.get(table_name, 0)
+            delay = RETRY_BACKOFF_SECONDS[min(attempt, len(RETRY_BACKOFF_SECONDS) - 1)]
+            logger.warning(f"Mikro-köteg írása sikertelen ({table_name}, {rows} sor), újrapróbálás {delay} s múlva: {e}")
+            with self._condition:
+                self._pending[table_name] = items + self._pending[table_name]
+                self._oldest[table_name] = time.monotonic() - self.flush_seconds
+                self._retry_attempts[table_name] = attempt + 1
+                self._retry_at[table_name] = time.monotonic() + delay
+                self.stats['failures'] += 1
+            return
+
+        with self._condition:
+            self._buffered_rows -= rows
+            self._retry_attempts.pop(table_name, None)
+            self._retry_at.pop(table_name, None)
+            self.stats['committed_rows'] += rows
+            self.stats['batches'] += 1
+            self._condition.notify_all()
+        for _, ticket in items:
+            ticket.mark_committed()
+        logger.info(f"{table_name}: {result['inserted']} új, {result['updated']} frissített sor "
+                    f"(adatverzió: {result['version'] or 'változatlan'})")
+        if self.rebuild_rollups and result['changed_from'] is not None:
+            try:
+                from app_services.chart_data_service import build_chart_pyramid
+                build_chart_pyramid(table_name, result['changed_from'])
+            except Exception as e:
+                logger.warning(f"A felbontási piramis frissítése sikertelen ({table_name}): {e}")
+
+    def close(self, timeout: float = None):
+        """Új kötegek elutasítása és a puffer kiürítése (leálláskor)."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def snapshot(self) -> dict:
+        with self._condition:
+            return dict(self.stats, buffered_rows=self._buffered_rows, max_buffer_rows=self.max_buffer_rows)
+
+
+def _parse_payload(body: bytes, content_type: str) -> pd.DataFrame:
+    """JSON tömb, JSON Lines vagy CSV kérés törzs DataFrame-mé alakítása."""
+    text = body.decode('utf-8')
+    if 'csv' in content_type:
+        return pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False, na_values=[""])
+    stripped = text.lstrip()
+    if stripped.startswith('['):
+        return pd.DataFrame(json.loads(stripped))
+    return pd.DataFrame([json.loads(line) for line in text.splitlines() if line.strip()])
+
+
+def make_http_server(batcher: MicroBatcher, port: int = INGEST_PORT, ack_timeout: float = INGEST_ACK_TIMEOUT,
+                     host: str = INGEST_HOST):
+    """HTTP végpont: POST /ingest/<tábla> (JSON tömb, JSON Lines vagy CSV). A válasz 200, ha a sorok
+    véglegesítődtek; 503 Retry-After fejléccel, ha a puffer tele van vagy a véglegesítés nem történt
+    meg ack_timeout másodpercen belül (a küldő újraküldheti, az upsert idempotens). GET /health: állapot."""
+
+    class IngestHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: dict, retry_after: int = None):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            if retry_after is not None:
+                self.send_header('Retry-After', str(retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/health':
+                self._reply(200, batcher.snapshot())
+            else:
+                self._reply(404, {'error': 'ismeretlen útvonal'})
+
+        def do_POST(self):
+            parts = self.path.strip('/').split('/')
+            if len(parts) != 2 or parts[0] != 'ingest':
+                self._reply(404, {'error': 'ismeretlen útvonal'})
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                ticket = batcher.submit(parts[1], _parse_payload(body, self.headers.get('Content-Type', '')))
+            except BufferFullError as e:
+                self._reply(503, {'error': str(e)}, retry_after=int(batcher.flush_seconds) + 1)
+                return
+            except (ValueError, KeyError) as e:
+                self._reply(400, {'error': str(e)})
+                return
+            if ticket.wait(ack_timeout):
+                self._reply(200, {'rows': ticket.rows})
+            else:
+                self._reply(503, {'error': 'a véglegesítés nem történt meg időben'}, retry_after=int(ack_timeout))
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), IngestHandler)
+
+
+class SpoolDirectoryReader:
+    """Spool könyvtár figyelése: a {spool}/{tábla}/ alá (átnevezéssel, atomikusan) lerakott CSV / JSON Lines
+    fájlokat beküldi, és csak a sorok véglegesítése után helyezi át a done/ alkönyvtárba, így újraindításkor
+    a félbemaradt fájlok újra feldolgozódnak. A hibás fájlok az error/ alkönyvtárba kerülnek. Telített
+    puffer esetén a fájl a helyén marad a következő körig."""
+
+    def __init__(self, batcher: MicroBatcher, spool_dir: str = INGEST_SPOOL_DIR):
+        self.batcher = batcher
+        self.spool_dir = spool_dir
+        self._in_flight = {}
+        self._stop = threading.Event()
+        for table_name in get_device_tables():
+            for subdir in ('', 'done', 'error'):
+                os.makedirs(os.path.join(spool_dir, table_name, subdir), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="ingest-spool", daemon=True)
+        self._thread.start()
+
+    def _move(self, path: str, subdir: str):
+        shutil.move(path, os.path.join(os.path.dirname(path), subdir, os.path.basename(path)))
+
+    def _poll(self):
+        for path, ticket in list(self._in_flight.items()):
+            if ticket.committed:
+                self._move(path, 'done')
+                del self._in_flight[path]
+
+        for table_name in get_device_tables():
+            paths = sorted((path for path in glob.glob(os.path.join(self.spool_dir, table_name, '*'))
+                            if path.endswith(SPOOL_EXTENSIONS) and path not in self._in_flight),
+                           key=os.path.getmtime)
+            for path in paths:
+                try:
+                    ticket = self.batcher.submit(table_name, read_measurement_file(path))
+                except BufferFullError:
+                    return
+                except Exception as e:
+                    logger.warning(f"Hibás spool fájl ({path}): {e}")
+                    self._move(path, 'error')
+                    continue
+                self._in_flight[path] = ticket
+
+    def _run(self):
+        while not self._stop.wait(SPOOL_POLL_SECONDS):
+            try:
+                self._poll()
+            except Exception as e:
+                logger.warning(f"Spool könyvtár feldolgozási hiba: {e}")
+
+    def close(self):
+        """A figyelés leállítása; a már véglegesített fájlok átkerülnek a done/ alá, a többi a helyén marad."""
+        self._stop.set()
+        self._thread.join()
+        for path, ticket in list(self._in_flight.items()):
+            if ticket.committed:
+                self._move(path, 'done')
+        self._in_flight.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Folyamatos mérés betöltő: HTTP végpont és/vagy spool könyvtár, mikro-kötegekkel.")
+    parser.add_argument("--port", type=int, default=INGEST_PORT, help="HTTP port (0: nincs HTTP végpont).")
+    parser.add_argument("--host", default=INGEST_HOST,
+                        help="A HTTP végpont címe (alapértelmezés: csak helyi; a végpont nem hitelesít).")
+    parser.add_argument("--spool", default=None, help=f"Spool könyvtár (pl. {INGEST_SPOOL_DIR}).")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="A diagram felbontási piramis frissítése minden mikro-köteg után a módosított tartománytól.")
+    args = parser.parse_args()
+    if not args.port and not args.spool:
+        parser.error("Legalább egy forrás (--port vagy --spool) szükséges")
+
+    batcher = MicroBatcher(rebuild_rollups=args.rebuild_rollups)
+    server = make_http_server(batcher, args.port, host=args.host) if args.port else None
+    spool_reader = SpoolDirectoryReader(batcher, args.spool) if args.spool else None
+
+    stop = threading.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: stop.set())
+    if server:
+        threading.Thread(target=server.serve_forever, name="ingest-http", daemon=True).start()
+        logger.info(f"Betöltő végpont: http://{args.host}:{args.port}/ingest/<tábla>")
+    if spool_reader:
+        logger.info(f"Spool könyvtár: {args.spool}")
+
+    stop.wait()
+    logger.info("Leállás: a puffer kiürítése...")
+    if server:
+        server.shutdown()
+    batcher.close(timeout=INGEST_ACK_TIMEOUT)
+    if spool_reader:
+        spool_reader.close()
+
+
+if __name__ == "__main__":
+    main()
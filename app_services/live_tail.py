@@ -0,0 +1,94 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from app_services.database import execute_query, fetch_frame
+from app_services.chart_cache import frame_to_columns
+from page_modules.database_queries import (
+    get_latest_timestamp, get_chart_data_after, get_chart_data_by_time_range
+)
+
+
+logger = logging.getLogger(__name__)
+
+LIVE_MODE_ENABLED = os.getenv('DFV_LIVE_MODE', '0') == '1'
+
+
+class LiveChartWindow:
+    """Élő követés: a tábla legfrissebb időablakát memóriában tartja, és frissítéskor csak az
+    utoljára látott (dátum, idő) párnál újabb sorokat kéri le, majd hozzáfűzi őket."""
+
+    def __init__(self, table_name: str, columns: str, window: timedelta):
+        self.table_name = table_name
+        self.columns = columns
+        self.column_names = [col.split(" AS ")[-1].strip() for col in columns.split(",")]
+        self.window = window
+        self.data = None
+        self.last_row_count = 0
+
+    @property
+    def latest_time(self):
+        if self.data is None or len(self.data['timestamp']) == 0:
+            return None
+        return self.data['timestamp'][-1].astype('datetime64[us]').item()
+
+    @property
+    def first_time(self):
+        if self.data is None or len(self.data['timestamp']) == 0:
+            return None
+        return self.data['timestamp'][0].astype('datetime64[us]').item()
+
+    def _fetch_range(self, start_time: datetime, end_time: datetime) -> dict:
+        return frame_to_columns(fetch_frame(get_chart_data_by_time_range(
+            self.table_name, self.columns,
+            start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            end_time.strftime('%Y-%m-%d %H:%M:%S')
+        )))
+
+    def _load_initial(self):
+        latest = execute_query(get_latest_timestamp(self.table_name))
+        if not latest:
+            self.data = frame_to_columns(pd.DataFrame(columns=self.column_names))
+            return
+        latest_time = datetime.combine(latest[0][0], latest[0][1])
+        self.data = self._fetch_range(latest_time - self.window, latest_time)
+        self.last_row_count = len(self.data['timestamp'])
+
+    def _append_new_rows(self):
+        latest_time = self.latest_time
+        new_data = frame_to_columns(fetch_frame(get_chart_data_after(
+            self.table_name, self.columns,
+            latest_time.strftime('%Y-%m-%d'), latest_time.strftime('%H:%M:%S')
+        )))
+        self.last_row_count = len(new_data['timestamp'])
+        if self.last_row_count:
+            self.data = {name: np.concatenate([self.data[name], new_data[name]]) for name in self.data}
+
+    def _backfill(self, window: timedelta):
+        window_start = self.latest_time - window
+        if window_start < self.first_time:
+            older_data = self._fetch_range(window_start, self.first_time - timedelta(seconds=1))
+            self.data = {name: np.concatenate([older_data[name], self.data[name]]) for name in self.data}
+
+    def _trim(self):
+        cutoff = np.datetime64(self.latest_time - self.window, 'ns')
+        first_kept = np.searchsorted(self.data['timestamp'], cutoff, side='left')
+        if first_kept:
+            self.data = {name: values[first_kept:] for name, values in self.data.items()}
+
+    def refresh(self, window: timedelta = None) -> dict:
+        """Frissíti az ablakot és visszaadja az oszlopos adatokat. Nagyobb ablakra váltáskor
+        csak a hiányzó régebbi szakaszt tölti be, kisebbre váltáskor levágja a felesleget."""
+        if self.data is None or self.latest_time is None:
+            self.window = window or self.window
+            self._load_initial()
+            return self.data
+
+        self._append_new_rows()
+        if window is not None and window != self.window:
+            if window > self.window:
+                self._backfill(window)
+            self.window = window
+        self._trim()
+        return self.data
@@ -0,0 +1,142 @@
+import os
+import logging
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from app_services.database import fetch_frame, stream_frames
+from app_services.data_version import get_raw_data_start
+from app_services.device_registry import get_devices, COLUMN_LABELS
+from app_services.query_metrics import current_page, query_page
+from app_services.rerun_profiler import current_rerun_profile, rerun_profile
+from page_modules.database_queries import get_long_measurements, get_long_measurements_for_months
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:
+    add_script_run_ctx = get_script_run_ctx = None
+
+
+logger = logging.getLogger(__name__)
+
+DEVICE_WORKERS = int(os.getenv('DFV_DEVICE_WORKERS', '4'))
+LONG_COLUMNS = ['device_id', 'kind', 'ts', 'metric', 'value']
+
+# A vezérlő idősorok (megtakarítás, előrejelzés) szerepkörei és széles oszlopnevei; a kötelező szerepkörök nélküli
+# időpontok kimaradnak.
+CONTROLLER_COLUMNS = {
+    'power': 'value',
+    'current': 'current',
+    'temp': 'internal_temp',
+    'external_temp': 'external_temp',
+    'humidity': 'internal_humidity',
+    'external_humidity': 'external_humidity',
+}
+CONTROLLER_REQUIRED = ['power', 'current', 'temp', 'external_temp']
+
+
+def map_devices(function, devices: list = None, max_workers: int = DEVICE_WORKERS) -> dict:
+    """A function(device) hívása eszközönként párhuzamosan (a lekérdezések I/O kötöttek, ezért szálakon).
+    A szálak a hívó oldal lekérdezés metrika címkéjét, újrafuttatás profilját és Streamlit környezetét öröklik.
+    Eszköz azonosító -> eredmény szótárat ad vissza a devices sorrendjében; az első hiba a hívónál újra kiváltódik."""
+    devices = get_devices() if devices is None else devices
+    if len(devices) <= 1 or max_workers <= 1:
+        return {device.device_id: function(device) for device in devices}
+
+    page = current_page()
+    profile = current_rerun_profile()
+    script_context = get_script_run_ctx() if get_script_run_ctx else None
+
+    def run(device):
+        if script_context is not None:
+            add_script_run_ctx(threading.current_thread(), script_context)
+        with query_page(page), rerun_profile(profile):
+            return function(device)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(devices)), thread_name_prefix="device") as executor:
+        futures = [(device.device_id, executor.submit(run, device)) for device in devices]
+        return {device_id: future.result() for device_id, future in futures}
+
+
+def _device_columns(device, roles: list) -> dict:
+    return {role: device.column(role) for role in roles if role in device.columns}
+
+
+def _fetch_long(build_query, roles: list = None, devices: list = None, required: list = None) -> pd.DataFrame:
+    roles = roles or list(COLUMN_LABELS)
+    required = required or []
+
+    def fetch(device):
+        query = build_query(device.table, _device_columns(device, roles), required, get_raw_data_start(device.table))
+        frame = fetch_frame(query)
+        frame.insert(0, 'kind', device.kind)
+        frame.insert(0, 'device_id', device.device_id)
+        return frame
+
+    frames = [frame for frame in map_devices(fetch, devices).values() if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    frame = pd.concat(frames, ignore_index=True)
+    for column in ('device_id', 'kind', 'metric'):
+        frame[column] = frame[column].astype('category')
+    return frame
+
+
+def fetch_measurements(start_date: str, end_date: str, roles: list = None, devices: list = None,
+                       required: list = None) -> pd.DataFrame:
+    """Egységes, hosszú formátumú mérés lekérdezés tetszőleges számú eszközre: device_id, kind, ts, metric, value
+    oszlopok, ahol a metric a szerepkör (power, temp, ...), így az eszközök oszlopnevei nem szivárognak ki.
+    A required szerepkörök nélküli időpontok kimaradnak; az adatmegőrzési vízjel előtti időszak az órás
+    aggregátumokból érkezik. Az eszközönkénti lekérdezések párhuzamosan futnak."""
+    return _fetch_long(lambda table_name, columns, required_roles, raw_from: get_long_measurements(
+        table_name, columns, required_roles, start_date, end_date, raw_from), roles, devices, required)
+
+
+def fetch_measurements_for_months(months: list, first_year: int, last_year: int, roles: list = None,
+                                  devices: list = None, required: list = None) -> pd.DataFrame:
+    """Mint a fetch_measurements, a megadott hónapokra a first_year és last_year közötti évekből."""
+    return _fetch_long(lambda table_name, columns, required_roles, raw_from: get_long_measurements_for_months(
+        table_name, columns, required_roles, months, first_year, last_year, raw_from), roles, devices, required)
+
+
+def stream_measurements(device, start_date: str, end_date: str, roles: list = None, required: list = None):
+    """Egy eszköz hosszú formátumú mérései (ts, metric, value) darabokban, a teljes eredmény memóriába töltése
+    nélkül (pl. több éves napi aggregáláshoz)."""
+    roles = roles or list(COLUMN_LABELS)
+    query = get_long_measurements(device.table, _device_columns(device, roles), required or [], start_date, end_date,
+                                  get_raw_data_start(device.table))
+    yield from stream_frames(query)
+
+
+def to_wide(frame: pd.DataFrame, names: dict, device_id: str = None) -> pd.DataFrame:
+    """Hosszú formátumú mérések széles idősorrá alakítása (ts + oszloponként egy szerepkör) egy eszközre.
+    A names szerepkör -> oszlopnév párokat ad meg; a hiányzó szerepkörök üres oszlopok."""
+    if device_id is not None:
+        frame = frame[frame['device_id'] == device_id]
+    if frame.empty:
+        return pd.DataFrame(columns=['ts'] + list(names.values()))
+    frame = frame.assign(metric=frame['metric'].astype(str))
+    wide = frame.pivot_table(index='ts', columns='metric', values='value', aggfunc='last')
+    wide = wide.reindex(columns=list(names)).rename(columns=names)
+    wide.columns.name = None
+    return wide.reset_index()
+
+
+def to_controller_frame(frame: pd.DataFrame, device_id: str = None) -> pd.DataFrame:
+    """Vezérlő idősor (ts, value, current, internal_temp, ...) a hosszú formátumú mérésekből."""
+    return to_wide(frame, CONTROLLER_COLUMNS, device_id)
+
+
+def fetch_controller_frames(start_date: str, end_date: str, devices: list = None) -> dict:
+    """Eszközönként a vezérlő idősor a megtakarítási számításokhoz, a hosszú formátumú lekérdezésből.
+    Eszköz azonosító -> DataFrame."""
+    devices = get_devices() if devices is None else devices
+    frame = fetch_measurements(start_date, end_date, list(CONTROLLER_COLUMNS), devices, CONTROLLER_REQUIRED)
+    return {device.device_id: to_controller_frame(frame, device.device_id) for device in devices}
+
+
+def fetch_controller_frames_for_months(months: list, first_year: int, last_year: int, devices: list = None) -> dict:
+    """Mint a fetch_controller_frames, a megadott hónapokra a first_year és last_year közötti évekből."""
+    devices = get_devices() if devices is None else devices
+    frame = fetch_measurements_for_months(months, first_year, last_year, list(CONTROLLER_COLUMNS), devices,
+                                          CONTROLLER_REQUIRED)
+    return {device.device_id: to_controller_frame(frame, device.device_id) for device in devices}
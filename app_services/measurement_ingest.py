@@ -0,0 +1,159 @@
+import io
+import uuid
+import time
+import argparse
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from app_services.database import get_db_connection
+from app_services.table_partitioning import ensure_month_partitions
+from app_services.data_version import read_raw_data_start
+from app_services.device_registry import get_device_tables
+from page_modules.database_queries import (
+    get_measurement_columns, create_data_version_table, advance_data_version,
+    create_ingest_staging_table, upsert_from_staging, get_id_has_default
+)
+
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_COLUMNS = ("ts", "timestamp", "datetime")
+
+_id_defaults = {}
+_id_defaults_lock = threading.Lock()
+
+
+def _id_has_default(table_name: str) -> bool:
+    """Igaz, ha a tábla id oszlopa szekvenciából kap alapértéket (táblánként egyszer lekérdezve)."""
+    with _id_defaults_lock:
+        if table_name in _id_defaults:
+            return _id_defaults[table_name]
+    rows = get_db_connection().execute_query(get_id_has_default(table_name))
+    has_default = bool(rows and rows[0][0])
+    with _id_defaults_lock:
+        _id_defaults[table_name] = has_default
+    return has_default
+
+
+def read_measurement_file(path: str, file_format: str = None) -> pd.DataFrame:
+    """Vezérlő mérési köteg beolvasása CSV vagy JSON Lines fájlból (a formátum a kiterjesztésből is adódhat)."""
+    file_format = file_format or ("jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    if file_format == "jsonl":
+        return pd.read_json(path, lines=True, dtype=False)
+    return pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+
+
+def merge_duplicate_timestamps(batch: pd.DataFrame) -> pd.DataFrame:
+    """Az azonos (date, time) sorok összevonása oszloponként: minden oszlopban a legkésőbb érkezett nem üres
+    érték marad meg, így a külön érkező (pl. szenzoronkénti) részleges sorok nem írják felül egymást."""
+    if not batch.duplicated(subset=["date", "time"]).any():
+        return batch.reset_index(drop=True)
+    return batch.groupby(["date", "time"], sort=False, as_index=False).last()
+
+
+def prepare_batch(frame: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """A köteg egységesítése a tábla sémájára: az időbélyeg (ts/timestamp/datetime vagy date + time) date és
+    time oszlopokra bomlik, a mérési oszlopok float64-re konvertálódnak, a hiányzók NULL-ok (a betöltés a meglévő
+    értéket megtartja), az ismeretlenek kimaradnak. Az azonos (date, time) sorok oszloponként összevonódnak."""
+    columns = get_measurement_columns(table_name)
+    timestamp_column = next((column for column in TIMESTAMP_COLUMNS if column in frame.columns), None)
+    if timestamp_column is not None:
+        timestamps = pd.to_datetime(frame[timestamp_column], errors='coerce')
+    elif "date" in frame.columns and "time" in frame.columns:
+        timestamps = pd.to_datetime(frame["date"].astype(str) + " " + frame["time"].astype(str), errors='coerce')
+    else:
+        raise ValueError("A kötegben nincs időbélyeg (ts/timestamp/datetime) vagy date és time oszlop")
+
+    unknown_columns = set(frame.columns) - set(columns) - set(TIMESTAMP_COLUMNS) - {"date", "time", "id"}
+    if unknown_columns:
+        logger.warning(f"Ismeretlen oszlopok kihagyva ({table_name}): {', '.join(sorted(unknown_columns))}")
+
+    batch = pd.DataFrame({"date": timestamps.dt.date, "time": timestamps.dt.time})
+    for column in columns:
+        batch[column] = pd.to_numeric(frame[column], errors='coerce') if column in frame.columns else np.nan
+
+    invalid_rows = int(timestamps.isna().sum())
+    if invalid_rows:
+        logger.warning(f"{invalid_rows} sor érvénytelen időbélyeggel kihagyva ({table_name})")
+    batch = batch[timestamps.notna().to_numpy()]
+    return merge_duplicate_timestamps(batch)
+
+
+def ingest_batch(batch: pd.DataFrame, table_name: str) -> dict:
+    """Egy előkészített köteg betöltése egyetlen tranzakcióban: COPY egy ideiglenes staging táblába,
+    upsert (date, time) szerint egyetlen utasítással, majd az adatverzió léptetése, ha bármi változott.
+    A céltábla SHARE ROW EXCLUSIVE zárolása sorba állítja a párhuzamos betöltéseket (az olvasók nem várnak).
+    Havi partícionált táblánál a köteg hónapjainak hiányzó partíciói előtte, külön tranzakcióban jönnek létre.
+    Az adatmegőrzési határ előtti sorok kimaradnak (azt a tartományt már csak az aggregátumok tárolják)."""
+    result = {"table": table_name, "rows": len(batch), "updated": 0, "inserted": 0, "version": None,
+              "changed_from": None, "changed_to": None}
+    if batch.empty:
+        return result
+
+    raw_from = read_raw_data_start(table_name)
+    if raw_from is not None:
+        expired = batch["date"] < raw_from
+        if expired.any():
+            logger.warning(f"{int(expired.sum())} sor az adatmegőrzési határ ({raw_from}) előttről, kihagyva ({table_name})")
+            batch = batch[~expired.to_numpy()]
+            result["rows"] = len(batch)
+            if batch.empty:
+                return result
+
+    ensure_month_partitions(table_name, batch["date"].min(), batch["date"].max())
+    id_has_default = _id_has_default(table_name)
+    staging_table = f"ingest_{uuid.uuid4().hex[:12]}"
+    columns = ["date", "time"] + get_measurement_columns(table_name)
+    buffer = io.StringIO()
+    batch[columns].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    with get_db_connection().get_connection() as conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(create_data_version_table())
+                cursor.execute(f"LOCK TABLE {table_name} IN SHARE ROW EXCLUSIVE MODE")
+                cursor.execute(create_ingest_staging_table(table_name, staging_table))
+                cursor.copy_expert(f"COPY {staging_table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+                cursor.execute(upsert_from_staging(table_name, staging_table, id_has_default))
+                updated, inserted, changed_from, changed_to = cursor.fetchone()
+                if updated or inserted:
+                    cursor.execute(advance_data_version(table_name, str(changed_from), str(changed_to)))
+                    result["version"] = cursor.fetchone()[0]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    result.update(updated=updated, inserted=inserted, changed_from=changed_from, changed_to=changed_to)
+    return result
+
+
+def ingest_files(table_name: str, paths: list, file_format: str = None, rebuild_rollups: bool = False) -> dict:
+    """Fájlok betöltése egy táblába egy kötegként (a később megadott fájl sorai felülírják a korábbiakat).
+    rebuild_rollups esetén a felbontási piramis a módosított tartomány elejétől újraépül."""
+    frames = [read_measurement_file(path, file_format) for path in paths]
+    batch = prepare_batch(pd.concat(frames, ignore_index=True), table_name)
+    result = ingest_batch(batch, table_name)
+    if rebuild_rollups and result["changed_from"] is not None:
+        from app_services.chart_data_service import build_chart_pyramid
+        build_chart_pyramid(table_name, result["changed_from"])
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vezérlő mérési kötegek (CSV / JSON Lines) tömeges betöltése.")
+    parser.add_argument("--table", required=True, choices=get_device_tables(), help="Céltábla.")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Bemeneti formátum (alapértelmezés: kiterjesztés alapján).")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="A diagram felbontási piramis újraépítése a módosított tartomány elejétől.")
+    parser.add_argument("paths", nargs="+", help="Betöltendő fájlok.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = ingest_files(args.table, args.paths, args.format, args.rebuild_rollups)
+    print(f"{args.table}: {result['rows']} sor, {result['inserted']} új, {result['updated']} frissített, "
+          f"adatverzió: {result['version'] or 'változatlan'} ({time.perf_counter() - started:.1f} s)")
+    if result["changed_from"] is not None:
+        print(f"Módosított tartomány: {result['changed_from']} – {result['changed_to']}")
@@ -0,0 +1,85 @@
+import os
+import logging
+import threading
+import streamlit as st
+from datetime import datetime, timedelta
+from app_services.price_store import get_price_store
+
+
+logger = logging.getLogger(__name__)
+
+PRICE_REFRESH_INTERVAL = timedelta(seconds=int(os.getenv('DFV_PRICE_REFRESH_SECONDS', '2600000')))
+PRICE_RETRY_INTERVAL = timedelta(seconds=int(os.getenv('DFV_PRICE_RETRY_SECONDS', '600')))
+
+
+class PriceRefresher:
+    """Az E.ON árak háttérben történő frissítése. Az utoljára ismert árakat azonnal kiszolgálja
+    a tartós ár tárolóból, a lekérést pedig egy háttérszálban végzi, így az oldal betöltése nem vár a böngészőre."""
+
+    def __init__(self, price_store=None):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.price_store = price_store or get_price_store()
+        self.fetched_at = self.price_store.last_fetched_at
+        self.error = None
+        self.last_attempt_at = None
+
+    @property
+    def is_refreshing(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def is_stale(self) -> bool:
+        return self.fetched_at is None or datetime.now() - self.fetched_at > PRICE_REFRESH_INTERVAL
+
+    def _refresh(self):
+        from app_services.eon_scraper import scrape_eon_prices
+        try:
+            prices, error = scrape_eon_prices()
+        except Exception as e:
+            prices, error = None, str(e)
+
+        with self._lock:
+            if error or not prices:
+                self.error = error or "Nem sikerült lekérni az árakat"
+                logger.warning(f"E.ON árak frissítése sikertelen: {self.error}")
+                return
+        fetched_at = datetime.now()
+        try:
+            new_versions = self.price_store.record_yearly_labels(prices, source='eon.hu', fetched_at=fetched_at)
+            if new_versions:
+                logger.info(f"{new_versions} új E.ON ár verzió mentve")
+        except Exception as e:
+            logger.warning(f"Nem sikerült elmenteni az árakat: {e}")
+
+        with self._lock:
+            self.fetched_at = fetched_at
+            self.error = None
+
+    def ensure_fresh(self):
+        """Elindítja a háttérfrissítést, ha az árak elavultak és nem fut már frissítés.
+        Sikertelen próbálkozás után PRICE_RETRY_INTERVAL ideig nem próbálkozik újra."""
+        with self._lock:
+            if not self.is_stale or self.is_refreshing:
+                return
+            if self.last_attempt_at and datetime.now() - self.last_attempt_at < PRICE_RETRY_INTERVAL:
+                return
+            self.last_attempt_at = datetime.now()
+            self._thread = threading.Thread(target=self._refresh, name="eon-price-refresh", daemon=True)
+            self._thread.start()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'available': self.price_store.has_prices(),
+                'fetched_at': self.fetched_at,
+                'error': self.error,
+                'is_refreshing': self.is_refreshing,
+                'is_stale': self.is_stale
+            }
+
+
+@st.cache_resource
+def get_price_refresher() -> PriceRefresher:
+    """Visszaadja a folyamat szintű ár frissítő példányt."""
+    return PriceRefresher()
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+import numpy as np
+import pandas as pd
+import streamlit as st
+from datetime import date, datetime
+
+
+logger = logging.getLogger(__name__)
+
+PRICE_STORE_PATH = os.getenv('DFV_PRICE_STORE_PATH', os.path.join('data', 'electricity_prices.sqlite3'))
+LOSS_TARIFF = 'loss'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS electricity_prices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tariff TEXT NOT NULL,
+    effective_from TEXT NOT NULL,
+    price_ft_kwh REAL NOT NULL,
+    source TEXT NOT NULL,
+    source_label TEXT,
+    fetched_at TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    UNIQUE (tariff, effective_from, version)
+)
+"""
+
+
+def parse_price_label(price_label: str):
+    """Ár szöveg ("xx,xx Ft/kWh") konvertálása float-ra. Érvénytelen szöveg esetén None."""
+    try:
+        return float(price_label.replace(',', '.').replace('Ft/kWh', '').strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+class PriceStore:
+    """Tartós, verziózott villamosenergia-ár tároló (SQLite). A feldolgozott numerikus árakat
+    hatálybalépési dátummal és forrás metaadatokkal tárolja; az aktuális verziókat egyszer tölti
+    memóriába, a költségszámítások dátum alapján kérdezik le, újrafeldolgozás nélkül."""
+
+    def __init__(self, path: str = PRICE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._effective_dates = np.array([], dtype='datetime64[D]')
+        self._prices = np.array([], dtype=np.float64)
+        self.last_fetched_at = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(SCHEMA)
+        self._load()
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def _load(self, tariff: str = LOSS_TARIFF):
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute("""
+                SELECT p.effective_from, p.price_ft_kwh, p.fetched_at
+                FROM electricity_prices p
+                JOIN (
+                    SELECT effective_from, MAX(version) AS version
+                    FROM electricity_prices
+                    WHERE tariff = ?
+                    GROUP BY effective_from
+                ) latest ON latest.effective_from = p.effective_from AND latest.version = p.version
+                WHERE p.tariff = ?
+                ORDER BY p.effective_from
+            """, (tariff, tariff)).fetchall()
+            last_fetched = conn.execute(
+                "SELECT MAX(fetched_at) FROM electricity_prices WHERE tariff = ?", (tariff,)
+            ).fetchone()[0]
+
+        with self._lock:
+            self._effective_dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+            self._prices = np.array([row[1] for row in rows], dtype=np.float64)
+            self.last_fetched_at = datetime.fromisoformat(last_fetched) if last_fetched else None
+
+    def has_prices(self) -> bool:
+        return len(self._prices) > 0
+
+    def record_prices(self, prices_by_effective_date: dict, source: str, fetched_at: datetime,
+                      source_labels: dict = None, tariff: str = LOSS_TARIFF) -> int:
+        """Elmenti a lekért árakat. Egy hatálybalépési dátumhoz csak akkor kerül új verzió, ha az ár
+        megváltozott; a lekérés időpontja minden esetben frissül. Visszaadja az új verziók számát."""
+        source_labels = source_labels or {}
+        new_versions = 0
+        with closing(self._connect()) as conn, conn:
+            for effective_from, price in prices_by_effective_date.items():
+                current = conn.execute("""
+                    SELECT version, price_ft_kwh FROM electricity_prices
+                    WHERE tariff = ? AND effective_from = ?
+                    ORDER BY version DESC LIMIT 1
+                """, (tariff, effective_from.isoformat())).fetchone()
+
+                if current and current[1] == price:
+                    conn.execute("""
+                        UPDATE electricity_prices SET fetched_at = ?
+                        WHERE tariff = ? AND effective_from = ? AND version = ?
+                    """, (fetched_at.isoformat(), tariff, effective_from.isoformat(), current[0]))
+                    continue
+
+                conn.execute("""
+                    INSERT INTO electricity_prices
+                        (tariff, effective_from, price_ft_kwh, source, source_label, fetched_at, version)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (tariff, effective_from.isoformat(), price, source,
+                      source_labels.get(effective_from), fetched_at.isoformat(),
+                      (current[0] + 1) if current else 1))
+                new_versions += 1
+        self._load(tariff)
+        return new_versions
+
+    def record_yearly_labels(self, price_labels: dict, source: str, fetched_at: datetime) -> int:
+        """Az E.ON oldalon évenként megadott ("2024": "xx,xx Ft/kWh") árakat az év első napjától hatályosként menti."""
+        prices, labels = {}, {}
+        for year, label in price_labels.items():
+            price = parse_price_label(label)
+            if price is None:
+                logger.warning(f"Érvénytelen ár a(z) {year}. évre: {label}")
+                continue
+            effective_from = date(int(year), 1, 1)
+            prices[effective_from] = price
+            labels[effective_from] = label
+        return self.record_prices(prices, source, fetched_at, labels)
+
+    def price_for_date(self, day):
+        """A megadott napon hatályos ár. Az első ismert ár előtti napokra a legkorábbi árat adja."""
+        prices = self.prices_for_dates([day])
+        return None if prices is None else float(prices[0])
+
+    def prices_for_dates(self, days):
+        """Vektorizált árkeresés: minden naphoz a legutóbb hatályba lépett árat rendeli."""
+        with self._lock:
+            if len(self._prices) == 0:
+                return None
+            day_values = pd.to_datetime(pd.Series(days)).values.astype('datetime64[D]')
+            positions = np.searchsorted(self._effective_dates, day_values, side='right') - 1
+            return self._prices[np.clip(positions, 0, None)]
+
+
+@st.cache_resource
+def get_price_store() -> PriceStore:
+    """Visszaadja a folyamat szintű ár tároló példányt."""
+    return PriceStore()
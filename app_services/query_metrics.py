@@ -0,0 +1,294 @@
+import os
+import re
+import json
+import time
+import bisect
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('dfv.slow_query')
+
+METRICS_FILE = os.getenv('DFV_METRICS_FILE', '')
+METRICS_HOST = os.getenv('DFV_METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('DFV_METRICS_PORT', '0'))
+METRICS_WRITE_INTERVAL = int(os.getenv('DFV_METRICS_WRITE_SECONDS', '15'))
+SLOW_QUERY_MS = float(os.getenv('DFV_SLOW_QUERY_MS', '1000'))
+SLOW_QUERY_LOG = os.getenv('DFV_SLOW_QUERY_LOG', os.path.join('data', 'slow_queries.jsonl'))
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.getenv('DFV_SLOW_QUERY_EXPLAIN_SECONDS', '3600'))
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATEMENT_LABEL_LENGTH = 120
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"(?<![A-Za-z_0-9.])-?\d+(?:\.\d+)?\b")
+VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+EXPLAINABLE_STATEMENT = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+_page_state = threading.local()
+
+
+def normalize_statement(query: str) -> str:
+    """Lekérdezés szövegének normalizálása: a szöveg és szám literálok, valamint a %s paraméterek ?-re,
+    az értéklisták (?, ?, ...)-re cserélődnek, a szóközök összevonódnak. Így az azonos lekérdezés
+    builderből származó utasítások egy sorozatba kerülnek."""
+    statement = STRING_LITERAL.sub('?', query)
+    statement = statement.replace('%s', '?')
+    statement = NUMBER_LITERAL.sub('?', statement)
+    statement = VALUE_LIST.sub('(?, ...)', statement)
+    return ' '.join(statement.split())
+
+
+def statement_id(statement: str) -> str:
+    return hashlib.sha1(statement.encode('utf-8')).hexdigest()[:12]
+
+
+@contextmanager
+def query_page(page: str):
+    """A blokkban futó lekérdezések a megadott oldalhoz számítanak (a hívó szálon)."""
+    previous = getattr(_page_state, 'page', None)
+    _page_state.page = page
+    try:
+        yield
+    finally:
+        _page_state.page = previous
+
+
+def current_page() -> str:
+    """A hívó oldal neve; a Streamlit oldalakon kívüli (háttérszál, parancssor) lekérdezéseknél 'background'."""
+    return getattr(_page_state, 'page', None) or 'background'
+
+
+class QueryMetrics:
+    """Lekérdezésenkénti (normalizált utasítás, oldal, típus, háttér) időtartam hisztogramok és számlálók a memóriában.
+    A háttér 'postgres' vagy 'duckdb' (a pillanatképből kiszolgált lekérdezések)."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, statement: str, page: str, kind: str, seconds: float, rows: int, transferred_bytes: int,
+               backend: str = 'postgres'):
+        key = (statement_id(statement), page, kind, backend)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {
+                    'statement': statement,
+                    'bucket_counts': [0] * len(self.buckets),
+                    'count': 0,
+                    'sum': 0.0,
+                    'rows': 0,
+                    'bytes': 0,
+                }
+                self._series[key] = series
+            bucket_index = bisect.bisect_left(self.buckets, seconds)
+            if bucket_index < len(self.buckets):
+                series['bucket_counts'][bucket_index] += 1
+            series['count'] += 1
+            series['sum'] += seconds
+            series['rows'] += rows or 0
+            series['bytes'] += transferred_bytes or 0
+
+    def totals(self, backend: str = None) -> dict:
+        """Összesített lekérdezés szám, idő, sorok és bájtok az összes (vagy a megadott háttér) sorozatára."""
+        with self._lock:
+            series_list = [series for key, series in self._series.items() if backend is None or key[3] == backend]
+        return {
+            'count': sum(series['count'] for series in series_list),
+            'seconds': sum(series['sum'] for series in series_list),
+            'rows': sum(series['rows'] for series in series_list),
+            'bytes': sum(series['bytes'] for series in series_list),
+        }
+
+    def render_prometheus(self) -> str:
+        """A metrikák Prometheus szöveges formátumban (kumulatív hisztogram vödrökkel)."""
+        lines = [
+            "# HELP dfv_query_duration_seconds Adatbázis lekérdezések időtartama.",
+            "# TYPE dfv_query_duration_seconds histogram",
+        ]
+        rows_lines = [
+            "# HELP dfv_query_rows_total Visszaadott sorok száma.",
+            "# TYPE dfv_query_rows_total counter",
+        ]
+        bytes_lines = [
+            "# HELP dfv_query_bytes_total Átvitt adatmennyiség bájtban (COPY esetén pontos, egyébként a szöveges értékek hossza).",
+            "# TYPE dfv_query_bytes_total counter",
+        ]
+        with self._lock:
+            items = [(key, dict(series, bucket_counts=list(series['bucket_counts']))) for key, series in self._series.items()]
+        for (series_id, page, kind, backend), series in sorted(items):
+            labels = (f'statement_id="{series_id}",page="{_escape_label(page)}",kind="{kind}",backend="{backend}",'
+                      f'statement="{_escape_label(series["statement"][:STATEMENT_LABEL_LENGTH])}"')
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets, series['bucket_counts']):
+                cumulative += bucket_count
+                lines.append(f'dfv_query_duration_seconds_bucket{{{labels},le="{upper_bound}"}} {cumulative}')
+            lines.append(f'dfv_query_duration_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f'dfv_query_duration_seconds_sum{{{labels}}} {series["sum"]:.6f}')
+            lines.append(f'dfv_query_duration_seconds_count{{{labels}}} {series["count"]}')
+            rows_lines.append(f'dfv_query_rows_total{{{labels}}} {series["rows"]}')
+            bytes_lines.append(f'dfv_query_bytes_total{{{labels}}} {series["bytes"]}')
+        return "\n".join(lines + rows_lines + bytes_lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class SlowQueryLog:
+    """A DFV_SLOW_QUERY_MS-nél lassabb lekérdezések naplózása. SELECT utasításoknál egy háttérszál
+    EXPLAIN (ANALYZE, BUFFERS) tervet is rögzít, utasításonként legfeljebb SLOW_QUERY_EXPLAIN_INTERVAL
+    másodpercenként egyszer, hogy a lassú lekérdezés ismételt futtatása ne terhelje az adatbázist."""
+
+    def __init__(self, path: str = SLOW_QUERY_LOG, threshold_ms: float = SLOW_QUERY_MS):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._last_explained = {}
+
+    def capture(self, bound_query: str, statement: str, page: str, seconds: float, rows: int, explain):
+        """Rögzíti a lekérdezést, ha átlépi a küszöböt. Az explain(query) hívás a terv sorait adja vissza."""
+        if self.threshold_ms <= 0 or seconds * 1000 < self.threshold_ms:
+            return
+        entry = {
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'statement_id': statement_id(statement),
+            'page': page,
+            'duration_ms': round(seconds * 1000, 1),
+            'rows': rows,
+            'query': bound_query.strip(),
+        }
+        slow_query_logger.warning(f"Lassú lekérdezés ({entry['duration_ms']} ms, {page}): {statement[:200]}")
+
+        with self._lock:
+            now = time.monotonic()
+            last_explained = self._last_explained.get(entry['statement_id'])
+            should_explain = bool(EXPLAINABLE_STATEMENT.match(bound_query)) and \
+                (last_explained is None or now - last_explained >= SLOW_QUERY_EXPLAIN_INTERVAL)
+            if should_explain:
+                self._last_explained[entry['statement_id']] = now
+        if should_explain:
+            threading.Thread(target=self._explain_and_write, args=(entry, explain),
+                             name="slow-query-explain", daemon=True).start()
+        else:
+            self._write(entry)
+
+    def _explain_and_write(self, entry, explain):
+        try:
+            entry['plan'] = "\n".join(explain(entry['query']))
+        except Exception as e:
+            entry['plan_error'] = str(e)
+        self._write(entry)
+
+    def _write(self, entry):
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"Nem sikerült írni a lassú lekérdezés naplót: {e}")
+
+
+class MetricsExporter:
+    """A metrikák kiajánlása: DFV_METRICS_FILE esetén atomikusan frissített szöveges fájl (node_exporter
+    textfile collectorhoz), DFV_METRICS_PORT esetén /metrics HTTP végpont egy háttérszálon (alapértelmezés szerint csak helyben,
+    mivel a címkék a lekérdezések szövegét is tartalmazzák)."""
+
+    def __init__(self, metrics: QueryMetrics, path: str = METRICS_FILE, port: int = METRICS_PORT,
+                 host: str = METRICS_HOST):
+        self.metrics = metrics
+        self.path = path
+        self.host = host
+        self.port = port
+        self._last_written = 0.0
+        self._lock = threading.Lock()
+        if port:
+            self._start_http_server()
+
+    def maybe_write(self):
+        """A fájl frissítése, ha az előző írás óta eltelt METRICS_WRITE_INTERVAL másodperc."""
+        if not self.path:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_written < METRICS_WRITE_INTERVAL:
+                return
+            self._last_written = now
+        self.write()
+
+    def write(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.metrics.render_prometheus())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Nem sikerült írni a metrika fájlt: {e}")
+
+    def _start_http_server(self):
+        metrics = self.metrics
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        except OSError as e:
+            logger.warning(f"A metrika végpont nem indítható a {self.port} porton: {e}")
+            return
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"Lekérdezés metrikák: http://{self.host}:{self.port}/metrics")
+
+
+_metrics = QueryMetrics()
+_slow_query_log = SlowQueryLog()
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_query_metrics() -> QueryMetrics:
+    return _metrics
+
+
+def _get_exporter() -> MetricsExporter:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = MetricsExporter(_metrics)
+        return _exporter
+
+
+def record_query(query: str, bound_query: str, kind: str, seconds: float, rows: int, transferred_bytes: int, explain,
+                 backend: str = 'postgres'):
+    """Egy lefutott lekérdezés rögzítése a hisztogramokban, a lassú lekérdezés naplóban és a metrika fájlban."""
+    statement = normalize_statement(query)
+    page = current_page()
+    _metrics.record(statement, page, kind, seconds, rows, transferred_bytes, backend)
+    _slow_query_log.capture(bound_query, statement, page, seconds, rows, explain)
+    _get_exporter().maybe_write()
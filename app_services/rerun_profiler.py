@@ -0,0 +1,226 @@
+import os
+import io
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import functools
+from datetime import datetime
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv('DFV_PROFILING', '0') == '1'
+PROFILE_DIR = os.getenv('DFV_PROFILE_DIR', os.path.join('data', 'profiles'))
+PROFILE_TOP_FUNCTIONS = 30
+
+_state = threading.local()
+
+
+class RerunProfile:
+    """Egy Streamlit újrafuttatás mérései: a megjelölt szakaszok ideje és a bennük futó lekérdezések.
+    A szakaszok egymásba ágyazódhatnak; egy lekérdezés a legbelső futó szakaszhoz számít. A mérés a
+    rerun_profile blokkal átadható segédszálaknak is (pl. eszközönként párhuzamos lekérdezések)."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.total_seconds = None
+        self.sections = []
+        self.queries = []
+        self._stack = []
+        self.profiler = None
+        self.profile_path = None
+        self.profile_summary = None
+        self._lock = threading.Lock()
+
+    def enter_section(self, name):
+        with self._lock:
+            section = {'name': name, 'depth': len(self._stack), 'seconds': 0.0, 'queries': 0, 'query_seconds': 0.0}
+            self.sections.append(section)
+            self._stack.append(section)
+        return section
+
+    def exit_section(self, section, seconds):
+        with self._lock:
+            section['seconds'] = seconds
+            self._stack.remove(section)
+
+    def record_query(self, kind, query, seconds, rows):
+        with self._lock:
+            self._record_query(kind, query, seconds, rows)
+
+    def _record_query(self, kind, query, seconds, rows):
+        section = self._stack[-1] if self._stack else None
+        for open_section in self._stack:
+            open_section['queries'] += 1
+            open_section['query_seconds'] += seconds
+        self.queries.append({
+            'kind': kind,
+            'section': section['name'] if section else '-',
+            'query': ' '.join(query.split())[:200],
+            'seconds': seconds,
+            'rows': rows,
+        })
+
+
+def _current_profile():
+    return getattr(_state, 'profile', None)
+
+
+def current_rerun_profile():
+    """A hívó szál újrafuttatás mérése (None, ha nincs profilozás), a segédszálaknak való átadáshoz."""
+    return _current_profile()
+
+
+@contextmanager
+def rerun_profile(profile):
+    """A blokkban (a hívó szálon) futó szakaszok és lekérdezések a megadott újrafuttatás méréséhez számítanak."""
+    previous = _current_profile()
+    _state.profile = profile
+    try:
+        yield
+    finally:
+        _state.profile = previous
+
+
+def begin_rerun():
+    """Az újrafuttatás mérésének indítása a script szálán. Ha a panel gombjával cProfile kérés
+    érkezett, ez a futás a profilerrel együtt fut."""
+    if not PROFILING_ENABLED:
+        return
+    profile = RerunProfile()
+    if st.session_state.pop('profile_next_rerun', False):
+        profile.profiler = cProfile.Profile()
+        profile.profiler.enable()
+    _state.profile = profile
+
+
+def finish_rerun():
+    """A mérés lezárása és a panel megjelenítése. A cProfile kimenetét a DFV_PROFILE_DIR könyvtárba menti."""
+    profile = _current_profile()
+    if profile is None:
+        return
+    _state.profile = None
+    profile.total_seconds = time.perf_counter() - profile.started_at
+    if profile.profiler is not None:
+        profile.profiler.disable()
+        _save_cprofile(profile)
+    display_profiling_panel(profile)
+
+
+def _save_cprofile(profile):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile.profile_path = os.path.join(PROFILE_DIR, f"rerun-{datetime.now():%Y%m%d-%H%M%S}.prof")
+    profile.profiler.dump_stats(profile.profile_path)
+    summary = io.StringIO()
+    pstats.Stats(profile.profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    profile.profile_summary = summary.getvalue()
+    profile.profiler = None
+    logger.info(f"cProfile kimenet mentve: {profile.profile_path}")
+
+
+@contextmanager
+def profile_section(name):
+    """Egy oldalszakasz időmérése az aktuális újrafuttatásban. Profilozás nélkül nem mér semmit."""
+    profile = _current_profile()
+    if profile is None:
+        yield
+        return
+    section = profile.enter_section(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.exit_section(section, time.perf_counter() - start)
+
+
+def profiled(function):
+    """Dekorátor: a függvény futása a nevével megegyező szakaszként mérődik."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with profile_section(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def track_query(kind, query):
+    """Egy adatbázis lekérdezés időmérése. A blokk a visszaadott listába teheti az eredmény sorszámát."""
+    profile = _current_profile()
+    result_rows = []
+    if profile is None:
+        yield result_rows
+        return
+    start = time.perf_counter()
+    try:
+        yield result_rows
+    finally:
+        profile.record_query(kind, query, time.perf_counter() - start, result_rows[0] if result_rows else None)
+
+
+def track_stream(query, frames):
+    """A stream_frames darabjainak időmérése: a lekérdezés ideje a darabok előállításának összege."""
+    profile = _current_profile()
+    if profile is None:
+        yield from frames
+        return
+    seconds, rows = 0.0, 0
+    iterator = iter(frames)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                frame = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.perf_counter() - start
+            rows += len(frame)
+            yield frame
+    finally:
+        profile.record_query('stream_frames', query, seconds, rows)
+
+
+def _request_cprofile():
+    """A gomb callbackje a script előtt fut, így a gombnyomás által indított újrafuttatás már profilozott."""
+    st.session_state['profile_next_rerun'] = True
+
+
+def display_profiling_panel(profile):
+    """Összecsukható hibakereső panel az oldalsávban: szakaszonkénti idő, lekérdezések száma és ideje,
+    valamint egy cProfile-lal futó újrafuttatás indítása."""
+    query_seconds = sum(query['seconds'] for query in profile.queries)
+    with st.sidebar.expander("Futásidő profil"):
+        col1, col2 = st.columns(2)
+        col1.metric("Újrafuttatás (ms)", f"{profile.total_seconds * 1000:.0f}")
+        col2.metric("Lekérdezések", len(profile.queries), f"{query_seconds * 1000:.0f} ms", delta_color="off")
+
+        if profile.sections:
+            st.dataframe(pd.DataFrame([{
+                'Szakasz': '  ' * section['depth'] + section['name'],
+                'Idő (ms)': round(section['seconds'] * 1000, 1),
+                'Lekérdezések': section['queries'],
+                'Lekérdezés idő (ms)': round(section['query_seconds'] * 1000, 1),
+            } for section in profile.sections]), hide_index=True, use_container_width=True)
+
+        if profile.queries:
+            st.dataframe(pd.DataFrame([{
+                'Szakasz': query['section'],
+                'Típus': query['kind'],
+                'Idő (ms)': round(query['seconds'] * 1000, 1),
+                'Sorok': query['rows'],
+                'Lekérdezés': query['query'],
+            } for query in profile.queries]), hide_index=True, use_container_width=True)
+
+        st.button("Újrafuttatás cProfile-lal", key="profile_next_rerun_button", on_click=_request_cprofile)
+
+        if profile.profile_path:
+            st.caption(f"cProfile: {profile.profile_path}")
+            st.code(profile.profile_summary, language=None)
+            with open(profile.profile_path, 'rb') as f:
+                st.download_button("cProfile letöltése", f.read(), file_name=os.path.basename(profile.profile_path),
+                                   key="profile_download_button")
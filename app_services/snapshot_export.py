@@ -0,0 +1,128 @@
+import os
+import json
+import argparse
+import logging
+import pandas as pd
+from datetime import date
+from app_services.database import get_db_connection
+from app_services.data_version import get_data_version, forget_data_version
+from app_services.device_registry import get_device_tables
+from page_modules.database_queries import get_date_bounds, get_table_data_for_date_range
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv('DFV_SNAPSHOT_DIR', os.path.join('data', 'snapshots'))
+EXPORT_STATE_FILE = "_export.json"
+
+
+def next_month(month: date) -> date:
+    """A következő hónap első napja."""
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def month_starts(first_day: date, last_day: date):
+    """A first_day és last_day közötti hónapok első napjai (a first_day hónapjától kezdve)."""
+    month = date(first_day.year, first_day.month, 1)
+    while month <= last_day:
+        yield month
+        month = next_month(month)
+
+
+def get_partition_dir(table_name: str, month: date, snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    """Egy havi partíció könyvtára (Hive elrendezés: {tábla}/month=ÉÉÉÉ-HH)."""
+    return os.path.join(snapshot_dir, table_name, f"month={month.strftime('%Y-%m')}")
+
+
+def fetch_month_frame(table_name: str, month: date, cursor=None) -> pd.DataFrame:
+    """Egy hónap összes sora (minden oszloppal) DataFrame-ként. Megadott cursor esetén annak tranzakciójában
+    olvas (pl. zárolt tábla archiválásakor), egyébként saját kapcsolatot használ."""
+    query = get_table_data_for_date_range(table_name, month.isoformat(), next_month(month).isoformat())
+    if cursor is not None:
+        cursor.execute(query)
+        column_names = [column[0] for column in cursor.description]
+        return pd.DataFrame(cursor.fetchall(), columns=column_names)
+    with get_db_connection().get_connection() as conn:
+        with conn.cursor() as own_cursor:
+            return fetch_month_frame(table_name, month, own_cursor)
+
+
+def write_partition(frame: pd.DataFrame, partition_dir: str):
+    """Egy havi partíció Parquet fájljának atomikus (ideiglenes fájl + átnevezés) írása."""
+    os.makedirs(partition_dir, exist_ok=True)
+    target_path = os.path.join(partition_dir, "part-0.parquet")
+    temp_path = target_path + ".tmp"
+    frame.to_parquet(temp_path, engine='pyarrow', index=False)
+    os.replace(temp_path, target_path)
+
+
+def _read_export_state(partition_dir: str) -> dict:
+    try:
+        with open(os.path.join(partition_dir, EXPORT_STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_export_state(partition_dir: str, data_version, exported_through: date):
+    with open(os.path.join(partition_dir, EXPORT_STATE_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"data_version": data_version, "exported_through": exported_through.isoformat()}, f)
+
+
+def _is_partition_current(partition_dir: str, month: date, data_version) -> bool:
+    """Igaz, ha a partíció exportja még érvényes: a hónap az export idején már lezárult (a tábla utolsó napja
+    a következő hónapba esett), és azóta nem változott a tábla adatverziója (pl. lezárt hónapba betöltött sorok)."""
+    state = _read_export_state(partition_dir)
+    if not state:
+        return False
+    return state["exported_through"] >= next_month(month).isoformat() and state["data_version"] == data_version
+
+
+def prepare_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Parquet-barát típusok: a dátum date32, az idő time64 oszlop, a mérések float64."""
+    for column in frame.columns:
+        if column.startswith('trend_'):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+    return frame
+
+
+def export_table_snapshot(table_name: str, full: bool = False, snapshot_dir: str = SNAPSHOT_DIR) -> int:
+    """Havi Parquet pillanatkép készítése egy táblából. Egy már exportált hónapot csak akkor ír újra, ha az
+    export idején még nyitott volt, ha a tábla adatverziója azóta változott, vagy full=True esetén.
+    Visszaadja az exportált sorok számát."""
+    bounds = get_db_connection().execute_query(get_date_bounds(table_name))
+    if not bounds or bounds[0][0] is None:
+        logger.warning(f"{table_name}: nincs exportálható adat")
+        return 0
+
+    first_day, last_day = bounds[0]
+    forget_data_version(table_name)
+    data_version = get_data_version(table_name)
+    exported_rows = 0
+    for month in month_starts(first_day, last_day):
+        partition_dir = get_partition_dir(table_name, month, snapshot_dir)
+        if not full and _is_partition_current(partition_dir, month, data_version):
+            continue
+
+        frame = fetch_month_frame(table_name, month)
+        if frame.empty:
+            continue
+        write_partition(prepare_frame(frame), partition_dir)
+        _write_export_state(partition_dir, data_version, last_day)
+        exported_rows += len(frame)
+        logger.info(f"{table_name} {month.strftime('%Y-%m')}: {len(frame)} sor exportálva")
+    return exported_rows
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Havi Parquet pillanatkép készítése a mérési táblákból.")
+    parser.add_argument("--table", action="append", choices=get_device_tables(),
+                        help="Exportálandó tábla (alapértelmezés: az összes nyilvántartott).")
+    parser.add_argument("--full", action="store_true", help="A már exportált hónapok újraírása is.")
+    parser.add_argument("--output", default=SNAPSHOT_DIR, help="A pillanatkép könyvtára.")
+    args = parser.parse_args()
+
+    for table in args.table or get_device_tables():
+        count = export_table_snapshot(table, args.full, args.output)
+        print(f"{table}: {count} sor exportálva")
@@ -0,0 +1,153 @@
+import os
+import time
+import argparse
+import logging
+import threading
+from datetime import date
+from app_services.database import get_db_connection
+from app_services.device_registry import get_device_tables
+from app_services.snapshot_export import next_month, month_starts
+from page_modules.database_queries import (
+    get_date_bounds, get_table_count, get_partition_name, get_is_partitioned, create_partitioned_table_like,
+    create_month_partition, create_partitioned_index, copy_table_rows_for_date_range, get_table_indexes,
+    get_owned_sequences, set_sequence_owner, rename_table
+)
+
+
+logger = logging.getLogger(__name__)
+
+PARTITION_MONTHS_AHEAD = int(os.getenv('DFV_PARTITION_MONTHS_AHEAD', '3'))
+
+_partitioned_tables = set()
+_partitioned_lock = threading.Lock()
+
+
+def is_partitioned(table_name: str) -> bool:
+    """Igaz, ha a tábla már havi partícionált. A pozitív választ a folyamat megjegyzi (a migráció nem visszafordítható)."""
+    with _partitioned_lock:
+        if table_name in _partitioned_tables:
+            return True
+    rows = get_db_connection().execute_query(get_is_partitioned(table_name))
+    partitioned = bool(rows and rows[0][0])
+    if partitioned:
+        with _partitioned_lock:
+            _partitioned_tables.add(table_name)
+    return partitioned
+
+
+def ensure_month_partitions(table_name: str, first_day: date, last_day: date) -> int:
+    """A first_day és last_day közötti hónapok partícióinak létrehozása egy külön, rövid tranzakcióban
+    (a partíció létrehozása a szülő táblát kizárólagosan zárolja, ezt nem érdemes egy betöltés végéig tartani).
+    Nem partícionált táblánál nem csinál semmit. Visszaadja az érintett hónapok számát."""
+    if not is_partitioned(table_name):
+        return 0
+    months = list(month_starts(first_day, last_day))
+    with get_db_connection().get_connection() as conn:
+        try:
+            with conn.cursor() as cursor:
+                for month in months:
+                    cursor.execute(create_month_partition(
+                        table_name, get_partition_name(table_name, month), month.isoformat(), next_month(month).isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(months)
+
+
+def ensure_future_partitions(table_name: str, months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """Az aktuális és a következő months_ahead hónap partícióinak előre létrehozása (ütemezett futtatáshoz)."""
+    month = date.today().replace(day=1)
+    last_month = month
+    for _ in range(months_ahead):
+        last_month = next_month(last_month)
+    return ensure_month_partitions(table_name, month, last_month)
+
+
+def migrate_table(table_name: str, months_ahead: int = PARTITION_MONTHS_AHEAD, drop_old: bool = False) -> int:
+    """Egy mérési tábla átalakítása a date oszlop szerint havi tartományokra partícionált táblává, egyetlen
+    tranzakcióban: az eredeti tábla írásait (az olvasásokat nem) a másolás idejére zárolja, létrehozza a
+    partícionált táblát az összes előzmény hónapra és months_ahead jövőbeli hónapra, havonta átmásolja a
+    sorokat, a serial oszlopok szekvenciáit az új táblához rendeli (a LIKE ... INCLUDING DEFAULTS a régi
+    szekvenciára hivatkozó alapértéket másolja), majd a két táblát átnevezi. Az eredeti tábla {tábla}_unpartitioned néven megmarad, hacsak
+    drop_old nincs megadva. Ha az átmásolt sorok száma eltér az eredeti tábláétól (pl. üres date értékű sorok),
+    a migráció hibával visszavonódik. A (date, time) indexen kívüli indexek (az elsődleges kulcsot is beleértve)
+    nem kerülnek át; ezeket figyelmeztetés jelzi. Visszaadja az átmásolt sorok számát."""
+    if is_partitioned(table_name):
+        logger.info(f"{table_name} már partícionált")
+        return 0
+
+    partitioned_table = f"{table_name}_partitioned"
+    old_table = f"{table_name}_unpartitioned"
+    copied_rows = 0
+    with get_db_connection().get_connection() as conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {table_name} IN SHARE MODE")
+                cursor.execute(get_table_indexes(table_name))
+                for index_name, index_definition in cursor.fetchall():
+                    logger.warning(f"{table_name}: a(z) {index_name} index nem kerül át a partícionált táblára "
+                                   f"(csak a (date, time) index jön létre): {index_definition}")
+                cursor.execute(get_table_count(table_name))
+                source_rows = cursor.fetchone()[0]
+                cursor.execute(get_date_bounds(table_name))
+                first_day, last_day = cursor.fetchone()
+                current_month = date.today().replace(day=1)
+                first_day = first_day or current_month
+                last_day = max(last_day or current_month, current_month)
+                for _ in range(months_ahead):
+                    last_day = next_month(last_day.replace(day=1))
+
+                cursor.execute(create_partitioned_table_like(table_name, partitioned_table))
+                for month in month_starts(first_day, last_day):
+                    started = time.perf_counter()
+                    cursor.execute(create_month_partition(
+                        partitioned_table, get_partition_name(table_name, month), month.isoformat(), next_month(month).isoformat()))
+                    cursor.execute(copy_table_rows_for_date_range(
+                        table_name, partitioned_table, month.isoformat(), next_month(month).isoformat()))
+                    copied_rows += cursor.rowcount
+                    if cursor.rowcount:
+                        logger.info(f"{table_name} {month:%Y-%m}: {cursor.rowcount} sor ({time.perf_counter() - started:.1f} s)")
+
+                if copied_rows != source_rows:
+                    raise RuntimeError(f"{table_name}: {source_rows} sorból csak {copied_rows} került át "
+                                       f"(pl. üres date értékű sorok); a migráció visszavonva")
+                cursor.execute(create_partitioned_index(partitioned_table, f"{table_name}_part_date_time_idx"))
+                cursor.execute(get_owned_sequences(table_name))
+                for column_name, sequence_name in cursor.fetchall():
+                    cursor.execute(set_sequence_owner(sequence_name, partitioned_table, column_name))
+                cursor.execute(rename_table(table_name, old_table))
+                cursor.execute(rename_table(partitioned_table, table_name))
+                if drop_old:
+                    cursor.execute(f"DROP TABLE {old_table}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"ANALYZE {table_name}")
+        conn.commit()
+
+    with _partitioned_lock:
+        _partitioned_tables.add(table_name)
+    return copied_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mérési táblák havi tartomány-partícionálása és a jövőbeli partíciók létrehozása.")
+    parser.add_argument("--table", choices=get_device_tables(), help="Csak ezt a táblát kezeli (alapértelmezés: az összes nyilvántartottat).")
+    parser.add_argument("--migrate", action="store_true", help="A még nem partícionált táblák átalakítása.")
+    parser.add_argument("--drop-old", action="store_true", help="Migráció után az eredeti tábla törlése.")
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD,
+                        help="Ennyi jövőbeli hónap partíciója jön létre előre.")
+    args = parser.parse_args()
+
+    for table_name in ([args.table] if args.table else get_device_tables()):
+        if args.migrate:
+            started = time.perf_counter()
+            copied_rows = migrate_table(table_name, args.months_ahead, args.drop_old)
+            print(f"{table_name}: {copied_rows} sor áthelyezve ({time.perf_counter() - started:.1f} s)")
+        months = ensure_future_partitions(table_name, args.months_ahead)
+        print(f"{table_name}: {months} aktuális/jövőbeli havi partíció ellenőrizve" if months
+              else f"{table_name}: nem partícionált")
@@ -0,0 +1,80 @@
+"""Diagram megjelenítési benchmark szintetikus idősorokon.
+
+Összehasonlítja a go.Scatter (SVG, markerekkel) és a go.Scattergl (WebGL, markerek nélkül) útvonalat
+10 ezer és 500 ezer pont között. Mérjük a figure felépítését és a JSON szerializálást, mert a Streamlit
+ezt küldi a böngészőnek; a böngészőbeli rajzolási idő a szerializált méret és a trace típus függvénye.
+
+Futtatás:
+    python benchmarks/chart_render_benchmark.py
+    python benchmarks/chart_render_benchmark.py --sizes 10000 100000 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from page_modules.chart_traces import create_scatter_trace
+
+DEFAULT_SIZES = [10_000, 50_000, 100_000, 250_000, 500_000]
+
+
+def _synthetic_series(point_count):
+    timestamps = pd.date_range("2024-08-19 08:00", periods=point_count, freq="15min")
+    rng = np.random.default_rng(42)
+    daily_cycle = np.sin(np.arange(point_count) * 2 * np.pi / 96)
+    values = 60 + 25 * daily_cycle + rng.normal(0, 5, point_count)
+    return timestamps, values
+
+
+def _build_figure(timestamps, values, threshold):
+    fig = go.Figure()
+    fig.add_trace(create_scatter_trace(
+        timestamps,
+        values,
+        point_count=len(values),
+        threshold=threshold,
+        mode='lines+markers',
+        name='Teljesítmény (W)',
+        line=dict(width=2),
+        marker=dict(size=4)
+    ))
+    fig.update_layout(template="plotly_white", hovermode='x unified')
+    return fig
+
+
+def _measure(timestamps, values, threshold, repeat):
+    build_times, serialize_times = [], []
+    payload_size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = _build_figure(timestamps, values, threshold)
+        build_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        payload = fig.to_json()
+        serialize_times.append(time.perf_counter() - start)
+        payload_size = len(payload)
+    return min(build_times), min(serialize_times), payload_size, type(fig.data[0]).__name__
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'pontok':>8} {'trace':>10} {'felépítés (ms)':>15} {'JSON (ms)':>10} {'méret (MB)':>11}")
+    for size in args.sizes:
+        timestamps, values = _synthetic_series(size)
+        for threshold in (float('inf'), 0):
+            build, serialize, payload_size, trace_type = _measure(timestamps, values, threshold, args.repeat)
+            print(f"{size:>8} {trace_type:>10} {build * 1000:>15.1f} {serialize * 1000:>10.1f} "
+                  f"{payload_size / 1_000_000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Indítási (import) idő riport modulonként, a `python -X importtime` kimenete alapján.
+
+Minden célt külön, friss Python folyamatban importál, így a mérés a hidegindítást tükrözi.
+A `dashboard` cél a dfv-dashboard.py modul betöltése a main() futtatása nélkül, ez fut le
+minden Streamlit újrafuttatáskor is.
+
+Futtatás:
+    python benchmarks/import_time_report.py
+    python benchmarks/import_time_report.py --top 15 --output benchmarks/results/import_time.txt
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "dashboard": (
+        "import importlib.util; "
+        "spec = importlib.util.spec_from_file_location('dfv_dashboard', 'dfv-dashboard.py'); "
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))"
+    ),
+    "app_pages.home_page": "import app_pages.home_page",
+    "app_pages.savings_page": "import app_pages.savings_page",
+    "app_pages.energy_prediction_page": "import app_pages.energy_prediction_page",
+    "app_services.eon_scraper": "import app_services.eon_scraper",
+    "statsmodels SARIMAX": "from statsmodels.tsa.statespace.sarimax import SARIMAX",
+    "selenium + webdriver_manager": "import selenium.webdriver, webdriver_manager.chrome",
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _measure(statement):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    error = result.stderr.strip().splitlines()[-1] if result.returncode != 0 else None
+    return modules, error
+
+
+def _format_report(top):
+    lines = []
+    for target, statement in TARGETS.items():
+        modules, error = _measure(statement)
+        total_ms = sum(self_us for _, self_us, _, _ in modules) / 1000
+        lines.append(f"== {target}: {total_ms:.1f} ms ({len(modules)} modul)")
+        if error:
+            lines.append(f"   HIBA: {error}")
+        top_level = sorted((m for m in modules if m[3] == 0), key=lambda m: m[2], reverse=True)
+        for name, _, cumulative_us, _ in top_level[:top]:
+            lines.append(f"   {cumulative_us / 1000:>9.1f} ms  {name}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=10, help="Célonként megjelenített legdrágább modulok száma.")
+    parser.add_argument("--output", help="A riport mentése fájlba is.")
+    args = parser.parse_args()
+
+    report = _format_report(args.top)
+    print(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+
+
+if __name__ == "__main__":
+    main()
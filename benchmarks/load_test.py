@@ -0,0 +1,263 @@
+"""Több munkamenetes terheléses teszt a dashboard oldalfüggvényein, Streamlit szerver nélkül.
+
+A Streamlit minden munkamenetet egy szálon futtat egy folyamatban, közös cache-ekkel; a teszt ezt utánozza:
+--workers folyamat indul, mindegyikben --sessions-per-worker szimulált munkamenet (szál) hajtja végre
+a forgatókönyveket a megadott súlyozással, --think-ms átlagos gondolkodási idővel, --duration másodpercig.
+
+Forgatókönyvek (a pipeline_benchmark szakaszait használják):
+  - home_page:    véletlen oldal a főoldal táblázatában és a sorszám lekérdezés,
+  - home_chart:   véletlen időintervallum és oszlop diagramja (a folyamaton belül közös diagram cache-sel),
+  - co2:          fetch_co2_emission_data,
+  - cost_savings: fogyasztási és költség megtakarítás számítás,
+  - forecast:     történeti adatok, napi előkészítés és ARIMA.
+
+Kimenet: forgatókönyvenkénti áteresztőképesség és késleltetés percentilisek, folyamatonkénti memória csúcs
+(RSS), háttérenként (PostgreSQL / DuckDB) a lekérdezések száma és ideje, PostgreSQL háttér esetén a
+pg_stat_activity szerinti kapcsolatszám.
+
+Futtatás:
+    python benchmarks/load_test.py --workers 2 --sessions-per-worker 8 --duration 60
+    python benchmarks/load_test.py --backend postgres --mix home_page=5,home_chart=3,cost_savings=1 --json data/benchmarks/load.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.pipeline_benchmark import prepare_environment, build_context, STAGE_FUNCTIONS, BENCHMARK_TABLE, \
+    DEFAULT_DATASET_DIR
+
+DEFAULT_MIX = "home_page=6,home_chart=4,co2=1,cost_savings=1,forecast=1"
+PERCENTILES = (50, 90, 95, 99)
+CONNECTION_SAMPLE_SECONDS = 0.5
+CHART_INTERVALS = ["1 óra", "3 óra", "12 óra", "1 nap", "3 nap", "7 nap", "Teljes időszak"]
+
+
+def _parse_mix(value):
+    mix = {}
+    for item in value.split(","):
+        name, weight = item.split("=")
+        if name not in STAGE_FUNCTIONS:
+            raise argparse.ArgumentTypeError(f"Ismeretlen forgatókönyv: {name}")
+        if float(weight) > 0:
+            mix[name] = float(weight)
+    return mix
+
+
+def _home_page_request(context, rng):
+    """Egy lapozási kérés: sorszám és egy véletlen oldal, ahogy a főoldal lapozáskor lekérdezi."""
+    import pandas as pd
+    from app_pages import home_page
+    from app_services.database import execute_query
+    from page_modules.database_queries import get_table_data_paginated, get_table_count
+
+    total_count = execute_query(get_table_count(BENCHMARK_TABLE))[0][0]
+    page_size = context["page_size"]
+    offset = rng.randrange(0, max(1, total_count), page_size)
+    result = execute_query(get_table_data_paginated(BENCHMARK_TABLE, home_page._get_table_columns(BENCHMARK_TABLE),
+                                                    page_size, offset))
+    return len(home_page._prepare_dataframe_for_display(pd.DataFrame(result), BENCHMARK_TABLE))
+
+
+def _home_chart_request(context, rng):
+    """Egy diagram kérés véletlen oszlopra és időintervallumra; a diagram cache-t nem üríti."""
+    from app_pages import home_page
+    db_column = rng.choice(list(home_page._get_chart_column_mapping(BENCHMARK_TABLE).values()))
+    chart_data = home_page._fetch_chart_data(BENCHMARK_TABLE, [db_column], rng.choice(CHART_INTERVALS))
+    return 0 if chart_data is None else len(chart_data["timestamp"])
+
+
+SCENARIOS = dict(STAGE_FUNCTIONS, home_page=_home_page_request, home_chart=_home_chart_request)
+
+
+def _run_session(session_index, context, mix, deadline, think_seconds, seed, samples, lock):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            if name in ("home_page", "home_chart"):
+                SCENARIOS[name](context, rng)
+            else:
+                SCENARIOS[name](context)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start
+        with lock:
+            samples.append((name, latency, error))
+        if think_seconds > 0:
+            time.sleep(min(rng.expovariate(1 / think_seconds), max(0.0, deadline - time.monotonic())))
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(worker_index, options):
+    """Egy folyamat munkamenetei. A folyamat a saját közös cache-eivel fut, mint egy Streamlit szerver."""
+    prepare_environment(argparse.Namespace(**options))
+    from app_services.query_metrics import get_query_metrics
+
+    context = build_context(options["page_size"])
+    deadline = time.monotonic() + options["duration"]
+    samples, lock = [], threading.Lock()
+    sessions = [
+        threading.Thread(target=_run_session, name=f"session-{worker_index}-{index}", args=(
+            index, context, options["mix"], deadline, options["think_ms"] / 1000,
+            options["seed"] + worker_index * 1000 + index, samples, lock))
+        for index in range(options["sessions_per_worker"])
+    ]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    return {
+        "worker": worker_index,
+        "samples": samples,
+        "peak_rss_mb": _peak_rss_mb(),
+        "queries": {backend: get_query_metrics().totals(backend) for backend in ("postgres", "duckdb")},
+    }
+
+
+class ConnectionSampler:
+    """A PostgreSQL kapcsolatok számának mintavételezése a teszt alatt (a mintavevő saját kapcsolata nélkül)."""
+
+    def __init__(self):
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="connection-sampler", daemon=True)
+
+    def _run(self):
+        from app_services.database import get_db_connection
+        try:
+            with get_db_connection().get_connection() as conn:
+                with conn.cursor() as cursor:
+                    while not self._stop.is_set():
+                        cursor.execute("SELECT count(*) FROM pg_stat_activity "
+                                       "WHERE datname = current_database() AND pid <> pg_backend_pid()")
+                        self.samples.append(cursor.fetchone()[0])
+                        conn.rollback()
+                        self._stop.wait(CONNECTION_SAMPLE_SECONDS)
+        except Exception as e:
+            print(f"A kapcsolatszám nem mérhető: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def _percentile(sorted_values, percentile):
+    index = min(len(sorted_values) - 1, max(0, int(round(percentile / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, wall_seconds):
+    samples = [sample for result in results for sample in result["samples"]]
+    report = {"wall_seconds": wall_seconds, "scenarios": {}, "workers": []}
+    for name in sorted({sample[0] for sample in samples}):
+        latencies = sorted(latency for scenario, latency, error in samples if scenario == name and error is None)
+        errors = [error for scenario, _, error in samples if scenario == name and error is not None]
+        scenario_report = {"requests": len(latencies) + len(errors), "errors": len(errors),
+                           "throughput_rps": len(latencies) / wall_seconds}
+        if errors:
+            scenario_report["first_error"] = errors[0]
+        if latencies:
+            for percentile in PERCENTILES:
+                scenario_report[f"p{percentile}_ms"] = _percentile(latencies, percentile) * 1000
+            scenario_report["max_ms"] = latencies[-1] * 1000
+        report["scenarios"][name] = scenario_report
+    for result in sorted(results, key=lambda result: result["worker"]):
+        report["workers"].append({
+            "worker": result["worker"],
+            "requests": len(result["samples"]),
+            "peak_rss_mb": result["peak_rss_mb"],
+            "postgres_queries": result["queries"]["postgres"]["count"],
+            "postgres_query_seconds": result["queries"]["postgres"]["seconds"],
+            "duckdb_queries": result["queries"]["duckdb"]["count"],
+            "duckdb_query_seconds": result["queries"]["duckdb"]["seconds"],
+        })
+    report["total_throughput_rps"] = sum(1 for sample in samples if sample[2] is None) / wall_seconds
+    return report
+
+
+def print_report(report):
+    print(f"\n{'forgatókönyv':>14} {'kérés':>7} {'hiba':>5} {'kérés/s':>8} "
+          + " ".join(f"{f'p{percentile} (ms)':>10}" for percentile in PERCENTILES) + f" {'max (ms)':>10}")
+    for name, scenario in report["scenarios"].items():
+        latency_columns = " ".join(f"{scenario.get(f'p{percentile}_ms', float('nan')):>10.1f}" for percentile in PERCENTILES)
+        print(f"{name:>14} {scenario['requests']:>7} {scenario['errors']:>5} {scenario['throughput_rps']:>8.2f} "
+              f"{latency_columns} {scenario.get('max_ms', float('nan')):>10.1f}")
+        if "first_error" in scenario:
+            print(f"{'':>14} első hiba: {scenario['first_error']}")
+    print(f"Összesen: {report['total_throughput_rps']:.2f} kérés/s ({report['wall_seconds']:.1f} s)")
+
+    print(f"\n{'folyamat':>8} {'kérés':>7} {'RSS csúcs (MB)':>15} {'PG lekérdezés':>14} {'PG idő (s)':>11} "
+          f"{'DuckDB lekérdezés':>18} {'DuckDB idő (s)':>15}")
+    for worker in report["workers"]:
+        rss = worker["peak_rss_mb"]
+        print(f"{worker['worker']:>8} {worker['requests']:>7} {'-' if rss is None else f'{rss:.0f}':>15} "
+              f"{worker['postgres_queries']:>14} {worker['postgres_query_seconds']:>11.1f} "
+              f"{worker['duckdb_queries']:>18} {worker['duckdb_query_seconds']:>15.1f}")
+
+    connections = report.get("postgres_connections")
+    if connections:
+        print(f"\nPostgreSQL kapcsolatok: csúcs {connections['peak']}, átlag {connections['mean']:.1f} "
+              f"({connections['samples']} minta)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["duckdb", "postgres"], default="duckdb")
+    parser.add_argument("--dataset-dir", default=DEFAULT_DATASET_DIR, help="Szintetikus Parquet adatkészlet (duckdb háttér).")
+    parser.add_argument("--scale", type=int, default=1, help="Az első futáskor generált adatkészlet skálája.")
+    parser.add_argument("--workers", type=int, default=1, help="Folyamatok száma.")
+    parser.add_argument("--sessions-per-worker", type=int, default=4, help="Munkamenetek (szálak) folyamatonként.")
+    parser.add_argument("--duration", type=float, default=30, help="A teszt hossza másodpercben.")
+    parser.add_argument("--think-ms", type=float, default=500, help="Átlagos gondolkodási idő két kérés között.")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX), help=f"Súlyozás, pl. {DEFAULT_MIX}")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="A riport mentése JSON fájlba.")
+    args = parser.parse_args()
+
+    prepare_environment(args)
+    options = vars(args)
+    print(f"{args.workers} folyamat x {args.sessions_per_worker} munkamenet, {args.duration:.0f} s, "
+          f"háttér: {args.backend}, forgatókönyvek: {', '.join(f'{name}={weight:g}' for name, weight in args.mix.items())}")
+
+    start = time.monotonic()
+    with (ConnectionSampler() if args.backend == "postgres" else contextlib.nullcontext()) as sampler:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = list(executor.map(run_worker, range(args.workers), [options] * args.workers))
+    report = summarize(results, time.monotonic() - start)
+    if sampler and sampler.samples:
+        report["postgres_connections"] = {"peak": max(sampler.samples), "samples": len(sampler.samples),
+                                          "mean": sum(sampler.samples) / len(sampler.samples)}
+    print_report(report)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(report, options={key: value for key, value in options.items() if key != "json"}),
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""A dashboard számítási útvonalainak végponttól végpontig tartó benchmarkja a szintetikus adatkészleten.
+
+Streamlit szerver nélkül futtatja az oldalak számítási lépéseit, szakaszonként mérve a futási időt és
+a tracemalloc szerinti memória csúcsot:
+  - co2:          fetch_co2_emission_data (lekérdezés, órás CO2 illesztés, napi statisztika),
+  - cost_savings: a fogyasztási és költség megtakarítás modul lekérdezései és számításai,
+  - forecast:     történeti adatok, _prepare_daily_dataframe (májusi pótlással) és _train_arima_model,
+  - home_chart:   a főoldal diagram lekérdezése a teljes időszakra (üres diagram cache-sel),
+  - home_page:    a főoldal táblázat lapozása (első, középső, utolsó oldal) és a sorszám lekérdezés.
+
+Az időt a tracemalloc nélküli ismétlések legjobbja adja, a memória csúcsot egy külön, nyomkövetett futás.
+Minden mérés a data/benchmarks/pipeline_history.jsonl fájlhoz fűződik a git verzióval együtt, és a
+kiírás az azonos adatkészlettel és háttérrel készült előző méréshez viszonyít.
+
+Alapértelmezésben a DuckDB háttérrel fut a data/benchmark_snapshots könyvtárban, amelyet az első
+futás a synthetic_dataset generátorral állít elő.
+
+Futtatás:
+    python benchmarks/pipeline_benchmark.py
+    python benchmarks/pipeline_benchmark.py --scale 10 --repeat 5 --stages co2 cost_savings
+    python benchmarks/pipeline_benchmark.py --backend postgres --fail-on-regression 15
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import date, datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+DEFAULT_DATASET_DIR = os.path.join("data", "benchmark_snapshots")
+DEFAULT_HISTORY_PATH = os.path.join("data", "benchmarks", "pipeline_history.jsonl")
+BENCHMARK_TABLE = "dfv_smart_db"
+BENCHMARK_HEATER_POWER_W = 60.0
+BENCHMARK_PRICES = {date(2024, 1, 1): 36.0, date(2025, 1, 1): 39.5}
+STAGES = ["co2", "cost_savings", "forecast", "home_chart", "home_page"]
+
+
+def prepare_environment(args):
+    """A lekérdezési háttér kiválasztása a projekt modulok importálása előtt (a DFV_* változókat importkor olvassák)."""
+    os.environ["DFV_QUERY_BACKEND"] = args.backend
+    if args.backend == "duckdb":
+        os.environ["DFV_SNAPSHOT_DIR"] = args.dataset_dir
+        if not os.path.isdir(os.path.join(args.dataset_dir, BENCHMARK_TABLE)):
+            from benchmarks.synthetic_dataset import generate, DEFAULT_END, DEFAULT_GAPS, _parse_gap
+            print(f"Szintetikus adatkészlet generálása: {args.dataset_dir} (skála: {args.scale})")
+            generate("parquet", args.scale, 1, [_parse_gap(gap) for gap in DEFAULT_GAPS],
+                     DEFAULT_END, args.dataset_dir, drop=False)
+
+
+def _benchmark_price_store():
+    from app_services.price_store import PriceStore
+    store = PriceStore(os.path.join(tempfile.mkdtemp(prefix="dfv-bench-"), "prices.sqlite3"))
+    store.record_prices(BENCHMARK_PRICES, source="benchmark", fetched_at=datetime.now())
+    return store
+
+
+def build_context(page_size):
+    """A szakaszok közös bemenetei: a tábla dátumtartománya, egy ideiglenes ár tároló és a lapméret."""
+    from app_services.database import execute_query
+    from page_modules.database_queries import get_date_bounds
+
+    first_date, last_date = execute_query(get_date_bounds(BENCHMARK_TABLE))[0]
+    return {
+        "date_range": (str(first_date), str(last_date)),
+        "price_store": _benchmark_price_store(),
+        "page_size": page_size,
+    }
+
+
+def _stage_co2(context):
+    from app_services.co2_calculation import fetch_co2_emission_data
+    _, hourly_with_power, daily_co2_df, _ = fetch_co2_emission_data(
+        table_name=BENCHMARK_TABLE, heater_power=BENCHMARK_HEATER_POWER_W)
+    return 0 if daily_co2_df is None else len(hourly_with_power)
+
+
+def _stage_cost_savings(context):
+    from app_services.device_registry import get_devices
+    from app_services.measurement_access import fetch_controller_frames
+    from page_modules import consumption_cost_savings_module as savings
+
+    start_date, end_date = context["date_range"]
+    smart_device, thermostat_device = get_devices('smart')[0], get_devices('thermostat')[0]
+    controller_frames = fetch_controller_frames(start_date, end_date, [smart_device, thermostat_device])
+    smart_data = controller_frames[smart_device.device_id]
+    thermostat_data = controller_frames[thermostat_device.device_id]
+    smart_df, thermostat_df = savings._prepare_dataframes(smart_data, thermostat_data)
+    smart_daily, thermostat_daily = savings._calculate_daily_energy(smart_df, thermostat_df)
+    savings._attach_loss_prices(smart_daily, context["price_store"])
+    savings._attach_loss_prices(thermostat_daily, context["price_store"])
+    heater_daily_energy = (BENCHMARK_HEATER_POWER_W * savings.HEATER_USAGE_HOURS) / 1000.0
+    *_, total_days = savings._calculate_costs(smart_daily, thermostat_daily, heater_daily_energy)
+    savings._calculate_savings(smart_daily, thermostat_daily, heater_daily_energy, total_days)
+    savings._calculate_smart_vs_thermo_savings(smart_daily, thermostat_daily)
+    savings._calculate_operating_hours(smart_df, thermostat_df)
+    return len(smart_data) + len(thermostat_data)
+
+
+def _stage_forecast(context):
+    from app_pages import energy_prediction_page as prediction
+
+    data = prediction._fetch_historical_data("éves", BENCHMARK_TABLE)
+    df = prediction._prepare_dataframe(data)
+    daily_df = prediction._prepare_daily_dataframe(df, True, BENCHMARK_TABLE)
+    if prediction._load_sarimax() is not None:
+        forecast_start = date(prediction.FORECAST_YEAR, 1, 1)
+        forecast_end = date(prediction.FORECAST_YEAR, 1, 31)
+        prediction._train_arima_model(daily_df, 31, forecast_start, forecast_end)
+    return len(data)
+
+
+def _stage_home_chart(context):
+    from app_pages import home_page
+    from app_services.chart_cache import get_chart_cache
+
+    get_chart_cache().invalidate(BENCHMARK_TABLE)
+    db_columns = list(home_page._get_chart_column_mapping(BENCHMARK_TABLE).values())
+    chart_columns_data = home_page._fetch_chart_data(BENCHMARK_TABLE, db_columns, "Teljes időszak")
+    return 0 if chart_columns_data is None else len(chart_columns_data["timestamp"])
+
+
+def _stage_home_page(context):
+    import pandas as pd
+    from app_pages import home_page
+    from app_services.database import execute_query
+    from page_modules.database_queries import get_table_data_paginated, get_table_count
+
+    total_count = execute_query(get_table_count(BENCHMARK_TABLE))[0][0]
+    columns = home_page._get_table_columns(BENCHMARK_TABLE)
+    page_size = context["page_size"]
+    last_offset = max(0, (total_count - 1) // page_size * page_size)
+    row_count = 0
+    for offset in (0, last_offset // page_size // 2 * page_size, last_offset):
+        result = execute_query(get_table_data_paginated(BENCHMARK_TABLE, columns, page_size, offset))
+        row_count += len(home_page._prepare_dataframe_for_display(pd.DataFrame(result), BENCHMARK_TABLE))
+    return row_count
+
+
+STAGE_FUNCTIONS = {
+    "co2": _stage_co2,
+    "cost_savings": _stage_cost_savings,
+    "forecast": _stage_forecast,
+    "home_chart": _stage_home_chart,
+    "home_page": _stage_home_page,
+}
+
+
+def _measure_stage(stage_function, context, repeat):
+    """A legjobb futási idő tracemalloc nélkül, majd egy nyomkövetett futás memória csúcsa."""
+    wall_times = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = stage_function(context)
+        wall_times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        stage_function(context)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"wall_ms": min(wall_times) * 1000, "peak_mb": peak_bytes / 1_000_000, "rows": rows}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_previous(history_path, dataset_key):
+    if not os.path.exists(history_path):
+        return None
+    previous = None
+    with open(history_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("dataset") == dataset_key:
+                previous = record
+    return previous
+
+
+def _append_history(history_path, record):
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _change(current, previous):
+    if previous is None or previous == 0:
+        return None
+    return (current - previous) / previous * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["duckdb", "postgres"], default="duckdb")
+    parser.add_argument("--dataset-dir", default=DEFAULT_DATASET_DIR, help="Szintetikus Parquet adatkészlet (duckdb háttér).")
+    parser.add_argument("--scale", type=int, default=1, help="Az első futáskor generált adatkészlet skálája.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH)
+    parser.add_argument("--fail-on-regression", type=float, metavar="SZÁZALÉK",
+                        help="Nem nulla kilépési kód, ha bármely szakasz ideje ennyivel romlott az előzőhöz képest.")
+    args = parser.parse_args()
+
+    prepare_environment(args)
+    context = build_context(args.page_size)
+    first_date, last_date = context["date_range"]
+    dataset_key = f"{args.backend}:{os.path.abspath(args.dataset_dir) if args.backend == 'duckdb' else 'DB_*'}:" \
+                  f"{first_date}..{last_date}"
+    previous = _load_previous(args.history, dataset_key)
+
+    results = {}
+    regressions = []
+    print(f"{'szakasz':>14} {'sorok':>10} {'idő (ms)':>10} {'változás':>9} {'csúcs (MB)':>11} {'változás':>9}")
+    for stage in args.stages:
+        result = _measure_stage(STAGE_FUNCTIONS[stage], context, args.repeat)
+        results[stage] = result
+        previous_result = (previous or {}).get("stages", {}).get(stage, {})
+        time_change = _change(result["wall_ms"], previous_result.get("wall_ms"))
+        memory_change = _change(result["peak_mb"], previous_result.get("peak_mb"))
+        if args.fail_on_regression is not None and time_change is not None and time_change > args.fail_on_regression:
+            regressions.append(stage)
+        print(f"{stage:>14} {result['rows']:>10} {result['wall_ms']:>10.1f} "
+              f"{'-' if time_change is None else f'{time_change:+.1f}%':>9} {result['peak_mb']:>11.1f} "
+              f"{'-' if memory_change is None else f'{memory_change:+.1f}%':>9}")
+
+    _append_history(args.history, {
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "dataset": dataset_key,
+        "repeat": args.repeat,
+        "stages": results,
+    })
+    if previous:
+        print(f"Összehasonlítás: {previous.get('revision')} ({previous.get('recorded_at')})")
+    if regressions:
+        print(f"Romlás (> {args.fail_on_regression}%): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Szintetikus DFV adatkészlet generátor benchmarkokhoz.
+
+Valószerű dfv_smart_db és dfv_termosztat_db táblákat állít elő 15 perces mintavétellel, az összes trend_*
+oszloppal: évszakos és napi ciklusú külső hőmérséklet és páratartalom, a dinamikus vezérlő folytonosan
+szabályozott, a termosztátos vezérlő ki-be kapcsoló fűtőteljesítménye, ebből áramerősség és harmatpont.
+A valódi adatbázis hiányzó időszakai (pl. 2025 május) kihagyott tartományként adhatók meg.
+
+A skála (--scale) az időtartományt nyújtja visszafelé (1x = egy év, mint a jelenlegi adat), a --devices
+további eszközönként külön táblapárt ír (_dev2, _dev3, ... utótaggal).
+
+Célok:
+  - postgres: a DB_* változókkal (vagy a Streamlit secrets-szel) megadott PostgreSQL adatbázisba tölt COPY-val,
+  - parquet:  a havi Parquet pillanatkép elrendezésbe ír (data/snapshots), amelyet a DFV_QUERY_BACKEND=duckdb
+              beállítással minden oldal helyi DuckDB-n kérdez le.
+
+Futtatás:
+    python benchmarks/synthetic_dataset.py --target parquet --scale 10
+    python benchmarks/synthetic_dataset.py --target postgres --scale 1 --devices 3 --drop
+    python benchmarks/synthetic_dataset.py --target parquet --gap 2025-05-01:2025-05-31 --gap 2024-12-24:2024-12-26
+"""
+import io
+import os
+import sys
+import contextlib
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from page_modules.database_queries import get_measurement_columns, create_measurement_table
+
+BASE_TABLES = ["dfv_smart_db", "dfv_termosztat_db"]
+DEFAULT_END = datetime(2025, 8, 21, 23, 45)
+DEFAULT_SPAN_DAYS = 368
+DEFAULT_GAPS = ["2025-05-01:2025-05-31"]
+INTERVAL = "15min"
+HEATER_POWER_KW = 0.06
+SUPPLY_VOLTAGE = 230.0
+SETPOINT_C = 21.0
+
+
+def _parse_gap(value):
+    start, end = value.split(":")
+    return pd.Timestamp(start), pd.Timestamp(end) + timedelta(days=1)
+
+
+def _device_table_name(base_table, device):
+    return base_table if device == 1 else f"{base_table}_dev{device}"
+
+
+def _dew_point(temperature, humidity):
+    """Harmatpont a Magnus képlettel."""
+    a, b = 17.62, 243.12
+    gamma = np.log(np.clip(humidity, 1, 100) / 100.0) + a * temperature / (b + temperature)
+    return b * gamma / (a - gamma)
+
+
+def _outdoor_conditions(timestamps, rng):
+    day_of_year = timestamps.dayofyear.to_numpy()
+    hour = (timestamps.hour + timestamps.minute / 60).to_numpy()
+    seasonal = 11 - 12 * np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+    daily = 4 * np.sin(2 * np.pi * (hour - 9) / 24)
+    temperature = seasonal + daily + rng.normal(0, 1.5, len(timestamps))
+    humidity = np.clip(75 - 1.2 * (temperature - 10) + rng.normal(0, 6, len(timestamps)), 20, 100)
+    return temperature, humidity
+
+
+def _controller_readings(is_smart, outdoor_temperature, rng):
+    heat_demand = np.clip((SETPOINT_C - outdoor_temperature) / 25.0, 0, 1)
+    if is_smart:
+        power = HEATER_POWER_KW * np.clip(heat_demand + rng.normal(0, 0.05, len(heat_demand)), 0, 1)
+        indoor_temperature = SETPOINT_C + rng.normal(0, 0.3, len(heat_demand))
+    else:
+        power = HEATER_POWER_KW * (rng.random(len(heat_demand)) < np.clip(heat_demand * 1.3, 0, 1))
+        indoor_temperature = SETPOINT_C + 1.0 * np.sin(np.arange(len(heat_demand)) / 3) + rng.normal(0, 0.4, len(heat_demand))
+    indoor_humidity = np.clip(45 + rng.normal(0, 4, len(heat_demand)) - 0.3 * (indoor_temperature - SETPOINT_C), 15, 90)
+    current = power * 1000 / SUPPLY_VOLTAGE
+    return power, current, indoor_temperature, indoor_humidity
+
+
+def _without_gaps(timestamps, gaps):
+    keep = np.ones(len(timestamps), dtype=bool)
+    for gap_start, gap_end in gaps:
+        keep &= ~((timestamps >= gap_start) & (timestamps < gap_end))
+    return timestamps[keep]
+
+
+def generate_month_frame(base_table, month_start, month_end, first_id, seed, gaps=()):
+    """Egy tábla egy hónapjának szintetikus sorai a tábla oszlopsorrendjében, a kihagyott tartományok nélkül."""
+    rng = np.random.default_rng(seed)
+    timestamps = _without_gaps(pd.date_range(month_start, month_end, freq=INTERVAL, inclusive="left"), gaps)
+    outdoor_temperature, outdoor_humidity = _outdoor_conditions(timestamps, rng)
+    is_smart = base_table == "dfv_smart_db"
+    power, current, indoor_temperature, indoor_humidity = _controller_readings(is_smart, outdoor_temperature, rng)
+
+    prefix = "trend_smart" if is_smart else "trend_termosztat"
+    values = {
+        f"{prefix}_dp": _dew_point(indoor_temperature, indoor_humidity),
+        f"{prefix}_t": indoor_temperature,
+        f"{prefix}_i1": current,
+        f"{prefix}_p": power,
+        f"{prefix}_rh": indoor_humidity,
+        "trend_kulso_paratartalom": outdoor_humidity,
+        "trend_kulso_homerseklet_pillanatnyi": outdoor_temperature,
+    }
+    frame = pd.DataFrame({
+        "id": np.arange(first_id, first_id + len(timestamps), dtype=np.int64),
+        "date": timestamps.date,
+        "time": timestamps.time,
+    })
+    for column in get_measurement_columns(base_table):
+        frame[column] = np.round(values[column], 3)
+    return frame
+
+
+def _month_ranges(start, end):
+    month = pd.Timestamp(start.year, start.month, 1)
+    while month < end:
+        next_month = month + pd.offsets.MonthBegin(1)
+        yield max(month, pd.Timestamp(start)), min(next_month, pd.Timestamp(end)), month
+        month = next_month
+
+
+def _write_parquet(table_name, month, frame, output_dir):
+    from app_services.snapshot_export import get_partition_dir, write_partition
+    write_partition(frame, get_partition_dir(table_name, month.date(), output_dir))
+
+
+def _write_postgres(cursor, table_name, frame):
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table_name} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def generate(target, scale, devices, gaps, end, output_dir, drop):
+    end = pd.Timestamp(end) + timedelta(minutes=15)
+    start = end - timedelta(days=DEFAULT_SPAN_DAYS * scale)
+    if target == "postgres":
+        from app_services.database import get_db_connection
+        connection_context = get_db_connection().get_connection()
+    else:
+        connection_context = contextlib.nullcontext()
+
+    total_rows = 0
+    with connection_context as connection:
+        for device in range(1, devices + 1):
+            for table_index, base_table in enumerate(BASE_TABLES):
+                table_name = _device_table_name(base_table, device)
+                if connection is not None:
+                    with connection.cursor() as cursor:
+                        if drop:
+                            cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+                        cursor.execute(create_measurement_table(table_name))
+                    connection.commit()
+
+                next_id = 1
+                for month_start, month_end, month in _month_ranges(start, end):
+                    seed = hash((device, table_index, month.year, month.month)) & 0xFFFFFFFF
+                    frame = generate_month_frame(base_table, month_start, month_end, next_id, seed, gaps)
+                    next_id += len(frame)
+                    if frame.empty:
+                        continue
+                    if connection is not None:
+                        with connection.cursor() as cursor:
+                            _write_postgres(cursor, table_name, frame)
+                        connection.commit()
+                    else:
+                        _write_parquet(table_name, month, frame, output_dir)
+                    total_rows += len(frame)
+                print(f"{table_name}: {next_id - 1} sor")
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["postgres", "parquet"], default="parquet")
+    parser.add_argument("--scale", type=int, default=1, help="Adatmennyiség szorzó (1, 10, 100 ...).")
+    parser.add_argument("--devices", type=int, default=1, help="Eszközök (táblapárok) száma.")
+    parser.add_argument("--gap", action="append", help="Kihagyott tartomány ÉÉÉÉ-HH-NN:ÉÉÉÉ-HH-NN (zárt). "
+                                                       "Alapértelmezés: 2025-05-01:2025-05-31.")
+    parser.add_argument("--end", default=DEFAULT_END.isoformat(), help="Utolsó mérés időpontja.")
+    parser.add_argument("--output", default=os.path.join("data", "snapshots"), help="Parquet cél könyvtár.")
+    parser.add_argument("--drop", action="store_true", help="PostgreSQL cél esetén a táblák újralétrehozása.")
+    args = parser.parse_args()
+
+    gaps = [_parse_gap(gap) for gap in (args.gap or DEFAULT_GAPS)]
+    total_rows = generate(args.target, args.scale, args.devices, gaps, args.end, args.output, args.drop)
+    print(f"Összesen {total_rows} sor")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Időbélyeg előállítási benchmark: szöveges összefűzés pandasban vs. szerver oldali (date + time) oszlop.
+
+Három utat hasonlít össze szintetikus, 15 perces mérési sorokon:
+  - régi: pd.to_datetime(date.astype(str) + ' ' + time.astype(str)) Python date/time objektumokon,
+  - típusos: datetime64 dátum + pd.to_timedelta(idő szöveg), a fetch_frame által adott típusokon,
+  - szerver: a lekérdezés (date + time) AS ts oszlopa, amelyet a read_csv közvetlenül datetime64-ként olvas be
+    (a mérés a COPY kimenetét szimulálja, így a beolvasás költségét is tartalmazza).
+
+Futtatás:
+    python benchmarks/timestamp_parse_benchmark.py
+    python benchmarks/timestamp_parse_benchmark.py --sizes 35000 350000 --repeat 5
+"""
+import io
+import time
+import argparse
+import pandas as pd
+
+DEFAULT_SIZES = [35_000, 100_000, 350_000]
+
+
+def _synthetic_timestamps(row_count):
+    return pd.date_range("2024-08-19 08:00", periods=row_count, freq="15min")
+
+
+def _legacy(timestamps):
+    frame = pd.DataFrame({'date': timestamps.date, 'time': timestamps.time})
+    start = time.perf_counter()
+    pd.to_datetime(frame['date'].astype(str) + ' ' + frame['time'].astype(str))
+    return time.perf_counter() - start
+
+
+def _typed(timestamps):
+    frame = pd.DataFrame({'date': timestamps.normalize(), 'time': timestamps.strftime('%H:%M:%S')})
+    start = time.perf_counter()
+    frame['date'] + pd.to_timedelta(frame['time'])
+    return time.perf_counter() - start
+
+
+def _server_side(timestamps):
+    csv_payload = pd.DataFrame({'ts': timestamps}).to_csv(index=False)
+    start = time.perf_counter()
+    pd.read_csv(io.StringIO(csv_payload), parse_dates=['ts'])
+    return time.perf_counter() - start
+
+
+def _csv_payload_cost(timestamps):
+    """A szerver oldali út összehasonlíthatóságához: a régi út is beolvasná a date és time oszlopokat."""
+    csv_payload = pd.DataFrame({'date': timestamps.date, 'time': timestamps.time}).to_csv(index=False)
+    start = time.perf_counter()
+    frame = pd.read_csv(io.StringIO(csv_payload), dtype=str)
+    pd.to_datetime(frame['date'] + ' ' + frame['time'])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    variants = [
+        ("régi (str + str)", _legacy),
+        ("CSV + str összefűzés", _csv_payload_cost),
+        ("típusos (date + timedelta)", _typed),
+        ("szerver (ts oszlop)", _server_side),
+    ]
+    print(f"{'sorok':>8} {'módszer':>28} {'idő (ms)':>10}")
+    for size in args.sizes:
+        timestamps = _synthetic_timestamps(size)
+        for name, measure in variants:
+            best = min(measure(timestamps) for _ in range(args.repeat))
+            print(f"{size:>8} {name:>28} {best * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
+import importlib
 import streamlit as st
-from app_pages.home_page import show_home_page
-from app_pages.energy_prediction_page import show_energy_prediction_page
-from app_pages.savings_page import show_savings_page
-from app_services.eon_scraper import scrape_eon_prices
+
+PAGE_MODULES = {
+    "Főoldal": ("app_pages.home_page", "show_home_page"),
+    "Energiafogyasztás és megtakarítás előrejelzés": ("app_pages.energy_prediction_page", "show_energy_prediction_page"),
+    "Megtakarítások": ("app_pages.savings_page", "show_savings_page")
+}
 
 
 def _initialize_session_state():
@@ -84,41 +87,48 @@ def _setup_savings_sidebar():
 
 
 def _load_eon_prices():
-    if 'loss_prices' not in st.session_state:
-        with st.spinner("E.ON árak automatikus lekérése..."):
-            loss_prices, error = scrape_eon_prices()
-        
-        if error:
-            st.session_state.loss_prices = None
-            st.session_state.eon_error = error
-        else:
-            st.session_state.loss_prices = loss_prices 
-            st.session_state.eon_error = None
-            
-            if loss_prices and '2025' in loss_prices:
-                st.session_state.loss_price = loss_prices['2025']
+    from app_services.price_refresher import get_price_refresher
+    price_refresher = get_price_refresher()
+    price_refresher.ensure_fresh()
+    snapshot = price_refresher.snapshot()
+    
+    st.session_state.eon_prices_available = snapshot['available']
+    st.session_state.eon_error = snapshot['error']
+    st.session_state.eon_prices_fetched_at = snapshot['fetched_at']
+    st.session_state.eon_prices_refreshing = snapshot['is_refreshing']
+    st.session_state.eon_prices_stale = snapshot['is_stale']
 
 
 def _display_page():
     page = st.session_state.page
+    if page not in PAGE_MODULES:
+        return
 
-    if page == "Főoldal":
-        show_home_page()
-    elif page == "Energiafogyasztás és megtakarítás előrejelzés":
-        show_energy_prediction_page()
-    elif page == "Megtakarítások":
-        show_savings_page()
+    module_name, function_name = PAGE_MODULES[page]
+    page_module = importlib.import_module(module_name)
+    getattr(page_module, function_name)()
 
 
 def main():
-    _initialize_session_state()
-    _setup_sidebar_navigation()
-    
-    if st.session_state.page == "Megtakarítások":
-        _setup_savings_sidebar()
-    
-    _load_eon_prices()
-    _display_page()
+    from app_services.rerun_profiler import begin_rerun, finish_rerun, profile_section
+    from app_services.query_metrics import query_page
+    begin_rerun()
+    try:
+        _initialize_session_state()
+        _setup_sidebar_navigation()
+        
+        if st.session_state.page == "Megtakarítások":
+            _setup_savings_sidebar()
+        
+        with profile_section("_load_eon_prices"):
+            _load_eon_prices()
+        with profile_section(st.session_state.page), query_page(st.session_state.page):
+            _display_page()
+        
+        from app_services.frame_schema import display_session_memory_report
+        display_session_memory_report()
+    finally:
+        finish_rerun()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+import os
+import plotly.graph_objects as go
+
+WEBGL_POINT_THRESHOLD = int(os.getenv('DFV_WEBGL_POINT_THRESHOLD', '5000'))
+
+
+"""Eldönti, hogy az adott pontszámnál WebGL megjelenítést kell-e használni."""
+def use_webgl(point_count: int, threshold: int = None) -> bool:
+    return point_count > (WEBGL_POINT_THRESHOLD if threshold is None else threshold)
+
+
+"""Scatter trace létrehozása. A küszöb feletti pontszámnál go.Scattergl-re vált és elhagyja a markereket.
+Egy diagramon belül minden trace-nek ugyanazt a point_count értéket kell kapnia, hogy a kitöltések
+(fill='tonexty') azonos típusú trace-ek között jöjjenek létre."""
+def create_scatter_trace(x, y, point_count: int = None, threshold: int = None, **kwargs):
+    if point_count is None:
+        point_count = len(x)
+
+    if not use_webgl(point_count, threshold):
+        return go.Scatter(x=x, y=y, **kwargs)
+
+    mode = kwargs.get('mode', 'lines')
+    if 'lines' in mode and 'markers' in mode:
+        kwargs['mode'] = mode.replace('+markers', '').replace('markers+', '')
+        kwargs.pop('marker', None)
+    return go.Scattergl(x=x, y=y, **kwargs)
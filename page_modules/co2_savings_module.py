@@ -6,13 +6,14 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app_services.co2_calculation import fetch_co2_emission_data
+from app_services.frame_schema import store_session_frame
+from app_services.rerun_profiler import profiled
+from app_services.device_registry import get_device_tables, get_device_for_table
+from app_services.measurement_access import map_devices
+from page_modules.chart_traces import create_scatter_trace
+from page_modules.device_selection import select_comparison_devices
 
 
-TABLE_OPTIONS = {
-    "dfv_smart_db": "Dinamikus fűtésvezérlő",
-    "dfv_termosztat_db": "Termosztátos vezérlő"
-}
-
 """Inicializálja a cache változókat. Ha nincs cache-elve akkor inicializálja a változókat."""
 def _initialize_cache():
     if 'co2_cached_days' not in st.session_state:
@@ -21,6 +22,8 @@ def _initialize_cache():
         st.session_state.co2_cached_heater_power = None
     if 'co2_cached_table' not in st.session_state:
         st.session_state.co2_cached_table = None
+    if 'co2_cached_comparison' not in st.session_state:
+        st.session_state.co2_cached_comparison = None
 
 """Törli a CO2 cache-t. Ha a cache-elt adatok változnak, akkor törli a cache-et."""
 def _clear_cache():
@@ -32,32 +35,42 @@ def _clear_cache():
         if key in st.session_state:
             del st.session_state[key]
 
-"""Frissíti a cache-t, ha változott a fűtőteljesítmény vagy a tábla."""
-def _update_cache_if_needed(selected_table, heater_power):
+"""Frissíti a cache-t, ha változott a fűtőteljesítmény, a tábla vagy az összehasonlított vezérlők."""
+def _update_cache_if_needed(selected_table, heater_power, comparison_devices):
     current_heater_power = st.session_state.get('heater_power', None)
+    comparison_ids = tuple(device.device_id for device in comparison_devices)
     if (st.session_state.co2_cached_heater_power != current_heater_power) or \
-       (st.session_state.co2_cached_table != selected_table):
+       (st.session_state.co2_cached_table != selected_table) or \
+       (st.session_state.co2_cached_comparison != comparison_ids):
         _clear_cache()
         st.session_state.co2_cached_heater_power = current_heater_power
         st.session_state.co2_cached_table = selected_table
+        st.session_state.co2_cached_comparison = comparison_ids
 
-"""Lekéri mindkét tábla adatait a diagramhoz. Ha már van cache-elve akkor nem kéri le újra."""
-def _fetch_all_table_data(heater_power, days_to_show=10):
+"""Lekéri az összehasonlított vezérlők adatait a diagramhoz, eszközönként párhuzamosan. Ha már van cache-elve akkor nem kéri le újra."""
+@profiled
+def _fetch_all_table_data(heater_power, comparison_devices, days_to_show=10):
     if ('co2_daily_dataframe_smart' in st.session_state) and \
        ('co2_daily_dataframe_thermo' in st.session_state):
         return
     
+    smart_device, thermostat_device = comparison_devices
     with st.spinner("CO2 adatok lekérése folyamatban..."):
-        result_smart = fetch_co2_emission_data(days_to_show, None, "dfv_smart_db", heater_power)
-        result_thermo = fetch_co2_emission_data(days_to_show, None, "dfv_termosztat_db", heater_power)
+        results = map_devices(
+            lambda device: fetch_co2_emission_data(days_to_show, None, device.table, heater_power),
+            [smart_device, thermostat_device]
+        )
+        result_smart = results[smart_device.device_id]
+        result_thermo = results[thermostat_device.device_id]
         
         if result_smart and len(result_smart) >= 3 and result_smart[2] is not None:
-            st.session_state['co2_daily_dataframe_smart'] = result_smart[2]
+            store_session_frame('co2_daily_dataframe_smart', result_smart[2])
         
         if result_thermo and len(result_thermo) >= 3 and result_thermo[2] is not None:
-            st.session_state['co2_daily_dataframe_thermo'] = result_thermo[2]
+            store_session_frame('co2_daily_dataframe_thermo', result_thermo[2])
 
 """Lekéri a kiválasztott tábla adatait. Ha már van cache-elve akkor nem kéri le újra."""
+@profiled
 def _fetch_selected_table_data(selected_table, heater_power, days_to_show=10):
     if ('co2_hourly_dataframe' in st.session_state) and \
        ('co2_daily_dataframe' in st.session_state) and \
@@ -69,15 +82,15 @@ def _fetch_selected_table_data(selected_table, heater_power, days_to_show=10):
         
         if result and len(result) >= 3:
             if result[0] is not None:
-                st.session_state['co2_hourly_dataframe'] = result[0]
+                store_session_frame('co2_hourly_dataframe', result[0])
                 st.session_state['co2_cached_days'] = days_to_show
                 st.session_state['co2_cached_table'] = selected_table
             
             if result[1] is not None and result[2] is not None:
-                st.session_state['co2_hourly_with_power'] = result[1]
-                st.session_state['co2_daily_dataframe'] = result[2]
+                store_session_frame('co2_hourly_with_power', result[1])
+                store_session_frame('co2_daily_dataframe', result[2])
                 if len(result) > 3 and result[3] is not None:
-                    st.session_state['power_co2_pairs'] = result[3]
+                    store_session_frame('power_co2_pairs', result[3])
 
 """Kiszámítja a hagyományos fűtőtest CO2 kibocsátását"""
 def _calculate_heater_co2(co2_hourly_df, heater_power):
@@ -229,6 +242,7 @@ def _display_comparison_table(comparison_df, selected_table_display_name):
 """Létrehozza az összehasonlító diagramot (vonal diagram)."""
 def _create_comparison_chart(comparison_df, heater_daily_co2):
     st.write("### Vizuális összehasonlítás")
+    point_count = len(comparison_df)
     fig_comparison = go.Figure()
     
     comparison_df_kg = comparison_df.copy()
@@ -245,9 +259,10 @@ def _create_comparison_chart(comparison_df, heater_daily_co2):
         )
         smart_comparison['Napi CO2 (g)'] = smart_comparison['Napi CO2 (g)'] / 1000.0
         
-        fig_comparison.add_trace(go.Scatter(
-            x=smart_comparison['Dátum'],
-            y=smart_comparison['Napi CO2 (g)'],
+        fig_comparison.add_trace(create_scatter_trace(
+            smart_comparison['Dátum'],
+            smart_comparison['Napi CO2 (g)'],
+            point_count=point_count,
             mode='lines+markers',
             name='Dinamikus fűtésvezérlő CO2 kibocsátás',
             line=dict(color='blue', width=2),
@@ -264,18 +279,20 @@ def _create_comparison_chart(comparison_df, heater_daily_co2):
         )
         thermo_comparison['Napi CO2 (g)'] = thermo_comparison['Napi CO2 (g)'] / 1000.0
         
-        fig_comparison.add_trace(go.Scatter(
-            x=thermo_comparison['Dátum'],
-            y=thermo_comparison['Napi CO2 (g)'],
+        fig_comparison.add_trace(create_scatter_trace(
+            thermo_comparison['Dátum'],
+            thermo_comparison['Napi CO2 (g)'],
+            point_count=point_count,
             mode='lines+markers',
             name='Termosztátos vezérlő CO2 kibocsátás',
             line=dict(color='green', width=2),
             marker=dict(size=6)
         ))
     
-    fig_comparison.add_trace(go.Scatter(
-        x=comparison_df_kg['Dátum'],
-        y=comparison_df_kg['Folyamatos működés esetén napi CO2 (g)'],
+    fig_comparison.add_trace(create_scatter_trace(
+        comparison_df_kg['Dátum'],
+        comparison_df_kg['Folyamatos működés esetén napi CO2 (g)'],
+        point_count=point_count,
         mode='lines',
         name='Folyamatos működés esetén CO2 kibocsátás',
         line=dict(color='red', width=1.5, dash='dash')
@@ -403,6 +420,7 @@ def _display_heatmap(comparison_type, heater_daily_co2):
 
 
 """CO2 megtakarítások számítása és megjelenítése."""
+@profiled
 def show_co2_savings():
     st.write("## CO2 megtakarítás számítása")
     
@@ -410,22 +428,27 @@ def show_co2_savings():
     with col1:
         selected_table = st.selectbox(
             "Válassz táblát:",
-            options=list(TABLE_OPTIONS.keys()),
-            format_func=lambda x: TABLE_OPTIONS[x],
+            options=get_device_tables(),
+            format_func=lambda x: get_device_for_table(x).display_name,
             key="co2_table_selector"
         )
     
-    selected_table_display_name = TABLE_OPTIONS[selected_table]
+    selected_table_display_name = get_device_for_table(selected_table).display_name
     heater_power = st.session_state.get('heater_power', None)
     
     if heater_power is None or heater_power <= 0:
         st.warning("⚠️ Kérjük, adjon meg egy érvényes hagyományos fűtőtest teljesítményt a navigációs sávban!")
         return
     
+    comparison_devices = select_comparison_devices("co2")
+    if comparison_devices is None:
+        st.warning("Az összehasonlításhoz legalább egy dinamikus és egy termosztátos vezérlő szükséges!")
+        return
+    
     _initialize_cache()
-    _update_cache_if_needed(selected_table, heater_power)
+    _update_cache_if_needed(selected_table, heater_power, comparison_devices)
     
-    _fetch_all_table_data(heater_power)
+    _fetch_all_table_data(heater_power, comparison_devices)
     _fetch_selected_table_data(selected_table, heater_power)
     
     if 'co2_hourly_dataframe' not in st.session_state or st.session_state['co2_hourly_dataframe'] is None:
@@ -1,45 +1,29 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import os
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app_services.database import execute_query
-from page_modules.database_queries import get_smart_controller_data, get_thermostat_controller_data
+from app_services.measurement_access import fetch_controller_frames
+from app_services.price_store import get_price_store
+from app_services.rerun_profiler import profiled
+from page_modules.device_selection import select_comparison_devices
 
 TIME_INTERVAL_HOURS = 0.25
 HEATER_USAGE_HOURS = 24
 MAX_PAYBACK_MONTHS = 1000
 
-"""Veszteségi árak feldolgozása. Ha nincs cache-elve akkor visszaadja a None értéket."""
-def _parse_loss_prices():
-    loss_prices = st.session_state.get('loss_prices', None)
-    if not loss_prices:
-        return None, None
-    
-    try:
-        price_2024_str = loss_prices.get('2024', '')
-        price_2025_str = loss_prices.get('2025', '')
-        loss_price_2024 = float(price_2024_str.replace(',', '.').replace(' Ft/kWh', '')) if price_2024_str else None
-        loss_price_2025 = float(price_2025_str.replace(',', '.').replace(' Ft/kWh', '')) if price_2025_str else None
-        return loss_price_2024, loss_price_2025
-    except:
-        return None, None
+"""Napi veszteségi árak hozzárendelése az ár tárolóból. Minden naphoz az akkor hatályos ár tartozik."""
+def _attach_loss_prices(daily_energy_df, price_store):
+    daily_energy_df['year'] = pd.to_datetime(daily_energy_df['date']).dt.year
+    daily_energy_df['loss_price'] = price_store.prices_for_dates(daily_energy_df['date'])
 
 """DataFrame-ek előkészítése."""
-def _prepare_dataframes(smart_data, thermostat_data):
-    smart_df = pd.DataFrame(smart_data, columns=['date', 'time', 'value', 'current', 
-                                                 'internal_temp', 'external_temp', 'internal_humidity', 'external_humidity'])
-    thermostat_df = pd.DataFrame(thermostat_data, columns=['date', 'time', 'value', 'current', 
-                                                          'internal_temp', 'external_temp', 'internal_humidity', 'external_humidity'])
-    
-    smart_df['datetime'] = pd.to_datetime(smart_df['date'].astype(str) + ' ' + smart_df['time'].astype(str))
-    thermostat_df['datetime'] = pd.to_datetime(thermostat_df['date'].astype(str) + ' ' + thermostat_df['time'].astype(str))
-    
-    smart_df['value'] = pd.to_numeric(smart_df['value'], errors='coerce')
-    thermostat_df['value'] = pd.to_numeric(thermostat_df['value'], errors='coerce')
+def _prepare_dataframes(smart_df, thermostat_df):
+    smart_df = smart_df.rename(columns={'ts': 'datetime'})
+    thermostat_df = thermostat_df.rename(columns={'ts': 'datetime'})
     
     smart_df = smart_df.dropna(subset=['value'])
     thermostat_df = thermostat_df.dropna(subset=['value'])
@@ -80,28 +64,12 @@ def _calculate_operating_hours(smart_df, thermostat_df):
     return smart_operating_hours, thermostat_operating_hours
 
 """Költségek számítása dátum alapján."""
-def _calculate_costs(smart_daily_energy_df, thermostat_daily_energy_df, heater_daily_energy, 
-                    loss_price_2024, loss_price_2025):
-    smart_daily_energy_df['year'] = pd.to_datetime(smart_daily_energy_df['date']).dt.year
-    thermostat_daily_energy_df['year'] = pd.to_datetime(thermostat_daily_energy_df['date']).dt.year
-    
-    smart_daily_energy_df['daily_cost_ft'] = smart_daily_energy_df.apply(
-        lambda row: row['daily_energy_kwh'] * (loss_price_2024 if row['year'] == 2024 else loss_price_2025),
-        axis=1
-    )
-    thermostat_daily_energy_df['daily_cost_ft'] = thermostat_daily_energy_df.apply(
-        lambda row: row['daily_energy_kwh'] * (loss_price_2024 if row['year'] == 2024 else loss_price_2025),
-        axis=1
-    )
+def _calculate_costs(smart_daily_energy_df, thermostat_daily_energy_df, heater_daily_energy):
+    smart_daily_energy_df['daily_cost_ft'] = smart_daily_energy_df['daily_energy_kwh'] * smart_daily_energy_df['loss_price']
+    thermostat_daily_energy_df['daily_cost_ft'] = thermostat_daily_energy_df['daily_energy_kwh'] * thermostat_daily_energy_df['loss_price']
     
-    smart_daily_energy_df['heater_daily_cost_ft'] = smart_daily_energy_df.apply(
-        lambda row: heater_daily_energy * (loss_price_2024 if row['year'] == 2024 else loss_price_2025),
-        axis=1
-    )
-    thermostat_daily_energy_df['heater_daily_cost_ft'] = thermostat_daily_energy_df.apply(
-        lambda row: heater_daily_energy * (loss_price_2024 if row['year'] == 2024 else loss_price_2025),
-        axis=1
-    )
+    smart_daily_energy_df['heater_daily_cost_ft'] = heater_daily_energy * smart_daily_energy_df['loss_price']
+    thermostat_daily_energy_df['heater_daily_cost_ft'] = heater_daily_energy * thermostat_daily_energy_df['loss_price']
     
     total_days = len(smart_daily_energy_df)
     total_smart_cost = smart_daily_energy_df['daily_cost_ft'].sum()
@@ -115,19 +83,12 @@ def _calculate_costs(smart_daily_energy_df, thermostat_daily_energy_df, heater_d
     return smart_loss_cost, thermostat_loss_cost, heater_loss_cost, total_days
 
 """Megtakarítás számítása a dinamikus és termosztátos vezérlők között."""
-def _calculate_savings(smart_daily_energy_df, thermostat_daily_energy_df, heater_daily_energy,
-                       loss_price_2024, loss_price_2025, total_days):
+def _calculate_savings(smart_daily_energy_df, thermostat_daily_energy_df, heater_daily_energy, total_days):
     smart_daily_energy_df['daily_savings_energy'] = heater_daily_energy - smart_daily_energy_df['daily_energy_kwh']
-    smart_daily_energy_df['daily_savings_cost'] = smart_daily_energy_df.apply(
-        lambda row: row['daily_savings_energy'] * (loss_price_2024 if row['year'] == 2024 else loss_price_2025),
-        axis=1
-    )
+    smart_daily_energy_df['daily_savings_cost'] = smart_daily_energy_df['daily_savings_energy'] * smart_daily_energy_df['loss_price']
     
     thermostat_daily_energy_df['daily_savings_energy'] = heater_daily_energy - thermostat_daily_energy_df['daily_energy_kwh']
-    thermostat_daily_energy_df['daily_savings_cost'] = thermostat_daily_energy_df.apply(
-        lambda row: row['daily_savings_energy'] * (loss_price_2024 if row['year'] == 2024 else loss_price_2025),
-        axis=1
-    )
+    thermostat_daily_energy_df['daily_savings_cost'] = thermostat_daily_energy_df['daily_savings_energy'] * thermostat_daily_energy_df['loss_price']
     
     total_smart_savings_cost = smart_daily_energy_df['daily_savings_cost'].sum()
     total_thermostat_savings_cost = thermostat_daily_energy_df['daily_savings_cost'].sum()
@@ -142,20 +103,17 @@ def _calculate_savings(smart_daily_energy_df, thermostat_daily_energy_df, heater
     return smart_savings_cost, thermostat_savings_cost, smart_savings_energy, thermostat_savings_energy
 
 """Dinamikus vs Termosztátos megtakarítás számítása."""
-def _calculate_smart_vs_thermo_savings(smart_daily_energy_df, thermostat_daily_energy_df,
-                                       loss_price_2024, loss_price_2025):
-    smart_thermo_comparison = smart_daily_energy_df[['date', 'daily_energy_kwh', 'daily_cost_ft', 'year']].copy()
-    smart_thermo_comparison.columns = ['date', 'smart_energy', 'smart_cost', 'year']
+def _calculate_smart_vs_thermo_savings(smart_daily_energy_df, thermostat_daily_energy_df):
+    smart_thermo_comparison = smart_daily_energy_df[['date', 'daily_energy_kwh', 'daily_cost_ft', 'year', 'loss_price']].copy()
+    smart_thermo_comparison.columns = ['date', 'smart_energy', 'smart_cost', 'year', 'loss_price']
     thermo_comparison = thermostat_daily_energy_df[['date', 'daily_energy_kwh', 'daily_cost_ft']].copy()
     thermo_comparison.columns = ['date', 'thermo_energy', 'thermo_cost']
     smart_thermo_comparison = smart_thermo_comparison.merge(thermo_comparison, on='date', how='inner')
     
     smart_thermo_comparison['daily_savings_energy_smart_vs_thermo'] = \
         smart_thermo_comparison['thermo_energy'] - smart_thermo_comparison['smart_energy']
-    smart_thermo_comparison['daily_savings_cost_smart_vs_thermo'] = smart_thermo_comparison.apply(
-        lambda row: row['daily_savings_energy_smart_vs_thermo'] * (loss_price_2024 if row['year'] == 2024 else loss_price_2025),
-        axis=1
-    )
+    smart_thermo_comparison['daily_savings_cost_smart_vs_thermo'] = \
+        smart_thermo_comparison['daily_savings_energy_smart_vs_thermo'] * smart_thermo_comparison['loss_price']
     
     comparison_days = len(smart_thermo_comparison)
     total_smart_vs_thermo_savings_energy = smart_thermo_comparison['daily_savings_energy_smart_vs_thermo'].sum()
@@ -240,8 +198,7 @@ def _display_controller_table_pagination(total_rows):
 
 
 "Vezérlő táblázat megjelenítése."
-def _display_controller_table(smart_daily_energy_df, thermostat_daily_energy_df, 
-                            loss_price_2024, loss_price_2025):
+def _display_controller_table(smart_daily_energy_df, thermostat_daily_energy_df):
     if "prev_controller_choice" not in st.session_state:
         st.session_state.prev_controller_choice = None
     
@@ -258,17 +215,11 @@ def _display_controller_table(smart_daily_energy_df, thermostat_daily_energy_df,
         st.session_state.prev_controller_choice = controller_choice
     
     if controller_choice == "Dinamikus fűtésvezérlő":
-        selected_df = smart_daily_energy_df[['date', 'daily_energy_kwh', 'year']].copy()
-    else:
-        selected_df = thermostat_daily_energy_df[['date', 'daily_energy_kwh', 'year']].copy()
-   
-    if loss_price_2024 is not None and loss_price_2025 is not None:
-        selected_df['Költség (Ft)'] = selected_df.apply(
-            lambda row: row['daily_energy_kwh'] * (loss_price_2024 if row['year'] == 2024 else loss_price_2025),
-            axis=1
-        )
+        selected_df = smart_daily_energy_df[['date', 'daily_energy_kwh', 'daily_cost_ft']].copy()
     else:
-        selected_df['Költség (Ft)'] = 0.0
+        selected_df = thermostat_daily_energy_df[['date', 'daily_energy_kwh', 'daily_cost_ft']].copy()
+    
+    selected_df['Költség (Ft)'] = selected_df['daily_cost_ft']
     
     selected_df['date'] = pd.to_datetime(selected_df['date']).dt.strftime('%Y-%m-%d')
     selected_df = selected_df.sort_values('date')
@@ -297,8 +248,7 @@ def _display_controller_table(smart_daily_energy_df, thermostat_daily_energy_df,
     _display_controller_table_pagination(total_rows)
 
 """Folyamatos működés metrikák megjelenítése."""
-def _display_heater_metrics(smart_daily_energy_df, heater_daily_energy, 
-                            loss_price_2024, loss_price_2025):
+def _display_heater_metrics(smart_daily_energy_df, heater_daily_energy, price_store):
     st.write("")
     st.write("**Folyamatos működés esetén:**")
     
@@ -310,10 +260,10 @@ def _display_heater_metrics(smart_daily_energy_df, heater_daily_energy,
     heater_cost_2025 = smart_daily_energy_df[smart_daily_energy_df['year'] == 2025]['heater_daily_cost_ft'].mean() \
         if (smart_daily_energy_df['year'] == 2025).any() else None
     
-    if heater_cost_2024 is None and loss_price_2024 is not None:
-        heater_cost_2024 = heater_daily_energy * loss_price_2024
-    if heater_cost_2025 is None and loss_price_2025 is not None:
-        heater_cost_2025 = heater_daily_energy * loss_price_2025
+    if heater_cost_2024 is None:
+        heater_cost_2024 = heater_daily_energy * price_store.price_for_date(date(2024, 1, 1))
+    if heater_cost_2025 is None:
+        heater_cost_2025 = heater_daily_energy * price_store.price_for_date(date(2025, 1, 1))
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -588,10 +538,12 @@ def _handle_payback_analysis(daily_savings_smart_vs_thermo, investment_cost):
         st.info("Kérjük, adjon meg egy beruházási költséget a sidebar-ban a megtérülési számítás megjelenítéséhez.")
                             
 """Fogyasztási és költség megtakarítások számítása és megjelenítése."""
+@profiled
 def show_consumption_cost_savings(start_date, end_date):
     st.write("## Fogyasztási és költség megtakarítások")
     
-    if 'loss_prices' not in st.session_state or st.session_state.loss_prices is None:
+    price_store = get_price_store()
+    if not price_store.has_prices():
         st.warning("Az összehasonlításhoz szükségesek az E.ON árak!")
         return
     
@@ -600,41 +552,40 @@ def show_consumption_cost_savings(start_date, end_date):
         st.warning("Kérjük, adjon meg egy érvényes beépített fűtőtest teljesítményt a navigációs sávban!")
         return
     
+    comparison_devices = select_comparison_devices("savings")
+    if comparison_devices is None:
+        st.warning("Az összehasonlításhoz legalább egy dinamikus és egy termosztátos vezérlő szükséges!")
+        return
+    smart_device, thermostat_device = comparison_devices
+    
     with st.spinner("Összehasonlítás számítása..."):
         try:
-            smart_query = get_smart_controller_data(start_date, end_date)
-            thermostat_query = get_thermostat_controller_data(start_date, end_date)
-            smart_data = execute_query(smart_query)
-            thermostat_data = execute_query(thermostat_query)
+            controller_frames = fetch_controller_frames(start_date, end_date, [smart_device, thermostat_device])
+            smart_data = controller_frames[smart_device.device_id]
+            thermostat_data = controller_frames[thermostat_device.device_id]
             
-            if not (smart_data and thermostat_data and len(smart_data) > 0 and len(thermostat_data) > 0):
+            if smart_data.empty or thermostat_data.empty:
                 st.warning("Nincs elegendő adat az összehasonlításhoz!")
                 return
             
             smart_df, thermostat_df = _prepare_dataframes(smart_data, thermostat_data)
             smart_daily_energy_df, thermostat_daily_energy_df = _calculate_daily_energy(smart_df, thermostat_df)
-            
-            loss_price_2024, loss_price_2025 = _parse_loss_prices()
-            if loss_price_2024 is None or loss_price_2025 is None:
-                st.error("Nem sikerült kiszámítani a költségeket.")
-                return
+            _attach_loss_prices(smart_daily_energy_df, price_store)
+            _attach_loss_prices(thermostat_daily_energy_df, price_store)
             
             smart_daily_energy = smart_daily_energy_df['daily_energy_kwh'].mean()
             thermostat_daily_energy = thermostat_daily_energy_df['daily_energy_kwh'].mean()
             heater_daily_energy = (heater_power * HEATER_USAGE_HOURS) / 1000.0
             
             smart_loss_cost, thermostat_loss_cost, heater_loss_cost, total_days = _calculate_costs(
-                smart_daily_energy_df, thermostat_daily_energy_df, heater_daily_energy,
-                loss_price_2024, loss_price_2025
+                smart_daily_energy_df, thermostat_daily_energy_df, heater_daily_energy
             )
             
             smart_savings_cost, thermostat_savings_cost, smart_savings_energy, thermostat_savings_energy = \
-                _calculate_savings(smart_daily_energy_df, thermostat_daily_energy_df, heater_daily_energy,
-                                 loss_price_2024, loss_price_2025, total_days)
+                _calculate_savings(smart_daily_energy_df, thermostat_daily_energy_df, heater_daily_energy, total_days)
             
             smart_vs_thermo_savings_energy, smart_vs_thermo_savings_cost, smart_thermo_comparison = \
-                _calculate_smart_vs_thermo_savings(smart_daily_energy_df, thermostat_daily_energy_df,
-                                                  loss_price_2024, loss_price_2025)
+                _calculate_smart_vs_thermo_savings(smart_daily_energy_df, thermostat_daily_energy_df)
             
             consumption_diff_smart_heater = smart_daily_energy - heater_daily_energy
             consumption_diff_thermo_heater = thermostat_daily_energy - heater_daily_energy
@@ -648,10 +599,8 @@ def show_consumption_cost_savings(start_date, end_date):
             yearly_diff_thermo_heater = cost_diff_thermo_heater * 365
             yearly_diff_smart_thermo = cost_diff_smart_thermo * 365
             
-            _display_controller_table(smart_daily_energy_df, thermostat_daily_energy_df,
-                                     loss_price_2024, loss_price_2025)
-            _display_heater_metrics(smart_daily_energy_df, heater_daily_energy,
-                                   loss_price_2024, loss_price_2025)
+            _display_controller_table(smart_daily_energy_df, thermostat_daily_energy_df)
+            _display_heater_metrics(smart_daily_energy_df, heater_daily_energy, price_store)
             
             st.write("---")
             st.write("")
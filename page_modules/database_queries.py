@@ -1,83 +1,87 @@
-"""Teljesítmény oszlop nevének meghatározása (mapping)."""
-def _get_power_column(table_name: str) -> str:
-    return "trend_termosztat_p" if table_name == "dfv_termosztat_db" else "trend_smart_p"
-
-
-"""Vezérlő oszlopnevek meghatározása (mapping)."""
-def _get_controller_columns(table_name: str) -> dict:
-    if table_name == "dfv_smart_db":
-        return {
-            'power': 'trend_smart_p',
-            'current': 'trend_smart_i1',
-            'temp': 'trend_smart_t',
-            'humidity': 'trend_smart_rh'
-        }
-    else:
-        return {
-            'power': 'trend_termosztat_p',
-            'current': 'trend_termosztat_i1',
-            'temp': 'trend_termosztat_t',
-            'humidity': 'trend_termosztat_rh'
-        }
-
-"""Dinamikus fűtésvezérlő adatainak lekérdezése."""
-def get_smart_controller_data(start_date: str, end_date: str) -> str:
-    query = f"""
-    SELECT date, time, 
-           trend_smart_p as value,
-           trend_smart_i1 as current,
-           trend_smart_t as internal_temp,
-           trend_kulso_homerseklet_pillanatnyi as external_temp,
-           trend_smart_rh as internal_humidity,
-           trend_kulso_paratartalom as external_humidity
-    FROM dfv_smart_db
-    WHERE DATE(date) BETWEEN '{start_date}' AND '{end_date}'
-    AND trend_smart_p IS NOT NULL 
-    AND trend_smart_i1 IS NOT NULL
-    AND trend_smart_t IS NOT NULL
-    AND trend_kulso_homerseklet_pillanatnyi IS NOT NULL
+from app_services.device_registry import get_device_for_table
+
+
+"""Mérési sorok lekérdezése egy, a date oszlopra hivatkozó dátum feltétellel; a columns alias -> oszlop párokat,
+a required a kötelezően kitöltött oszlopokat adja meg. Ha az adatmegőrzés miatt a nyers sorok csak raw_from napjától
+léteznek, a korábbi rész az órás aggregátumokból érkezik (_get_rollup_rows_as_raw), azonos sorszerkezettel."""
+def _get_measurement_rows(table_name: str, columns: dict, required: list, date_condition: str, raw_from: str = None) -> str:
+    select_list = ",\n           ".join(f"{column} as {alias}" for alias, column in columns.items())
+    required_condition = "".join(f"\n    AND {column} IS NOT NULL" for column in required)
+    raw_rows = f"""
+    SELECT (date + time) AS ts,
+           {select_list}
+    FROM {table_name}
+    WHERE {date_condition}{required_condition}"""
+    if raw_from is None:
+        return raw_rows + """
     ORDER BY date, time
     """
-    return query
-
-"""Termosztátos vezérlő adatainak lekérdezése."""
-def get_thermostat_controller_data(start_date: str, end_date: str) -> str:
-    query = f"""
-    SELECT date, time, 
-           trend_termosztat_p as value,
-           trend_termosztat_i1 as current,
-           trend_termosztat_t as internal_temp,
-           trend_kulso_homerseklet_pillanatnyi as external_temp,
-           trend_termosztat_rh as internal_humidity,
-           trend_kulso_paratartalom as external_humidity
-    FROM dfv_termosztat_db
-    WHERE DATE(date) BETWEEN '{start_date}' AND '{end_date}'
-    AND trend_termosztat_p IS NOT NULL 
-    AND trend_termosztat_i1 IS NOT NULL
-    AND trend_termosztat_t IS NOT NULL
-    AND trend_kulso_homerseklet_pillanatnyi IS NOT NULL
-    ORDER BY date, time
+    return f"""
+    SELECT * FROM ({_get_rollup_rows_as_raw(table_name, columns, required, date_condition, raw_from)}
+    UNION ALL{raw_rows}
+    AND date >= '{raw_from}'
+    ) AS measurement_rows
+    ORDER BY ts
     """
-    return query
 
 
-"""Utolsó dátum lekérdezése egy táblából."""
-def get_last_date_from_table(table_name: str) -> str:
-    return f"SELECT MAX(date) as last_date FROM {table_name}"
+"""A nyers adatmegőrzési határ (raw_from) előtti időszak sorai az órás aggregátumokból: minden órás vödör annyi
+15 perces sorrá bomlik, ahány mérés került bele (az első oszlop szerint), az oszlopok órás átlagával. Így az
+összegek (pl. energia = teljesítmény * 0,25 óra) és a sorok száma a nyers adatokéval egyezik."""
+def _get_rollup_rows_as_raw(table_name: str, columns: dict, required: list, date_condition: str, raw_from: str) -> str:
+    aliases = {column: alias for alias, column in columns.items()}
+    averages = ",\n                   ".join(
+        f"MAX(avg_value) FILTER (WHERE column_name = '{column}') AS {alias}" for alias, column in columns.items())
+    required_condition = "".join(f"\n        AND b.{aliases[column]} IS NOT NULL" for column in required)
+    sample_column = next(iter(columns.values()))
+    return f"""
+        SELECT b.bucket_start + g.i * interval '15 minutes' AS ts,
+               {", ".join(f"b.{alias}" for alias in columns)}
+        FROM (
+            SELECT bucket_start, bucket_start::date AS date,
+                   MAX(sample_count) FILTER (WHERE column_name = '{sample_column}') AS sample_count,
+                   {averages}
+            FROM {get_rollup_table_name(table_name)}
+            WHERE level = '1h' AND bucket_start < '{raw_from}'::timestamp
+            GROUP BY bucket_start
+        ) AS b
+        CROSS JOIN LATERAL generate_series(0, b.sample_count - 1) AS g(i)
+        WHERE {date_condition}{required_condition}"""
 
 
-"""Teljesítmény adatok lekérdezése CO2 számításhoz."""
-def get_power_data_for_co2(table_name: str, start_date: str, end_date: str) -> str:
-    power_column = _get_power_column(table_name)
+"""A raw_from csak akkor számít, ha a lekérdezett tartomány a nyers adatok kezdete előtt indul."""
+def _raw_from_for_range(start_date, raw_from):
+    return raw_from if raw_from is not None and str(start_date) < str(raw_from) else None
+
+
+"""Mérések hosszú (long) formátumban egy, a date oszlopra hivatkozó dátum feltétellel: soronként időbélyeg (ts),
+szerepkör (metric) és érték. A columns szerepkör -> oszlop párokat ad meg, a required szerepkörök soronként
+kötelezőek (a hiányos időpontok minden szerepköre kimarad). Az adatmegőrzési határ előtti rész a széles
+lekérdezésekkel azonos módon az órás aggregátumokból érkezik."""
+def _get_long_rows(table_name: str, columns: dict, required: list, date_condition: str, raw_from: str = None) -> str:
+    rows = _get_measurement_rows(table_name, columns, [columns[role] for role in required], date_condition, raw_from)
+    values = ", ".join(f"('{role}', m.{role})" for role in columns)
     return f"""
-    SELECT date, time, {power_column} as power_W
-    FROM {table_name}
-    WHERE date >= '{start_date}' AND date <= '{end_date}'
-    AND {power_column} IS NOT NULL
-    ORDER BY date, time
+    SELECT m.ts, v.metric, v.value
+    FROM ({rows}) AS m
+    CROSS JOIN LATERAL (VALUES {values}) AS v(metric, value)
+    WHERE v.value IS NOT NULL
+    ORDER BY m.ts
     """
 
 
+"""Egy eszköz mérései hosszú formátumban egy dátumtartományra (a határokat is beleértve)."""
+def get_long_measurements(table_name: str, columns: dict, required: list, start_date: str, end_date: str,
+                          raw_from: str = None) -> str:
+    return _get_long_rows(table_name, columns, required, f"date BETWEEN '{start_date}' AND '{end_date}'",
+                          _raw_from_for_range(start_date, raw_from))
+
+
+"""Utolsó dátum lekérdezése egy táblából."""
+def get_last_date_from_table(table_name: str) -> str:
+    return f"SELECT MAX(date) as last_date FROM {table_name}"
+
+
 """Tábla adatok lekérdezése lapozással."""
 def get_table_data_paginated(table_name: str, columns: str, page_size: int, offset: int) -> str:
     return f"SELECT {columns} FROM {table_name} ORDER BY date, time LIMIT {page_size} OFFSET {offset}"
@@ -87,31 +91,380 @@ def get_table_count(table_name: str) -> str:
     return f"SELECT COUNT(*) FROM {table_name}"
 
 
-"""Diagram adatok lekérdezése időintervallum alapján."""
+"""Diagram adatok lekérdezése időintervallum alapján. Az időbélyeget a szerver állítja elő (date + time),
+szöveges összefűzés nélkül."""
 def get_chart_data_by_time_range(table_name: str, columns: str, start_time: str, end_time: str) -> str:
     return f"""
     SELECT {columns} FROM {table_name} 
-    WHERE (date::text || ' ' || time::text)::timestamp <= '{end_time}'::timestamp
-    AND (date::text || ' ' || time::text)::timestamp >= '{start_time}'::timestamp
+    WHERE date BETWEEN '{start_time}'::timestamp::date AND '{end_time}'::timestamp::date
+    AND (date + time) <= '{end_time}'::timestamp
+    AND (date + time) >= '{start_time}'::timestamp
     ORDER BY date, time
     """
 
-"""Energia előrejelzéshez szükséges adatok lekérdezése."""
-def get_energy_prediction_data(table_name: str, start_date: str, end_date: str) -> str:
-    cols = _get_controller_columns(table_name)
+"""Hónapok halmaza évenkénti dátumtartományokként (pl. minden év áprilisa-júniusa). Az EXTRACT(MONTH FROM date)
+szűréssel szemben a tartományokra a dátum indexe és a havi partíciók kizárása (partition pruning) is működik."""
+def _get_month_ranges_condition(months: list, first_year: int, last_year: int) -> str:
+    ranges = []
+    for year in range(first_year, last_year + 1):
+        for month in sorted(months):
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            ranges.append(f"(date >= '{year}-{month:02d}-01' AND date < '{next_year}-{next_month:02d}-01')")
+    return "(" + " OR ".join(ranges) + ")" if ranges else "FALSE"
+
+
+"""Egy eszköz mérései hosszú formátumban a megadott hónapokra, a first_year és last_year közötti évekből."""
+def get_long_measurements_for_months(table_name: str, columns: dict, required: list, months: list, first_year: int,
+                                     last_year: int, raw_from: str = None) -> str:
+    return _get_long_rows(table_name, columns, required, _get_month_ranges_condition(months, first_year, last_year),
+                          _raw_from_for_range(f"{first_year}-01-01", raw_from))
+
+
+"""Mérési oszlopok listája táblánként (az eszköz nyilvántartás alapján)."""
+def get_measurement_columns(table_name: str) -> list:
+    return get_device_for_table(table_name).measurement_columns
+
+
+"""Felbontási piramis (rollup) tábla nevének meghatározása."""
+def get_rollup_table_name(table_name: str) -> str:
+    return f"{table_name}_rollup"
+
+
+"""Felbontási piramis tábla létrehozása, ha még nem létezik."""
+def create_rollup_table(table_name: str) -> str:
     return f"""
-    SELECT date, time, 
-           {cols['power']} as value,
-           {cols['current']} as current,
-           {cols['temp']} as internal_temp,
-           trend_kulso_homerseklet_pillanatnyi as external_temp,
-           {cols['humidity']} as internal_humidity,
-           trend_kulso_paratartalom as external_humidity
+    CREATE TABLE IF NOT EXISTS {get_rollup_table_name(table_name)} (
+        level TEXT NOT NULL,
+        bucket_start TIMESTAMP NOT NULL,
+        column_name TEXT NOT NULL,
+        min_value DOUBLE PRECISION,
+        avg_value DOUBLE PRECISION,
+        max_value DOUBLE PRECISION,
+        sum_value DOUBLE PRECISION,
+        sample_count INTEGER NOT NULL,
+        PRIMARY KEY (level, column_name, bucket_start)
+    )
+    """
+
+
+"""A sum_value oszlop pótlása a korábban (összeg nélkül) létrehozott felbontási piramis táblákban."""
+def add_rollup_sum_column(table_name: str) -> str:
+    return f"ALTER TABLE {get_rollup_table_name(table_name)} ADD COLUMN IF NOT EXISTS sum_value DOUBLE PRECISION"
+
+
+"""Egy felbontási szint törlése a megadott időponttól (until esetén az előtti, felülről nyitott tartományban)."""
+def delete_rollup_level(table_name: str, level: str, since: str, until: str = None) -> str:
+    until_condition = f"\n    AND bucket_start < '{until}'::timestamp" if until else ""
+    return f"""
+    DELETE FROM {get_rollup_table_name(table_name)}
+    WHERE level = '{level}' AND bucket_start >= '{since}'::timestamp{until_condition}
+    """
+
+
+"""Egy felbontási szint felépítése: oszloponként min/átlag/max/összeg vödrökbe (bucket) aggregálva
+(until esetén csak az az előtti, felülről nyitott tartományra)."""
+def build_rollup_level(table_name: str, level: str, bucket_seconds: int, columns: list, since: str, until: str = None) -> str:
+    until_condition = f"\n    AND (date + time) < '{until}'::timestamp" if until else ""
+    values = ", ".join(f"('{column}', {column}::double precision)" for column in columns)
+    return f"""
+    INSERT INTO {get_rollup_table_name(table_name)}
+        (level, bucket_start, column_name, min_value, avg_value, max_value, sum_value, sample_count)
+    SELECT '{level}',
+           to_timestamp(floor(extract(epoch FROM (date + time)) / {bucket_seconds}) * {bucket_seconds})
+               AT TIME ZONE 'UTC' AS bucket_start,
+           m.column_name,
+           MIN(m.value), AVG(m.value), MAX(m.value), SUM(m.value), COUNT(m.value)
     FROM {table_name}
-    WHERE DATE(date) BETWEEN '{start_date}' AND '{end_date}'
-    AND {cols['power']} IS NOT NULL 
-    AND {cols['current']} IS NOT NULL
-    AND {cols['temp']} IS NOT NULL
-    AND trend_kulso_homerseklet_pillanatnyi IS NOT NULL
+    CROSS JOIN LATERAL (VALUES {values}) AS m(column_name, value)
+    WHERE date >= '{since}'::timestamp::date
+    AND (date + time) >= '{since}'::timestamp{until_condition}
+    AND m.value IS NOT NULL
+    GROUP BY 2, 3
+    """
+
+
+"""Egy oszlop aggregált idősorának lekérdezése a felbontási piramisból."""
+def get_rollup_series(table_name: str, level: str, column_name: str, start_time: str, end_time: str) -> str:
+    return f"""
+    SELECT bucket_start, min_value, avg_value, max_value, sample_count
+    FROM {get_rollup_table_name(table_name)}
+    WHERE level = '{level}' AND column_name = '{column_name}'
+    AND bucket_start >= '{start_time}'::timestamp
+    AND bucket_start <= '{end_time}'::timestamp
+    ORDER BY bucket_start
+    """
+
+
+"""Legutolsó mérés időpontjának (dátum, idő) lekérdezése egy táblából."""
+def get_latest_timestamp(table_name: str) -> str:
+    return f"SELECT date, time FROM {table_name} ORDER BY date DESC, time DESC LIMIT 1"
+
+
+"""Az utoljára látott (dátum, idő) párnál újabb diagram adatok lekérdezése."""
+def get_chart_data_after(table_name: str, columns: str, last_date: str, last_time: str) -> str:
+    return f"""
+    SELECT {columns} FROM {table_name}
+    WHERE date >= '{last_date}'::date
+    AND (date, time) > ('{last_date}'::date, '{last_time}'::time)
+    ORDER BY date, time
+    """
+
+
+"""Első és utolsó mérési nap lekérdezése egy táblából."""
+def get_date_bounds(table_name: str) -> str:
+    return f"SELECT MIN(date), MAX(date) FROM {table_name}"
+
+
+"""Az előzmény adatok első és utolsó napja: adatmegőrzés után (raw_from megadva) a raw_from előtti időszak
+csak az órás aggregátumokban van meg, ezért a határok a nyers tábla és a felbontási piramis határaiból adódnak."""
+def get_history_date_bounds(table_name: str, raw_from: str = None) -> str:
+    if raw_from is None:
+        return get_date_bounds(table_name)
+    return f"""
+    SELECT LEAST(raw.first_date, rollup.first_date), GREATEST(raw.last_date, rollup.last_date)
+    FROM (SELECT MIN(date) AS first_date, MAX(date) AS last_date FROM {table_name}) AS raw,
+         (SELECT MIN(bucket_start)::date AS first_date, MAX(bucket_start)::date AS last_date
+          FROM {get_rollup_table_name(table_name)}
+          WHERE level = '1h' AND bucket_start < '{raw_from}'::timestamp) AS rollup
+    """
+
+
+"""Egy tábla összes oszlopának lekérdezése egy napokban megadott, felülről nyitott tartományra (pillanatkép exporthoz)."""
+def get_table_data_for_date_range(table_name: str, start_date: str, end_date_exclusive: str) -> str:
+    return f"""
+    SELECT * FROM {table_name}
+    WHERE date >= '{start_date}' AND date < '{end_date_exclusive}'
     ORDER BY date, time
     """
+
+
+"""Szerver oldalon összeállított időbélyeg oszlop a diagram lekérdezésekhez."""
+def get_timestamp_column() -> str:
+    return "(date + time) AS ts"
+
+
+"""Mérési tábla létrehozása, ha még nem létezik (szintetikus adatkészlethez és teszt környezethez)."""
+def create_measurement_table(table_name: str) -> str:
+    measurement_columns = ",\n        ".join(f"{column} DOUBLE PRECISION" for column in get_measurement_columns(table_name))
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table_name} (
+        id BIGINT NOT NULL,
+        date DATE NOT NULL,
+        time TIME NOT NULL,
+        {measurement_columns}
+    )
+    """
+
+
+"""Adatverzió (watermark) tábla létrehozása: táblánként egy monoton növekvő verziószám, amelyre a cache-ek
+és a felbontási piramis kulcsolhatnak."""
+def create_data_version_table() -> str:
+    return """
+    CREATE TABLE IF NOT EXISTS dfv_data_versions (
+        table_name TEXT PRIMARY KEY,
+        version BIGINT NOT NULL,
+        max_ts TIMESTAMP,
+        changed_from TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL
+    )
+    """
+
+
+"""Igaz, ha a tábla létezik (a még létre nem hozott vízjel táblák hibamentes ellenőrzéséhez)."""
+def get_table_exists(table_name: str) -> str:
+    return f"SELECT to_regclass('{table_name}') IS NOT NULL"
+
+
+"""Egy tábla aktuális adatverziójának lekérdezése."""
+def get_data_version(table_name: str) -> str:
+    return f"SELECT version FROM dfv_data_versions WHERE table_name = '{table_name}'"
+
+
+"""Adatverzió léptetése egy betöltés után; a changed_from a módosított tartomány eleje."""
+def advance_data_version(table_name: str, changed_from: str, max_ts: str) -> str:
+    return f"""
+    INSERT INTO dfv_data_versions AS v (table_name, version, max_ts, changed_from, updated_at)
+    VALUES ('{table_name}', 1, '{max_ts}'::timestamp, '{changed_from}'::timestamp, now())
+    ON CONFLICT (table_name) DO UPDATE SET
+        version = v.version + 1,
+        max_ts = GREATEST(v.max_ts, EXCLUDED.max_ts),
+        changed_from = EXCLUDED.changed_from,
+        updated_at = EXCLUDED.updated_at
+    RETURNING version
+    """
+
+
+"""Ideiglenes betöltő (staging) tábla a COPY-hoz; a seq oszlop a beérkezési sorrendet őrzi a deduplikáláshoz."""
+def create_ingest_staging_table(table_name: str, staging_table: str) -> str:
+    measurement_columns = ",\n        ".join(f"{column} DOUBLE PRECISION" for column in get_measurement_columns(table_name))
+    return f"""
+    CREATE TEMP TABLE {staging_table} (
+        seq BIGSERIAL,
+        date DATE NOT NULL,
+        time TIME NOT NULL,
+        {measurement_columns}
+    ) ON COMMIT DROP
+    """
+
+
+"""Upsert egyetlen utasításban a staging táblából: (date, time) szerint oszloponként összevon (minden oszlopban
+a legkésőbb érkezett nem üres érték marad), a meglévő sorokban csak a kötegben megadott oszlopokat írja felül
+(a NULL a meglévő értéket megtartja), és csak tényleges változás esetén frissít; az újakat folytatólagos id-vel
+szúrja be. Ha az id oszlopnak van alapértéke (serial / identity), az új sorok id-jét az adja (a szekvencia
+így nem ütközik a betöltött sorokkal); csak alapérték nélküli táblánál számol a MAX(id)-ből.
+Visszaadja a frissített és a beszúrt sorok számát, valamint a módosított időtartományt."""
+def upsert_from_staging(table_name: str, staging_table: str, id_has_default: bool = False) -> str:
+    columns = get_measurement_columns(table_name)
+    column_list = ", ".join(columns)
+    merged_list = ",\n               ".join(
+        f"(array_agg({column} ORDER BY seq DESC) FILTER (WHERE {column} IS NOT NULL))[1] AS {column}" for column in columns)
+    source_list = ", ".join(f"s.{column}" for column in columns)
+    merged_target_list = ", ".join(f"COALESCE(s.{column}, t.{column})" for column in columns)
+    target_list = ", ".join(f"t.{column}" for column in columns)
+    assignments = ", ".join(f"{column} = COALESCE(s.{column}, t.{column})" for column in columns)
+    insert_columns = "" if id_has_default else "id, "
+    insert_id = "" if id_has_default else \
+        f"(SELECT COALESCE(MAX(id), 0) FROM {table_name}) + row_number() OVER (ORDER BY s.date, s.time),\n               "
+    return f"""
+    WITH source AS (
+        SELECT date, time,
+               {merged_list}
+        FROM {staging_table}
+        GROUP BY date, time
+    ),
+    updated AS (
+        UPDATE {table_name} AS t SET {assignments}
+        FROM source AS s
+        WHERE t.date = s.date AND t.time = s.time
+        AND ({target_list}) IS DISTINCT FROM ({merged_target_list})
+        RETURNING t.date, t.time
+    ),
+    inserted AS (
+        INSERT INTO {table_name} ({insert_columns}date, time, {column_list})
+        SELECT {insert_id}s.date, s.time, {source_list}
+        FROM source AS s
+        WHERE NOT EXISTS (SELECT 1 FROM {table_name} AS t WHERE t.date = s.date AND t.time = s.time)
+        ORDER BY s.date, s.time
+        RETURNING date, time
+    ),
+    changed AS (
+        SELECT date, time FROM updated UNION ALL SELECT date, time FROM inserted
+    )
+    SELECT (SELECT COUNT(*) FROM updated), (SELECT COUNT(*) FROM inserted),
+           MIN(date + time), MAX(date + time)
+    FROM changed
+    """
+
+
+"""Igaz, ha a tábla id oszlopa serial vagy identity szekvenciából kap alapértéket."""
+def get_id_has_default(table_name: str) -> str:
+    return f"SELECT pg_get_serial_sequence('{table_name}', 'id') IS NOT NULL"
+
+
+"""Havi partíció nevének meghatározása (pl. dfv_smart_db_p202505)."""
+def get_partition_name(table_name: str, month_start) -> str:
+    return f"{table_name}_p{month_start:%Y%m}"
+
+
+"""Igaz, ha a tábla tartomány szerint partícionált szülő tábla."""
+def get_is_partitioned(table_name: str) -> str:
+    return f"SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('{table_name}'))"
+
+
+"""Üres, a date oszlop szerint havi tartományokra partícionált tábla létrehozása egy meglévő tábla szerkezetével."""
+def create_partitioned_table_like(source_table: str, partitioned_table: str) -> str:
+    return f"""
+    CREATE TABLE {partitioned_table} (LIKE {source_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (date)
+    """
+
+
+"""Egy havi partíció létrehozása, ha még nem létezik (a felső határ nyitott: a következő hónap első napja)."""
+def create_month_partition(parent_table: str, partition_name: str, month_start: str, next_month_start: str) -> str:
+    return f"""
+    CREATE TABLE IF NOT EXISTS {partition_name} PARTITION OF {parent_table}
+    FOR VALUES FROM ('{month_start}') TO ('{next_month_start}')
+    """
+
+
+"""(date, time) index a partícionált táblán; a PostgreSQL minden (későbbi) partíción is létrehozza."""
+def create_partitioned_index(parent_table: str, index_name: str) -> str:
+    return f"CREATE INDEX IF NOT EXISTS {index_name} ON {parent_table} (date, time)"
+
+
+"""Egy napokban megadott, felülről nyitott tartomány sorainak átmásolása egy másik (azonos szerkezetű) táblába."""
+def copy_table_rows_for_date_range(source_table: str, target_table: str, start_date: str, end_date_exclusive: str) -> str:
+    return f"""
+    INSERT INTO {target_table}
+    SELECT * FROM {source_table}
+    WHERE date >= '{start_date}' AND date < '{end_date_exclusive}'
+    """
+
+
+"""Egy tábla indexei (az elsődleges kulcs és az egyedi megszorítások indexeivel együtt): név és definíció."""
+def get_table_indexes(table_name: str) -> str:
+    return f"""
+    SELECT i.relname, pg_get_indexdef(i.oid)
+    FROM pg_index AS x
+    JOIN pg_class AS i ON i.oid = x.indexrelid
+    WHERE x.indrelid = '{table_name}'::regclass
+    ORDER BY i.relname
+    """
+
+
+"""A tábla serial oszlopainak (nem identity) szekvenciái: oszlopnév és szekvencia név."""
+def get_owned_sequences(table_name: str) -> str:
+    return f"""
+    SELECT a.attname, pg_get_serial_sequence('{table_name}', a.attname)
+    FROM pg_attribute AS a
+    WHERE a.attrelid = '{table_name}'::regclass
+    AND a.attnum > 0 AND NOT a.attisdropped AND a.attidentity = ''
+    AND pg_get_serial_sequence('{table_name}', a.attname) IS NOT NULL
+    """
+
+
+"""Egy szekvencia tulajdonjogának átadása egy másik tábla oszlopának (így a régi tábla törölhető)."""
+def set_sequence_owner(sequence_name: str, table_name: str, column_name: str) -> str:
+    return f"ALTER SEQUENCE {sequence_name} OWNED BY {table_name}.{column_name}"
+
+
+"""Tábla átnevezése."""
+def rename_table(table_name: str, new_name: str) -> str:
+    return f"ALTER TABLE {table_name} RENAME TO {new_name}"
+
+
+"""Adatmegőrzési vízjel tábla: táblánként az első nap, amelytől a nyers (15 perces) sorok még megvannak."""
+def create_retention_table() -> str:
+    return """
+    CREATE TABLE IF NOT EXISTS dfv_retention_watermarks (
+        table_name TEXT PRIMARY KEY,
+        raw_from DATE NOT NULL,
+        updated_at TIMESTAMP NOT NULL
+    )
+    """
+
+
+"""A nyers sorok első megőrzött napjának lekérdezése."""
+def get_raw_data_start(table_name: str) -> str:
+    return f"SELECT raw_from FROM dfv_retention_watermarks WHERE table_name = '{table_name}'"
+
+
+"""A nyers sorok első megőrzött napjának beállítása egy adatmegőrzési futás után."""
+def set_raw_data_start(table_name: str, raw_from: str) -> str:
+    return f"""
+    INSERT INTO dfv_retention_watermarks (table_name, raw_from, updated_at)
+    VALUES ('{table_name}', '{raw_from}'::date, now())
+    ON CONFLICT (table_name) DO UPDATE SET
+        raw_from = GREATEST(dfv_retention_watermarks.raw_from, EXCLUDED.raw_from),
+        updated_at = EXCLUDED.updated_at
+    """
+
+
+"""Egy napokban megadott időpont előtti nyers sorok száma."""
+def count_rows_before(table_name: str, end_date_exclusive: str) -> str:
+    return f"SELECT COUNT(*) FROM {table_name} WHERE date < '{end_date_exclusive}'"
+
+
+"""Egy napokban megadott időpont előtti nyers sorok törlése."""
+def delete_rows_before(table_name: str, end_date_exclusive: str) -> str:
+    return f"DELETE FROM {table_name} WHERE date < '{end_date_exclusive}'"
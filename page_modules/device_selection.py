@@ -0,0 +1,24 @@
+import streamlit as st
+from app_services.device_registry import DEVICE_KINDS, get_devices, get_device
+
+
+"""Az összehasonlított dinamikus és termosztátos vezérlő kiválasztása a nyilvántartásból. Ha egy típusból csak
+egy eszköz van, nincs választó. None, ha valamelyik típusból nincs eszköz."""
+def select_comparison_devices(key_prefix):
+    candidates = {kind: get_devices(kind) for kind in ('smart', 'thermostat')}
+    if not all(candidates.values()):
+        return None
+    
+    selectable_kinds = [kind for kind, devices in candidates.items() if len(devices) > 1]
+    selected = {kind: devices[0] for kind, devices in candidates.items()}
+    if selectable_kinds:
+        for column, kind in zip(st.columns(len(selectable_kinds)), selectable_kinds):
+            with column:
+                device_id = st.selectbox(
+                    f"{DEVICE_KINDS[kind]}:",
+                    options=[device.device_id for device in candidates[kind]],
+                    format_func=lambda device_id: get_device(device_id).display_name,
+                    key=f"{key_prefix}_{kind}_device"
+                )
+                selected[kind] = get_device(device_id)
+    return selected['smart'], selected['thermostat']
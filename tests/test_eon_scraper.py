@@ -0,0 +1,54 @@
+import os
+import sys
+import pytest
+
+from app_services import eon_scraper
+
+pytest.importorskip("bs4")
+pytest.importorskip("lxml")
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "eon_arak.html")
+
+
+def _read_fixture():
+    with open(FIXTURE_PATH, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_parse_loss_prices_prefers_loss_table_rows():
+    assert eon_scraper.parse_loss_prices(_read_fixture()) == {'2024': '3,46 Ft/kWh', '2025': '3,88 Ft/kWh'}
+
+
+def test_parse_loss_prices_falls_back_to_last_price_in_row():
+    html = """
+    <table>
+      <tr><td>Veszteség díja</td><td>2024</td><td>n.a.</td><td>4,10 Ft/kWh</td></tr>
+      <tr><td>Veszteség díja</td><td>2025</td><td>-</td><td>1 234,56 Ft/kWh</td></tr>
+    </table>
+    """
+    assert eon_scraper.parse_loss_prices(html) == {'2024': '4,10 Ft/kWh', '2025': '1 234,56 Ft/kWh'}
+
+
+def test_parse_loss_prices_skips_missing_years():
+    html = "<table><tr><td>Veszteség díja</td><td>2024</td><td>3,46 Ft/kWh</td></tr></table>"
+    assert eon_scraper.parse_loss_prices(html) == {'2024': '3,46 Ft/kWh'}
+
+
+def test_parse_loss_prices_without_tables():
+    assert eon_scraper.parse_loss_prices("<html><body><p>Karbantartás</p></body></html>") == {}
+
+
+def test_main_html_prints_prices(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['eon_scraper', '--html', FIXTURE_PATH])
+    eon_scraper.main()
+    assert capsys.readouterr().out.splitlines() == ['2024: 3,46 Ft/kWh', '2025: 3,88 Ft/kWh']
+
+
+def test_main_html_without_prices_exits_with_error(monkeypatch, capsys, tmp_path):
+    html_path = tmp_path / "ures.html"
+    html_path.write_text("<html><body></body></html>", encoding='utf-8')
+    monkeypatch.setattr(sys, 'argv', ['eon_scraper', '--html', str(html_path)])
+    with pytest.raises(SystemExit) as exit_info:
+        eon_scraper.main()
+    assert exit_info.value.code == 1
+    assert "nem található ár" in capsys.readouterr().err